@@ -3,6 +3,12 @@ ASGI config for elearning_django project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site through this entry point (for example
+``uvicorn elearning_django.asgi:application --workers 4``) to get the async
+paths: resumable upload chunks and the notification event stream then wait
+on the event loop instead of holding a worker thread each, so slow uploads
+and idle streams don't queue up page requests behind them.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -46,6 +46,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "lms.principal.PrincipalMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -63,12 +64,14 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.media",
+                "lms.context_processors.live_events",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "elearning_django.wsgi.application"
+ASGI_APPLICATION = "elearning_django.asgi.application"
 
 
 # Database
@@ -82,6 +85,17 @@ DATABASES = {
 }
 
 
+# Page, fragment, report and principal caches. Use a shared backend
+# (Redis or Memcached) when running more than one process.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "elearning",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -122,6 +136,18 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Resumable upload chunks are written by a dedicated thread pool (see lms/uploads.py);
+# at most MAX_CONCURRENT_UPLOADS chunks per process hit the disk at once.
+UPLOAD_IO_THREADS = 8
+MAX_CONCURRENT_UPLOADS = 16
+
+# TrueType fonts for certificate PDFs (lms/pdf.py), from Debian's fonts-dejavu-core.
+# If they (or reportlab) are missing, students get the HTML certificate only.
+CERTIFICATE_FONTS = {
+    'regular': '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'bold': '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+}
+
 from django.contrib.messages import constants as messages
 
 MESSAGE_TAGS = {
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LmsConfig(AppConfig):
     name = "lms"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,77 @@
+"""
+Notification broadcasts to a course, an internship or every student.
+
+Recipients are walked in student id order, CHUNK_SIZE ids at a time, and each
+chunk is written with one bulk_create plus one unread-counter update. The
+chunk's rows and the broadcast's progress commit together, so memory stays
+bounded and an interrupted broadcast picks up after the last student it
+reached.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import jobs, notifications
+from .models import Broadcast, Enrollment, InternshipEnrollment, Student
+
+CHUNK_SIZE = 2000
+
+AUDIENCES = ('all', 'course', 'internship')
+
+
+def recipients(broadcast):
+    """Student ids the broadcast goes to, as a values_list queryset."""
+    if broadcast.audience == 'course':
+        return Enrollment.objects.filter(course_id=broadcast.course_id).values_list('student_id', flat=True)
+    if broadcast.audience == 'internship':
+        return InternshipEnrollment.objects.filter(
+            internship_id=broadcast.internship_id
+        ).values_list('student_id', flat=True)
+    return Student.objects.values_list('id', flat=True)
+
+
+def _key(broadcast):
+    return 'id' if broadcast.audience == 'all' else 'student_id'
+
+
+def send_broadcast(broadcast, chunk_size=CHUNK_SIZE):
+    """Write the broadcast's notifications from its resume point onwards."""
+    key = _key(broadcast)
+    audience = recipients(broadcast)
+    Broadcast.objects.filter(pk=broadcast.pk).update(
+        status='Running', total=audience.count(), updated_at=timezone.now()
+    )
+    try:
+        while True:
+            ids = list(audience.filter(**{f'{key}__gt': broadcast.last_student_id}).order_by(key)[:chunk_size])
+            if not ids:
+                break
+            now = timezone.now()
+            with transaction.atomic():
+                notifications.notify_many(ids, broadcast.message, now)
+                Broadcast.objects.filter(pk=broadcast.pk).update(
+                    sent=F('sent') + len(ids), last_student_id=ids[-1], updated_at=now
+                )
+            broadcast.last_student_id = ids[-1]
+    except Exception:
+        Broadcast.objects.filter(pk=broadcast.pk).update(status='Failed', updated_at=timezone.now())
+        raise
+    Broadcast.objects.filter(pk=broadcast.pk).update(status='Completed', updated_at=timezone.now())
+    broadcast.refresh_from_db()
+    return broadcast
+
+
+@jobs.task
+def _send_by_id(broadcast_id):
+    broadcast = Broadcast.objects.filter(id=broadcast_id).first()
+    if broadcast and broadcast.status != 'Completed':
+        send_broadcast(broadcast)
+
+
+def start_broadcast(message, audience='all', course_id=None, internship_id=None):
+    """Create a broadcast and queue the job that sends it."""
+    broadcast = Broadcast.objects.create(
+        message=message, audience=audience, course_id=course_id, internship_id=internship_id
+    )
+    jobs.enqueue(_send_by_id, broadcast.id)
+    return broadcast
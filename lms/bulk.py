@@ -0,0 +1,108 @@
+"""
+Bulk enrollment.
+
+The CSV is read row by row; identifiers are resolved to students in batches
+with one IN query each, and enrollments are inserted with
+bulk_create(ignore_conflicts=True) so existing pairs are skipped by the
+database's unique constraints instead of per-row existence checks.
+"""
+import csv
+import io
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Enrollment, InternshipEnrollment, Student
+
+BATCH_SIZE = 1000
+UNKNOWN_SAMPLE_SIZE = 20
+
+# Header cells that are skipped when they appear on the first row
+HEADER_NAMES = {'username', 'email', 'user', 'student'}
+
+
+def iter_identifiers(text_stream):
+    """Yield the first non-empty cell of each CSV row, skipping a header row."""
+    for line_no, row in enumerate(csv.reader(text_stream)):
+        if not row:
+            continue
+        value = row[0].strip()
+        if not value:
+            continue
+        if line_no == 0 and value.lower() in HEADER_NAMES:
+            continue
+        yield value
+
+
+def open_csv(uploaded_file):
+    return io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _resolve(identifiers):
+    emails = [i for i in identifiers if '@' in i]
+    usernames = [i for i in identifiers if '@' not in i]
+    found = {}
+    for student_id, username, email in Student.objects.filter(
+        Q(username__in=usernames) | Q(email__in=emails)
+    ).values_list('id', 'username', 'email'):
+        found[username] = student_id
+        if email:
+            found[email] = student_id
+    return found
+
+
+def _insert(model, target_field, student_ids, target_ids, batch_size):
+    existing = model.objects.filter(
+        student_id__in=student_ids, **{f'{target_field}__in': target_ids}
+    ).count()
+    objs = [
+        model(student_id=student_id, **{target_field: target_id})
+        for student_id in student_ids
+        for target_id in target_ids
+    ]
+    model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+    return len(objs) - existing
+
+
+def bulk_enroll(identifiers, course_ids=(), internship_ids=(), batch_size=BATCH_SIZE):
+    """
+    Enroll every student named in ``identifiers`` (usernames or emails) into the
+    given courses and internships. Returns counts of created and skipped
+    enrollments, and how many identifiers matched no student (with a sample).
+    """
+    course_ids = list(course_ids)
+    internship_ids = list(internship_ids)
+    targets = len(course_ids) + len(internship_ids)
+    result = {'rows': 0, 'created': 0, 'skipped': 0, 'unknown': 0, 'unknown_sample': []}
+
+    with transaction.atomic():
+        for batch in _batches(identifiers, batch_size):
+            result['rows'] += len(batch)
+            found = _resolve(batch)
+            unknown = [i for i in batch if i not in found]
+            result['unknown'] += len(unknown)
+            result['unknown_sample'].extend(unknown[:UNKNOWN_SAMPLE_SIZE - len(result['unknown_sample'])])
+            # A student listed twice in the file is only enrolled once
+            student_ids = list(dict.fromkeys(found[i] for i in batch if i in found))
+            if not student_ids:
+                continue
+
+            created = 0
+            if course_ids:
+                created += _insert(Enrollment, 'course_id', student_ids, course_ids, batch_size)
+            if internship_ids:
+                created += _insert(InternshipEnrollment, 'internship_id', student_ids, internship_ids, batch_size)
+            result['created'] += created
+            result['skipped'] += len(student_ids) * targets - created
+    return result
@@ -0,0 +1,65 @@
+"""
+Public course catalogue.
+
+Only approved courses are listed, keyset-paginated on (created_at, id) so the
+partial approved-course indexes serve every page. Per-category counts come
+from one grouped query whose result is cached until a course or category
+changes (see signals.py).
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from . import images
+from .models import Category, Course
+from .pagination import keyset_paginate
+
+CATALOGUE_PER_PAGE = 12
+FACETS_CACHE_KEY = 'catalogue:facets'
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+
+def approved_courses(category_id=None):
+    courses = Course.objects.filter(status='Approved')
+    if category_id:
+        courses = courses.filter(category_id=category_id)
+    return courses.select_related('category', 'instructor').only(
+        'id', 'title', 'description', 'image_file', 'created_at',
+        'category__name', 'instructor__username',
+    )
+
+
+def category_facets():
+    """[{'id', 'name', 'count'}] for categories with approved courses, cached."""
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = list(
+            Category.objects.annotate(count=Count('courses', filter=Q(courses__status='Approved')))
+            .filter(count__gt=0)
+            .order_by('name')
+            .values('id', 'name', 'count')
+        )
+        cache.set(FACETS_CACHE_KEY, facets, FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_facets():
+    cache.delete(FACETS_CACHE_KEY)
+
+
+def catalogue_page(params, per_page=CATALOGUE_PER_PAGE):
+    """The page of approved courses for ``params`` (request.GET) and the facets around it."""
+    facets = category_facets()
+    category_id = params.get('category')
+    # isdecimal, not isdigit: int('²') raises
+    category_id = int(category_id) if category_id and category_id.isdecimal() else None
+    page = keyset_paginate(approved_courses(category_id), params, per_page=per_page)
+    images.attach(page)
+    return {
+        'courses': page,
+        'page': page,
+        'facets': facets,
+        'total_courses': sum(f['count'] for f in facets),
+        'category_id': category_id,
+        # Carried through the sort and page links
+        'keyset_query': f'&category={category_id}' if category_id else '',
+    }
@@ -0,0 +1,165 @@
+"""
+Certificate PDFs for completed course enrollments and approved internships.
+
+A certificate is rendered once, by a background job queued with the
+completion, and stored in content-addressed media storage under
+``cert_<sha256 prefix>_<certificate id>.pdf``. The name changes whenever
+the content does, so the file is served with a year-long immutable
+Cache-Control and a cohort finishing at once costs one render each.
+
+``render_cohort`` (the ``render_certificates`` command) pre-renders many
+certificates, building the PDFs in a process pool while this process reads
+enrollments and writes files.
+
+Without reportlab or the certificate fonts (see ``available``) nothing is
+rendered or queued, and students keep the HTML certificate.
+"""
+import functools
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import dateformat, timezone
+
+from . import jobs, pdf, storage, verification
+from .models import Enrollment, InternshipEnrollment
+from .passwords import default_workers
+
+FILE_PREFIX = 'cert_'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+COHORT_BATCH_SIZE = 200
+JOB_PRIORITY = 10  # Ahead of broadcasts and imports: a student is waiting for it
+
+KINDS = {'course': Enrollment, 'internship': InternshipEnrollment}
+_RELATED = {
+    'course': ('student', 'course__instructor'),
+    'internship': ('student', 'internship__instructor'),
+}
+
+
+def available():
+    return pdf.available(settings.CERTIFICATE_FONTS)
+
+
+def _renderer():
+    # A partial of a module-level function pickles, so it crosses into the process pool
+    return functools.partial(pdf.certificate_pdf, fonts=dict(settings.CERTIFICATE_FONTS))
+
+
+def kind_of(enrollment):
+    return 'course' if isinstance(enrollment, Enrollment) else 'internship'
+
+
+def enrollments(kind):
+    return KINDS[kind].objects.select_related(*_RELATED[kind])
+
+
+def certificate_fields(enrollment):
+    """The plain dict pdf.certificate_pdf renders, matching the HTML certificate."""
+    kind = kind_of(enrollment)
+    subject = enrollment.course if kind == 'course' else enrollment.internship
+    student = enrollment.student
+    instructor = subject.instructor
+    if instructor:
+        signed_by = (instructor.full_name or instructor.username).title()
+    else:
+        signed_by = 'E-Learning Instructor' if kind == 'course' else 'E-Learning Admin'
+    completed_at = enrollment.completed_at or timezone.now()
+    return {
+        'name': student.full_name or student.username,
+        'kind': kind,
+        'title': subject.title.title(),
+        'completed_on': dateformat.format(timezone.localtime(completed_at), 'F d, Y'),
+        'certificate_id': enrollment.certificate_id,
+        'instructor': signed_by,
+    }
+
+
+def store(enrollment, data):
+    """Save rendered PDF bytes under their content address and point the enrollment at them."""
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{FILE_PREFIX}{digest[:16]}_{enrollment.certificate_id}.pdf"
+    old = enrollment.certificate_file
+    if old == name and storage.exists(name):
+        return name
+    if not storage.exists(name):
+        try:
+            storage.save([data], name)
+        except IntegrityError:
+            pass  # Rendered concurrently; same name, same bytes
+    with transaction.atomic():
+        type(enrollment).objects.filter(pk=enrollment.pk).update(certificate_file=name)
+        # update() skips the signals, so drop the cached verification (it links the PDF) here
+        verification.invalidate(enrollment.certificate_id)
+        if old and old != name:
+            transaction.on_commit(lambda: storage.delete(old))
+    enrollment.certificate_file = name
+    return name
+
+
+def render(enrollment, force=False):
+    """Render and store ``enrollment``'s certificate unless it already has one. Returns the file name."""
+    if not enrollment.certificate_id or not available():
+        return None
+    if enrollment.certificate_file and not force and storage.exists(enrollment.certificate_file):
+        return enrollment.certificate_file
+    return store(enrollment, _renderer()(certificate_fields(enrollment)))
+
+
+@jobs.task
+def _render_by_id(kind, pk):
+    enrollment = enrollments(kind).filter(pk=pk).first()
+    if enrollment:
+        render(enrollment)
+
+
+def schedule(enrollment):
+    """Queue a job to render the certificate; it becomes visible to workers when the transaction commits."""
+    if not available():
+        return
+    jobs.enqueue(_render_by_id, kind_of(enrollment), enrollment.pk, priority=JOB_PRIORITY)
+
+
+def _render_batch(batch, executor):
+    fields = [certificate_fields(e) for e in batch]
+    if executor is None:
+        rendered = map(_renderer(), fields)
+    else:
+        rendered = executor.map(_renderer(), fields, chunksize=16)
+    for enrollment, data in zip(batch, rendered):
+        store(enrollment, data)
+
+
+def render_cohort(kind, queryset=None, workers=None, batch_size=COHORT_BATCH_SIZE, force=False):
+    """
+    Render every certificate of ``kind`` in ``queryset`` (default: all) that
+    is issued but not yet rendered, or all issued ones with ``force``.
+    ``workers=0`` renders in-process. Returns the number rendered.
+    """
+    if not available():
+        return 0
+    pending = (queryset if queryset is not None else KINDS[kind].objects.all()).exclude(certificate_id=None)
+    if not force:
+        pending = pending.filter(certificate_file=None)
+    pending = pending.select_related(*_RELATED[kind]).order_by('pk')
+
+    workers = default_workers() if workers is None else workers
+    executor = None
+    if workers > 0:
+        # Spawned, like the import workers; pdf.py needs no Django setup
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    count = 0
+    last_pk = 0
+    try:
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return count
+            _render_batch(batch, executor)
+            count += len(batch)
+            last_pk = batch[-1].pk
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,6 @@
+from . import events
+
+
+def live_events(request):
+    """``live_events``: whether pages may open the notification stream (only when served over ASGI)."""
+    return {'live_events': events.streaming_supported(request)}
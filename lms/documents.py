@@ -0,0 +1,180 @@
+"""
+Page count, size, text and a first-page preview for PDF lesson notes and
+internship materials.
+
+Each uploaded PDF is read once, by a background job queued when a lesson or
+material pointing at an unprocessed PDF is saved, and the facts are kept in
+a PdfDocument row keyed by the file's logical name. Pages then show a
+thumbnail and "12 pages · 3.4 MB" next to the download link, and search
+matches text inside the PDF, without opening the file during a request.
+
+Page count and text come from pypdf, the preview from poppler's pdftoppm.
+Both are optional: without pypdf only the size is recorded, without
+pdftoppm there is no preview.
+"""
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+
+from django.db import transaction
+
+from . import jobs, search, storage
+from .models import InternshipMaterial, Lesson, PdfDocument
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+PREVIEW_WIDTH = 240
+PREVIEW_TIMEOUT = 30  # Seconds; a pathological page must not hold a worker thread
+TEXT_PAGES = 50  # Only the first pages are read for search
+TEXT_LENGTH = 100_000
+
+_UNSAFE_RE = re.compile(r'[^\w-]+')
+_SPACE_RE = re.compile(r'[\s\x00]+')
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def available():
+    return PdfReader is not None
+
+
+def is_pdf(name):
+    return bool(name) and name.lower().endswith('.pdf')
+
+
+def _preview_name(source):
+    # Keeps the source's prefix, so previews of private notes stay private (see views.PRIVATE_MEDIA_PREFIXES)
+    stem = _UNSAFE_RE.sub('-', os.path.basename(source)).strip('-') or 'document'
+    return f"{stem}_p1.png"
+
+
+def _read(path):
+    """(pages, text) of the PDF at ``path``; (None, '') without pypdf or for a file it cannot parse."""
+    if not available():
+        return None, ''
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt('')  # Many PDFs are encrypted with an empty user password
+        pages = len(reader.pages)
+        parts = []
+        length = 0
+        for page in reader.pages[:TEXT_PAGES]:
+            part = _SPACE_RE.sub(' ', page.extract_text() or '').strip()
+            parts.append(part)
+            length += len(part)
+            if length >= TEXT_LENGTH:
+                break
+    except Exception:
+        # pypdf raises all kinds of errors on damaged or locked files; the size is still worth recording
+        return None, ''
+    return pages, '\n'.join(filter(None, parts))[:TEXT_LENGTH]
+
+
+def _render_preview(path):
+    """PNG bytes of the first page, PREVIEW_WIDTH pixels wide, or None without pdftoppm or on failure."""
+    pdftoppm = shutil.which('pdftoppm')
+    if not pdftoppm:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'preview')
+        try:
+            subprocess.run(
+                [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-png',
+                 '-scale-to-x', str(PREVIEW_WIDTH), '-scale-to-y', '-1', path, out],
+                check=True, capture_output=True, timeout=PREVIEW_TIMEOUT,
+            )
+            with open(out + '.png', 'rb') as f:
+                return f.read()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def png_size(data):
+    """(width, height) from a PNG's IHDR chunk, or None if ``data`` is not a PNG."""
+    if len(data) < 24 or not data.startswith(_PNG_SIGNATURE):
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def _reindex(source):
+    # The extracted text is part of these rows' search documents
+    for lesson in Lesson.objects.filter(notes_file=source):
+        search.index_lesson(lesson)
+    for material in InternshipMaterial.objects.filter(file_path=source):
+        search.index_material(material)
+
+
+def extract(source, force=False):
+    """
+    Record the size, page count, text and preview of the stored PDF
+    ``source``, unless already done. Returns the PdfDocument, or None if
+    ``source`` is not a PDF or the file is missing.
+    """
+    path = storage.path(source) if is_pdf(source) else None
+    if not path:
+        return None
+    document = PdfDocument.objects.filter(name=source).first()
+    if document and not force:
+        return document
+
+    pages, text = _read(path)
+    fields = {
+        'size': os.path.getsize(path), 'pages': pages, 'text': text,
+        'preview': None, 'preview_width': None, 'preview_height': None,
+    }
+    preview = _render_preview(path)
+    size = png_size(preview) if preview else None
+    name = _preview_name(source)
+    if storage.exists(name):
+        storage.delete(name)
+    if size:
+        storage.save([preview], name)
+        fields.update(preview=name, preview_width=size[0], preview_height=size[1])
+
+    with transaction.atomic():
+        document, _ = PdfDocument.objects.update_or_create(name=source, defaults=fields)
+        _reindex(source)
+    return document
+
+
+@jobs.task
+def _extract(source):
+    extract(source)
+
+
+def schedule(source):
+    """Queue extraction for an uploaded PDF ``source`` unless it has been done."""
+    if not is_pdf(source) or PdfDocument.objects.filter(name=source).exists():
+        return
+    if storage.path(source):
+        jobs.enqueue(_extract, source)
+
+
+def release(source):
+    """Forget ``source`` and delete its preview (the PDF itself was deleted)."""
+    document = PdfDocument.objects.filter(name=source).first()
+    if document:
+        document.delete()
+        if document.preview:
+            storage.delete(document.preview)
+
+
+def attach(rows, field):
+    """
+    Set ``row.pdf`` (a PdfDocument without its text, or None) on each row,
+    for the PDF named in its ``field``, from one query.
+    """
+    rows = list(rows)
+    names = {getattr(row, field) for row in rows} - {None, ''}
+    documents = {}
+    if names:
+        documents = {d.name: d for d in PdfDocument.objects.filter(name__in=names).defer('text')}
+    for row in rows:
+        row.pdf = documents.get(getattr(row, field))
+    return rows
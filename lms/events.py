@@ -0,0 +1,163 @@
+"""
+Server-Sent Events for students.
+
+``hub`` keeps, per student, the queues of the streams that student has open.
+Publishing is safe from any thread (views, signal handlers, background
+threads): each event is handed to the stream's own event loop with
+call_soon_threadsafe. Streams are plain coroutines waiting on their queue,
+so idle connections cost a small queue and no thread.
+
+Queues are bounded. A stream that falls behind drops the overflow and, on
+its next turn, re-reads the notifications it missed from the database,
+which is also how ``Last-Event-ID`` resumes a reconnecting client. The hub
+is per process; events published by other workers reach a client when it
+reconnects.
+
+Streaming needs ASGI. Under WSGI Django would drain the endless generator
+before sending a byte and hold a worker thread for good, so pages only open
+the stream when served over ASGI and otherwise poll the unread count.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+
+from .models import Notification
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 5000
+BACKLOG_LIMIT = 100
+
+
+def streaming_supported(request):
+    return isinstance(request, ASGIRequest)
+
+
+class Subscription:
+    def __init__(self, student_id, loop):
+        self.student_id = student_id
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Hub:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, student_id):
+        sub = Subscription(student_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[student_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.student_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.student_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, student_ids, event):
+        with self._lock:
+            subs = [sub for pk in student_ids for sub in self._subscribers.get(pk, ())]
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:
+                # The stream's loop has shut down; it unsubscribes on its way out
+                pass
+
+
+hub = Hub()
+
+
+def publish_on_commit(student_ids, event):
+    """Publish once the surrounding transaction commits, so clients can re-read the rows."""
+    student_ids = list(student_ids)
+    transaction.on_commit(lambda: hub.publish(student_ids, event))
+
+
+def publish_notifications_on_commit(notifications):
+    pending = [(n.student_id, notification_event(n)) for n in notifications]
+
+    def send():
+        for student_id, event in pending:
+            hub.publish([student_id], event)
+
+    transaction.on_commit(send)
+
+
+def notification_event(notification):
+    return {
+        'id': notification.id,
+        'event': 'notification',
+        'data': {
+            'id': notification.id,
+            'message': notification.message,
+            'created_at': notification.created_at.isoformat(),
+        },
+    }
+
+
+def format_event(event):
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _missed(student_id, after_id):
+    rows = Notification.objects.filter(student_id=student_id, id__gt=after_id).order_by('id')[:BACKLOG_LIMIT]
+    return [notification_event(n) async for n in rows]
+
+
+async def stream(student_id, last_event_id=0, heartbeat=HEARTBEAT_SECONDS):
+    """Async generator of SSE frames for one connected student."""
+    # Subscribe before reading the backlog so nothing lands in between
+    sub = hub.subscribe(student_id)
+    last_id = last_event_id
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        catch_up = bool(last_id)
+        while True:
+            if catch_up or sub.overflowed:
+                if sub.overflowed:
+                    # Whatever is still queued is older than what we re-read now
+                    sub.overflowed = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                pending = await _missed(student_id, last_id)
+                catch_up = len(pending) == BACKLOG_LIMIT
+            else:
+                try:
+                    pending = [await asyncio.wait_for(sub.queue.get(), heartbeat)]
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+            for event in pending:
+                if event.get('id') is not None:
+                    if event['id'] <= last_id:
+                        continue
+                    last_id = event['id']
+                yield format_event(event)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,176 @@
+"""
+Responsive course images.
+
+Each uploaded course image is resized once, by a background job queued
+when a course with an unprocessed image is saved, into WebP and JPEG copies
+at a few widths. EXIF orientation is applied and all metadata (EXIF, GPS,
+ICC, comments) is dropped from the copies. Each variant's stored name and
+pixel size is recorded as an ImageVariant, and templates build
+``<picture>`` / ``srcset`` markup from those rows (see course_image.html),
+so a catalogue card loads a ~30 KB image rather than the multi-MB original.
+
+Pillow is optional. Without it no variants are made and pages keep using
+the original file.
+"""
+import io
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import transaction
+
+from . import jobs, pagecache, storage
+from .models import Course, ImageVariant
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = ImageOps = None
+
+WIDTHS = (320, 640, 960)
+FORMATS = ('webp', 'jpeg')
+QUALITY = {'webp': 80, 'jpeg': 82}
+DEFAULT_IMAGE = 'default.jpg'  # The shared placeholder, served as a static file
+
+_UNSAFE_RE = re.compile(r'[^\w-]+')
+
+
+def available():
+    return Image is not None
+
+
+def _variant_name(source, width, fmt):
+    # The original's extension stays in the stem so photo.png and photo.jpg don't collide
+    stem = _UNSAFE_RE.sub('-', os.path.basename(source)).strip('-') or 'image'
+    return f"{stem}_{width}w.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def _open(path, largest):
+    image = Image.open(path)
+    if image.format == 'JPEG':
+        # Let libjpeg decode at a reduced scale: far less work for big photos
+        image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def _flatten(image):
+    # JPEG has no alpha channel; composite onto white rather than black
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _encode(image, fmt):
+    out = io.BytesIO()
+    if fmt == 'jpeg':
+        _flatten(image).save(out, 'JPEG', quality=QUALITY[fmt], optimize=True, progressive=True)
+    else:
+        image.save(out, 'WEBP', quality=QUALITY[fmt], method=4)
+    return out.getvalue()
+
+
+def generate_variants(source, force=False):
+    """
+    Make the missing variants of the stored image ``source``. Returns how many
+    were written; 0 if Pillow is missing or the file is not a readable image.
+    """
+    if not available() or not source:
+        return 0
+    path = storage.path(source)
+    if not path:
+        return 0
+    existing = set(ImageVariant.objects.filter(source=source).values_list('format', 'width'))
+    if existing and not force:
+        return 0
+    try:
+        image = _open(path, max(WIDTHS))
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return 0
+
+    # Never upscale: narrower originals get one variant at their own width
+    widths = [w for w in WIDTHS if w < image.width] or [image.width]
+    rows = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in FORMATS:
+            name = _variant_name(source, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save([_encode(resized, fmt)], name)
+            rows.append(ImageVariant(source=source, format=fmt, width=width, height=height, name=name))
+
+    with transaction.atomic():
+        ImageVariant.objects.filter(source=source).delete()
+        ImageVariant.objects.bulk_create(rows)
+    # Pages cached before the variants existed still point at the original
+    course_ids = Course.objects.filter(image_file=source).values_list('id', flat=True)
+    pagecache.bump('catalogue', *(f'course:{pk}' for pk in course_ids))
+    return len(rows)
+
+
+@jobs.task
+def _generate(source):
+    generate_variants(source)
+
+
+def schedule(source):
+    """Queue variant generation for an uploaded ``source`` unless it already has variants."""
+    if not available() or not source or source == DEFAULT_IMAGE or not storage.path(source):
+        return
+    if not ImageVariant.objects.filter(source=source).exists():
+        jobs.enqueue(_generate, source)
+
+
+def release(source):
+    """Delete the variants of ``source`` (its course image was deleted)."""
+    names = list(ImageVariant.objects.filter(source=source).values_list('name', flat=True))
+    ImageVariant.objects.filter(source=source).delete()
+    for name in names:
+        storage.delete(name)
+
+
+def _url(name):
+    return settings.MEDIA_URL + quote(name)
+
+
+def sources(names):
+    """
+    {source: {'webp', 'jpeg' (srcset strings), 'src', 'width', 'height'}}
+    for the given originals, from one query. Originals without variants are
+    left out.
+    """
+    by_source = {}
+    for variant in ImageVariant.objects.filter(source__in=set(filter(None, names))).order_by('width'):
+        by_source.setdefault(variant.source, []).append(variant)
+    pictures = {}
+    for source, variants in by_source.items():
+        jpegs = [v for v in variants if v.format == 'jpeg']
+        webps = [v for v in variants if v.format == 'webp']
+        if not jpegs:
+            continue
+        largest = jpegs[-1]
+        pictures[source] = {
+            'jpeg': ', '.join(f'{_url(v.name)} {v.width}w' for v in jpegs),
+            'webp': ', '.join(f'{_url(v.name)} {v.width}w' for v in webps),
+            'src': _url(largest.name),
+            'width': largest.width,
+            'height': largest.height,
+        }
+    return pictures
+
+
+def attach(courses):
+    """Set ``course.picture`` (or None) on each course for course_image.html."""
+    courses = list(courses)
+    pictures = sources([c.image_file for c in courses])
+    for course in courses:
+        course.picture = pictures.get(course.image_file)
+    return courses
@@ -0,0 +1,190 @@
+"""
+Bulk student/instructor import.
+
+Rows are validated and checked against existing usernames/emails one batch at
+a time (one IN query per column). Password hashing is the expensive part, so
+each batch's passwords are hashed across a process pool before the batch is
+written with bulk_create. The insert and the job's progress counters commit
+together, so an interrupted import resumes after the last committed batch.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs
+from .models import ImportJob, Instructor, Student
+from .passwords import default_workers, hash_passwords, init_worker
+
+BATCH_SIZE = 500
+ERROR_SAMPLE_SIZE = 50
+JOB_PRIORITY = -10  # Long-running and nobody waits on the page; let shorter jobs go first
+
+ROLE_MODELS = {'student': Student, 'instructor': Instructor}
+
+
+def import_dir():
+    # Not reachable through media_file, which only serves top-level names
+    path = os.path.join(settings.MEDIA_ROOT, '.imports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_upload(uploaded_file):
+    path = os.path.join(import_dir(), f"{uuid.uuid4().hex}.csv")
+    with open(path, 'wb') as out:
+        for chunk in uploaded_file.chunks():
+            out.write(chunk)
+    return path
+
+
+def _validate(row, role):
+    username = (row.get('username') or '').strip()
+    email = (row.get('email') or '').strip()
+    password = (row.get('password') or '').strip()
+    if not username:
+        return None, "missing username"
+    if not password:
+        return None, "missing password"
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            return None, "invalid email"
+    elif role == 'student':
+        return None, "missing email"
+    return {
+        'username': username,
+        'email': email or None,
+        'password': password,
+        'full_name': (row.get('full_name') or '').strip() or None,
+    }, None
+
+
+def _prepare(model, role, rows):
+    """Validate a batch of (line, row); returns (accounts, skipped, errors)."""
+    errors = []
+    candidates = []
+    for line, row in rows:
+        account, error = _validate(row, role)
+        if error:
+            errors.append([line, error])
+        else:
+            candidates.append(account)
+
+    usernames = [a['username'] for a in candidates]
+    emails = [a['email'] for a in candidates if a['email']]
+    taken_usernames = set(model.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_emails = set(model.objects.filter(email__in=emails).values_list('email', flat=True)) if emails else set()
+
+    accounts = []
+    skipped = 0
+    for account in candidates:
+        if account['username'] in taken_usernames or (account['email'] and account['email'] in taken_emails):
+            skipped += 1
+            continue
+        # Later duplicates inside the file are skipped like existing accounts
+        taken_usernames.add(account['username'])
+        if account['email']:
+            taken_emails.add(account['email'])
+        accounts.append(account)
+    return accounts, skipped, errors
+
+
+def _rows(path, start):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            if index >= start:
+                # Line numbers count the header as line 1
+                yield index + 2, {(k or '').strip().lower(): v for k, v in row.items()}
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _commit_batch(job, model, accounts, hashed, skipped, errors, rows):
+    objs = [
+        model(username=a['username'], email=a['email'], full_name=a['full_name'], password_hash=h)
+        for a, h in zip(accounts, hashed)
+    ]
+    with transaction.atomic():
+        model.objects.bulk_create(objs, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        # Rows that lost a race with a concurrent signup were ignored above
+        created = model.objects.filter(username__in=[a['username'] for a in accounts]).filter(
+            password_hash__in=hashed
+        ).count() if accounts else 0
+
+        sample = json.loads(job.errors)
+        sample.extend(errors[:ERROR_SAMPLE_SIZE - len(sample)])
+        job.rows_processed += rows
+        job.created += created
+        job.skipped += skipped + len(accounts) - created
+        job.invalid += len(errors)
+        job.errors = json.dumps(sample)
+        job.updated_at = timezone.now()
+        job.save(update_fields=['rows_processed', 'created', 'skipped', 'invalid', 'errors', 'updated_at'])
+
+
+def run_job(job, workers=None, batch_size=BATCH_SIZE):
+    """Process ``job`` from its saved resume point. ``workers=0`` hashes in-process."""
+    model = ROLE_MODELS[job.role]
+    workers = default_workers() if workers is None else workers
+    job.status = 'Running'
+    job.updated_at = timezone.now()
+    job.save(update_fields=['status', 'updated_at'])
+
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker
+        )
+    try:
+        for batch in _batches(_rows(job.source_path, job.rows_processed), batch_size):
+            accounts, skipped, errors = _prepare(model, job.role, batch)
+            # Hash outside the transaction; it is by far the slowest step
+            hashed = hash_passwords([a['password'] for a in accounts], executor, workers)
+            _commit_batch(job, model, accounts, hashed, skipped, errors, len(batch))
+    except Exception as exc:
+        job.status = 'Failed'
+        job.errors = json.dumps(json.loads(job.errors) + [[None, str(exc)]])
+        job.save(update_fields=['status', 'errors'])
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    job.status = 'Completed'
+    job.updated_at = timezone.now()
+    job.save(update_fields=['status', 'updated_at'])
+    # Uploaded sheets hold plaintext passwords; drop them once imported
+    if os.path.dirname(job.source_path) == import_dir():
+        os.remove(job.source_path)
+    return job
+
+
+@jobs.task
+def _run_by_id(job_id):
+    job = ImportJob.objects.filter(id=job_id).first()
+    if job and job.status != 'Completed':
+        run_job(job)
+
+
+def start_job(job):
+    """Queue ``job`` for a worker; it resumes from its last committed batch if retried."""
+    jobs.enqueue(_run_by_id, job.id, priority=JOB_PRIORITY)
@@ -0,0 +1,250 @@
+"""
+Persistent background jobs, run by ``manage.py run_worker``.
+
+Slow work is queued as a Job row, in the same transaction as the data it
+acts on, and workers claim rows straight from the table, so there is no
+broker to run and nothing is lost on a restart.
+
+Claiming differs by database. Where SELECT ... FOR UPDATE SKIP LOCKED is
+available (PostgreSQL), a worker locks a batch of ready rows, skipping the
+ones other workers hold, and marks them Running. SQLite has no row locks
+but serializes writers, so a worker claims with one conditional UPDATE over
+the next ready ids; a row another worker took first no longer matches.
+Either way each claim gets a lease (locked_until) that the worker renews
+while the job runs, and jobs of a worker that died are requeued once their
+lease runs out.
+
+A failing job is retried with exponential backoff until max_attempts.
+"database is locked" is contention rather than a fault of the task, so a
+job that hits it is retried shortly without spending an attempt, and on
+SQLite, where writers queue for one lock, workers default to one thread.
+Tasks are plain functions marked with @task and queued with enqueue().
+A job can run more than once (a retry, or a lease that ran out under a
+slow job), so tasks must be safe to repeat.
+"""
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+DEFAULT_PRIORITY = 0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_CONCURRENCY = 4  # One on SQLite, see default_concurrency()
+POLL_INTERVAL = 1.0
+LEASE_SECONDS = 5 * 60
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+LOCKED_RETRY_SECONDS = 1
+FINISH_TRIES = 5
+RETENTION_DAYS = 7
+ERROR_LENGTH = 4000
+
+
+def default_concurrency():
+    # SQLite lets one writer in at a time; more threads only wait on each other for the lock
+    return 1 if connection.vendor == 'sqlite' else DEFAULT_CONCURRENCY
+
+
+def is_locked(exc):
+    """True for the OperationalError SQLite raises when another writer holds the lock too long."""
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+def task(func):
+    """Mark ``func`` as runnable by workers; only marked functions are ever imported and called."""
+    func.is_job_task = True
+    return func
+
+
+def task_name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def resolve(name):
+    func = import_string(name)
+    if not getattr(func, 'is_job_task', False):
+        raise ImportError(f"{name} is not a job task")
+    return func
+
+
+def enqueue(func, *args, priority=DEFAULT_PRIORITY, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue ``func(*args)``; ``args`` must be JSON-serializable. Returns the Job."""
+    if not getattr(func, 'is_job_task', False):
+        raise ValueError(f"{task_name(func)} is not a job task")
+    return Job.objects.create(
+        task=task_name(func),
+        args=json.dumps(list(args)),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempt):
+    """Seconds to wait before retry number ``attempt``, with +/-20% jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempt - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_expired():
+    """Give jobs whose worker stopped renewing its lease to another worker (or fail them)."""
+    now = timezone.now()
+    expired = Job.objects.filter(status='Running', locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='Failed', locked_by=None, locked_until=None, last_error='Lease expired', updated_at=now
+    )
+    requeued = expired.update(status='Queued', locked_by=None, locked_until=None, updated_at=now)
+    return requeued + failed
+
+
+def claim(worker_id, limit=1, lease=LEASE_SECONDS):
+    """Claim up to ``limit`` ready jobs for ``worker_id``, highest priority first."""
+    now = timezone.now()
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    claimed = {
+        'status': 'Running',
+        'locked_by': token,
+        'locked_until': now + timedelta(seconds=lease),
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+    ready = Job.objects.filter(status='Queued', run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if ids:
+                Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        # A single statement, so SQLite takes the write lock once and rival claims wait their turn
+        Job.objects.filter(status='Queued', id__in=ready.values('id')[:limit]).update(**claimed)
+    return list(Job.objects.filter(status='Running', locked_by=token).order_by('-priority', 'run_at', 'id'))
+
+
+def renew(tokens, lease=LEASE_SECONDS):
+    if tokens:
+        Job.objects.filter(status='Running', locked_by__in=tokens).update(
+            locked_until=timezone.now() + timedelta(seconds=lease)
+        )
+
+
+def _finish(job, **changes):
+    # Guarded by the claim token: a job whose lease was lost belongs to another worker now
+    changes.update(locked_by=None, locked_until=None, updated_at=timezone.now())
+    for attempt in range(1, FINISH_TRIES + 1):
+        try:
+            Job.objects.filter(pk=job.pk, status='Running', locked_by=job.locked_by).update(**changes)
+            return
+        except OperationalError as exc:
+            if not is_locked(exc) or attempt == FINISH_TRIES:
+                raise
+            time.sleep(LOCKED_RETRY_SECONDS * random.uniform(0.5, 1.5))
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns True if it succeeded."""
+    try:
+        resolve(job.task)(*json.loads(job.args))
+    except Exception as exc:
+        error = traceback.format_exc()[-ERROR_LENGTH:]
+        if is_locked(exc):
+            _finish(
+                job, status='Queued', last_error=error, attempts=F('attempts') - 1,
+                run_at=timezone.now() + timedelta(seconds=LOCKED_RETRY_SECONDS),
+            )
+        elif job.attempts >= job.max_attempts:
+            _finish(job, status='Failed', last_error=error)
+        else:
+            _finish(
+                job, status='Queued', last_error=error,
+                run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        return False
+    _finish(job, status='Completed', completed_at=timezone.now())
+    return True
+
+
+def purge_finished(days=RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    return Job.objects.filter(status='Completed', completed_at__lt=cutoff).delete()[0]
+
+
+class Worker:
+    """
+    Claims jobs and runs them on ``concurrency`` threads (default_concurrency()
+    if not given). ``run(burst=True)`` returns once the queue has no ready
+    jobs; otherwise it polls until stop() is called, then lets the running
+    jobs finish.
+    """
+
+    def __init__(self, concurrency=None, poll_interval=POLL_INTERVAL, lease=LEASE_SECONDS, name=None):
+        self.concurrency = concurrency or default_concurrency()
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self.failed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _execute(self, job):
+        try:
+            return run(job)
+        except Exception:
+            # Recording the outcome failed; the lease runs out and the job is retried
+            return False
+        finally:
+            connection.close()
+
+    def _claim(self, limit):
+        try:
+            requeue_expired()
+            return claim(self.name, limit, self.lease)
+        except OperationalError:
+            # Typically "database is locked" while another writer commits; try again next poll
+            return []
+
+    def run(self, burst=False):
+        purge_finished()
+        running = {}
+        last_renewal = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job') as pool:
+            while not self._stopping.is_set():
+                for future in [f for f in running if f.done()]:
+                    del running[future]
+                    self.processed += 1
+                    self.failed += not future.result()
+
+                claimed = self._claim(self.concurrency - len(running)) if len(running) < self.concurrency else []
+                for job in claimed:
+                    running[pool.submit(self._execute, job)] = job
+
+                if burst and not running:
+                    break
+                if time.monotonic() - last_renewal > self.lease / 3:
+                    renew([job.locked_by for job in running.values()], self.lease)
+                    last_renewal = time.monotonic()
+                close_old_connections()
+                if not claimed:
+                    if running:
+                        wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    else:
+                        self._stopping.wait(self.poll_interval)
+            for future in running:
+                self.processed += 1
+                self.failed += not future.result()
+        return self.processed
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import bulk
+from lms.models import Course, Internship
+
+
+class Command(BaseCommand):
+    help = "Enroll the students listed in a CSV (username or email per row) into courses/internships."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--course', type=int, action='append', default=[], dest='courses')
+        parser.add_argument('--internship', type=int, action='append', default=[], dest='internships')
+        parser.add_argument('--batch-size', type=int, default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        courses = list(Course.objects.filter(id__in=options['courses']).values_list('id', flat=True))
+        internships = list(Internship.objects.filter(id__in=options['internships']).values_list('id', flat=True))
+        missing = (set(options['courses']) - set(courses)) | (set(options['internships']) - set(internships))
+        if missing:
+            raise CommandError(f"Unknown course/internship ids: {sorted(missing)}")
+        if not courses and not internships:
+            raise CommandError("Pass at least one --course or --internship.")
+
+        with open(options['csv_path'], encoding='utf-8-sig', newline='') as f:
+            result = bulk.bulk_enroll(
+                bulk.iter_identifiers(f), courses, internships, batch_size=options['batch_size']
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['rows']} rows: {result['created']} created, {result['skipped']} skipped, "
+            f"{result['unknown']} unknown."
+        ))
+        for identifier in result['unknown_sample']:
+            self.stdout.write(f"  unknown: {identifier}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from lms import documents
+from lms.models import InternshipMaterial, Lesson
+
+
+class Command(BaseCommand):
+    help = "Record page count, size, text and a first-page preview for every lesson notes and material PDF."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Extract again PDFs that were already processed.")
+
+    def handle(self, *args, **options):
+        if not documents.available():
+            self.stderr.write("pypdf is not installed; only file sizes will be recorded (pip install pypdf).")
+        sources = set(Lesson.objects.exclude(notes_file=None).values_list('notes_file', flat=True))
+        sources |= set(InternshipMaterial.objects.values_list('file_path', flat=True))
+        done = 0
+        for source in sorted(filter(documents.is_pdf, sources)):
+            document = documents.extract(source, force=options['force'])
+            if document:
+                done += 1
+                pages = document.pages if document.pages is not None else '?'
+                preview = 'preview' if document.preview else 'no preview'
+                self.stdout.write(f"  {source}: {pages} page(s), {document.size} bytes, {preview}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} PDF(s)."))
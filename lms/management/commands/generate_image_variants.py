@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import images
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = "Create the resized WebP/JPEG variants of every course image that has none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist.")
+
+    def handle(self, *args, **options):
+        if not images.available():
+            raise CommandError("Pillow is not installed; image variants need it (pip install Pillow).")
+
+        sources = list(Course.objects.exclude(image_file=None).values_list('image_file', flat=True).distinct())
+        done = 0
+        for source in sources:
+            written = images.generate_variants(source, force=options['force'])
+            if written:
+                done += 1
+                self.stdout.write(f"  {source}: {written} variant(s)")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} image(s)."))
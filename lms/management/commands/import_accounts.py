@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import imports, passwords
+from lms.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = ("Import students or instructors from a CSV with username,email,password,full_name columns. "
+            "Interrupted imports continue from the last committed batch with --resume.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='?')
+        parser.add_argument('--role', choices=sorted(imports.ROLE_MODELS), default='student')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Continue an unfinished import job.")
+        parser.add_argument('--workers', type=int, default=passwords.default_workers(),
+                            help="Password hashing processes (0 hashes in-process).")
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = ImportJob.objects.get(id=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"No import job {options['resume']}.")
+            if job.status == 'Completed':
+                raise CommandError(f"Import job {job.id} already completed.")
+            self.stdout.write(f"Resuming job {job.id} after {job.rows_processed} rows.")
+        elif options['csv_path']:
+            path = os.path.abspath(options['csv_path'])
+            if not os.path.exists(path):
+                raise CommandError(f"{path} does not exist.")
+            job = ImportJob.objects.create(role=options['role'], source_path=path)
+            self.stdout.write(f"Started import job {job.id}.")
+        else:
+            raise CommandError("Pass a CSV path or --resume JOB_ID.")
+
+        imports.run_job(job, workers=options['workers'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{job.rows_processed} rows: {job.created} created, {job.skipped} skipped, {job.invalid} invalid."
+        ))
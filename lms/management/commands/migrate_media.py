@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lms import storage
+from lms.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = "Move flat MEDIA_ROOT uploads into the content-addressed blob store."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--legacy', action='store_true',
+                            help="Also copy files from lms/static/uploads (left in place).")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change.")
+
+    def handle(self, *args, **options):
+        sources = [(settings.MEDIA_ROOT, True)]
+        if options['legacy']:
+            sources.append((storage.LEGACY_UPLOAD_DIR, False))
+
+        migrated = duplicates = skipped = saved_bytes = 0
+        seen = set()
+        for root, move in sources:
+            if not os.path.isdir(root):
+                continue
+            for entry in sorted(os.scandir(root), key=lambda e: e.name):
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                if storage.exists(entry.name):
+                    skipped += 1
+                    continue
+
+                digest, size = storage.hash_file(entry.path)
+                is_duplicate = digest in seen or MediaBlob.objects.filter(sha256=digest).exists()
+                seen.add(digest)
+                if is_duplicate:
+                    duplicates += 1
+                    saved_bytes += size
+
+                if options['dry_run']:
+                    self.stdout.write(f"{entry.name} -> {digest}{' (duplicate)' if is_duplicate else ''}")
+                elif move:
+                    storage.save_file(entry.path, entry.name, digest=digest, size=size)
+                else:
+                    with open(entry.path, 'rb') as f:
+                        storage.save(iter(lambda: f.read(storage.READ_SIZE), b''), entry.name)
+                migrated += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{migrated} files migrated, {duplicates} duplicates ({saved_bytes} bytes saved), "
+            f"{skipped} already stored."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from lms import notifications
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications older than --days, a small batch per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=notifications.RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=notifications.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Seconds to sleep between batches so other writers can take the lock.")
+
+    def handle(self, *args, **options):
+        deleted = notifications.purge_read(options['days'], options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} read notification(s)."))
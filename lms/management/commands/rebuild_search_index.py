@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lms import search
+
+
+class Command(BaseCommand):
+    help = "Drop and rebuild the full-text search index from courses, lessons, internships and projects."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=search.REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = search.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} document(s)."))
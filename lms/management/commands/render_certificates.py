@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import certificates
+from lms.models import Enrollment, InternshipEnrollment
+
+
+class Command(BaseCommand):
+    help = "Pre-render certificate PDFs for a course or internship cohort (default: every issued certificate)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help="Only this course's completed enrollments.")
+        parser.add_argument('--internship', type=int, help="Only this internship's approved enrollments.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Rendering processes (default: one per CPU, 0 renders in this process).")
+        parser.add_argument('--batch-size', type=int, default=certificates.COHORT_BATCH_SIZE)
+        parser.add_argument('--force', action='store_true', help="Re-render certificates that already have a PDF.")
+
+    def handle(self, *args, **options):
+        if options['course'] and options['internship']:
+            raise CommandError("Pass --course or --internship, not both.")
+        if not certificates.available():
+            raise CommandError("Certificate PDFs need reportlab and the fonts in settings.CERTIFICATE_FONTS.")
+
+        cohorts = []
+        if options['course']:
+            cohorts.append(('course', Enrollment.objects.filter(course_id=options['course'])))
+        elif options['internship']:
+            cohorts.append(('internship', InternshipEnrollment.objects.filter(internship_id=options['internship'])))
+        else:
+            cohorts = [(kind, None) for kind in certificates.KINDS]
+
+        for kind, queryset in cohorts:
+            rendered = certificates.render_cohort(
+                kind, queryset, workers=options['workers'], batch_size=options['batch_size'], force=options['force']
+            )
+            self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} {kind} certificate(s)."))
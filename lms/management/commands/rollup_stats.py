@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lms.stats import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Fold new enrollments, completions and quiz attempts into the DailyStat table."
+
+    def handle(self, *args, **options):
+        days = rollup_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(days)} day(s) of statistics."))
@@ -0,0 +1,35 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from lms import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (certificates, broadcasts, imports). Stops cleanly on SIGINT/SIGTERM."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            help=f"Jobs run at once, each on its own thread (default {jobs.DEFAULT_CONCURRENCY}, "
+                                 f"or 1 on SQLite).")
+        parser.add_argument('--poll-interval', type=float, default=jobs.POLL_INTERVAL,
+                            help="Seconds between looks at an empty queue.")
+        parser.add_argument('--lease', type=int, default=jobs.LEASE_SECONDS,
+                            help="Seconds a claim lasts without renewal before another worker may take the job.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no jobs are ready.")
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(
+            concurrency=options['concurrency'], poll_interval=options['poll_interval'], lease=options['lease']
+        )
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the running jobs finish...")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f"Worker {worker.name} running {worker.concurrency} job(s) at a time.")
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f"Ran {worker.processed} job(s), {worker.failed} failed."))
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 03:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.CharField(max_length=32, unique=True)),
+                ('owner_role', models.CharField(max_length=20)),
+                ('owner_id', models.IntegerField()),
+                ('kind', models.CharField(max_length=20)),
+                ('filename', models.CharField(max_length=150)),
+                ('total_size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('status', models.CharField(default='Uploading', max_length=50)),
+                ('stored_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-17 03:21
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe_completions(apps, schema_editor):
+    LessonCompletion = apps.get_model("lms", "LessonCompletion")
+    duplicates = (
+        LessonCompletion.objects.values("student_id", "lesson_id")
+        .annotate(n=Count("id"), keep=Min("id"))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        LessonCompletion.objects.filter(
+            student_id=row["student_id"], lesson_id=row["lesson_id"]
+        ).exclude(id=row["keep"]).delete()
+
+
+def backfill_completed_lessons(apps, schema_editor):
+    Enrollment = apps.get_model("lms", "Enrollment")
+    Lesson = apps.get_model("lms", "Lesson")
+    LessonCompletion = apps.get_model("lms", "LessonCompletion")
+    totals = dict(
+        Lesson.objects.values_list("course_id").annotate(n=Count("id")).order_by()
+    )
+    for enrollment in Enrollment.objects.all():
+        enrollment.completed_lessons = LessonCompletion.objects.filter(
+            student_id=enrollment.student_id, lesson__course_id=enrollment.course_id
+        ).count()
+        # Progress must agree with the counter that later completions increment
+        total = totals.get(enrollment.course_id)
+        if enrollment.status == "Active":
+            enrollment.progress = (
+                min(enrollment.completed_lessons * 100.0 / total, 100.0) if total else 0.0
+            )
+        enrollment.save(update_fields=["completed_lessons", "progress"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0003_media_storage"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_completions, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="enrollment",
+            name="completed_lessons",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name="lessoncompletion",
+            constraint=models.UniqueConstraint(
+                fields=("student", "lesson"), name="unique_lesson_completion"
+            ),
+        ),
+        migrations.RunPython(backfill_completed_lessons, migrations.RunPython.noop),
+    ]
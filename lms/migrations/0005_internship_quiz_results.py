@@ -0,0 +1,115 @@
+# Generated by Django 6.0 on 2026-10-17 03:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0004_lesson_progress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InternshipQuizBest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("best_score", models.FloatField(default=0.0)),
+                ("passed", models.BooleanField(default=False)),
+                ("attempts", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "internship",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quiz_bests",
+                        to="lms.internship",
+                    ),
+                ),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="best_results",
+                        to="lms.internshipquiz",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="internship_quiz_bests",
+                        to="lms.student",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["student", "internship", "passed"],
+                        name="iquizbest_student_int_passed",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("student", "quiz"), name="unique_internship_quiz_best"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="InternshipQuizResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("passed", models.BooleanField(default=False)),
+                ("answers", models.TextField(blank=True, null=True)),
+                (
+                    "attempted_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="lms.internshipquiz",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="internship_quiz_results",
+                        to="lms.student",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["student", "quiz", "attempted_at"],
+                        name="iquizresult_student_quiz_at",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0005_internship_quiz_results"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("processed_until", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("enrollments", models.IntegerField(default=0)),
+                ("completions", models.IntegerField(default=0)),
+                ("lesson_completions", models.IntegerField(default=0)),
+                ("quiz_attempts", models.IntegerField(default=0)),
+                ("internship_enrollments", models.IntegerField(default=0)),
+                ("active_students", models.IntegerField(default=0)),
+                ("submissions_pending", models.IntegerField(default=0)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="lms.course",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("course__isnull", False)),
+                        fields=("date", "course"),
+                        name="unique_daily_stat_course",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("course__isnull", True)),
+                        fields=("date",),
+                        name="unique_daily_stat_site",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 6.0 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+PROJECT_RANK = {"Approved": 2, "Submitted": 1}
+
+
+def _keeper_rank(row):
+    # Keep the row a student would miss: certificate, then completion, then the most progress, then the oldest
+    return (
+        row["certificate_id"] is None,
+        row["status"] != "Completed",
+        -row.get("progress", 0),
+        -PROJECT_RANK.get(row.get("project_status"), 0),
+        row["id"],
+    )
+
+
+def dedupe_enrollments(apps, schema_editor):
+    for model_name, target, extra in (
+        ("Enrollment", "course_id", ["progress"]),
+        ("InternshipEnrollment", "internship_id", ["project_status"]),
+    ):
+        model = apps.get_model("lms", model_name)
+        duplicates = (
+            model.objects.values("student_id", target)
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+        )
+        for row in duplicates:
+            rows = model.objects.filter(student_id=row["student_id"], **{target: row[target]})
+            keep = min(rows.values("id", "certificate_id", "status", *extra), key=_keeper_rank)
+            rows.exclude(id=keep["id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0006_daily_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_enrollments, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="notification",
+            name="student",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notifications",
+                to="lms.student",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(fields=["-created_at"], name="course_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["created_at", "id"], name="enrollment_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="instructor",
+            index=models.Index(
+                fields=["created_at", "id"], name="instructor_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="internshipenrollment",
+            index=models.Index(
+                condition=models.Q(("project_submission__isnull", False)),
+                fields=["created_at", "id"],
+                name="internship_submission_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["student", "created_at"], name="notification_inbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["student", "created_at"],
+                name="notification_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(fields=["created_at", "id"], name="student_created_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="enrollment",
+            constraint=models.UniqueConstraint(
+                fields=("student", "course"), name="unique_enrollment"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="internshipenrollment",
+            constraint=models.UniqueConstraint(
+                fields=("student", "internship"), name="unique_internship_enrollment"
+            ),
+        ),
+    ]
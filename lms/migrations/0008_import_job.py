@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 03:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("role", models.CharField(max_length=20)),
+                ("source_path", models.CharField(max_length=500)),
+                ("status", models.CharField(default="Pending", max_length=50)),
+                ("rows_processed", models.IntegerField(default=0)),
+                ("created", models.IntegerField(default=0)),
+                ("skipped", models.IntegerField(default=0)),
+                ("invalid", models.IntegerField(default=0)),
+                ("errors", models.TextField(default="[]")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
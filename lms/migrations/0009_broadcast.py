@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 03:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0008_import_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Broadcast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message", models.CharField(max_length=500)),
+                ("audience", models.CharField(max_length=20)),
+                ("status", models.CharField(default="Pending", max_length=50)),
+                ("total", models.IntegerField(default=0)),
+                ("sent", models.IntegerField(default=0)),
+                ("last_student_id", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="lms.course",
+                    ),
+                ),
+                (
+                    "internship",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="lms.internship",
+                    ),
+                ),
+            ],
+        ),
+    ]
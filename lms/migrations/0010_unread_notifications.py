@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 03:33
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread(apps, schema_editor):
+    Student = apps.get_model("lms", "Student")
+    Notification = apps.get_model("lms", "Notification")
+    unread = (
+        Notification.objects.filter(student_id=OuterRef("pk"), is_read=False)
+        .order_by()
+        .values("student_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Student.objects.update(
+        unread_notifications=Coalesce(
+            Subquery(unread, output_field=IntegerField()), Value(0)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0009_broadcast"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="student",
+            name="unread_notifications",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0010_unread_notifications"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("status", "Approved")),
+                fields=["created_at", "id"],
+                name="course_approved_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("status", "Approved")),
+                fields=["category", "created_at", "id"],
+                name="course_approved_cat_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 05:12
+
+from django.db import migrations
+
+from lms import search
+
+
+def create_index(apps, schema_editor):
+    search.rebuild(apps=apps, conn=schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    backend = search.get_backend(schema_editor.connection)
+    if backend is not None:
+        with schema_editor.connection.cursor() as cursor:
+            backend.drop(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0011_catalogue_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0012_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="enrollment",
+            name="certificate_file",
+            field=models.CharField(blank=True, max_length=120, null=True),
+        ),
+        migrations.AddField(
+            model_name="internshipenrollment",
+            name="certificate_file",
+            field=models.CharField(blank=True, max_length=120, null=True),
+        ),
+    ]
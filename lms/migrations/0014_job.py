@@ -0,0 +1,65 @@
+# Generated by Django 6.0 on 2026-10-17 03:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0013_certificate_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task", models.CharField(max_length=200)),
+                ("args", models.TextField(default="[]")),
+                ("priority", models.IntegerField(default=0)),
+                ("status", models.CharField(default="Queued", max_length=20)),
+                ("attempts", models.IntegerField(default=0)),
+                ("max_attempts", models.IntegerField(default=5)),
+                ("run_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_by", models.CharField(blank=True, max_length=100, null=True)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "Queued")),
+                        fields=["-priority", "run_at", "id"],
+                        name="job_ready_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "Running")),
+                        fields=["locked_by"],
+                        name="job_claim_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "Running")),
+                        fields=["locked_until"],
+                        name="job_lease_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "Completed")),
+                        fields=["completed_at"],
+                        name="job_completed_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-17 03:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0014_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageVariant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=255)),
+                ("format", models.CharField(max_length=10)),
+                ("width", models.IntegerField()),
+                ("height", models.IntegerField()),
+                ("name", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "format", "width"),
+                        name="unique_image_variant",
+                    )
+                ],
+            },
+        ),
+    ]
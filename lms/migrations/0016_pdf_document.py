@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 03:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from lms import search
+
+
+def rebuild_index(apps, schema_editor):
+    # Search document ids pack the kind, and internship materials are a new kind
+    search.rebuild(apps=apps, conn=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0015_image_variant"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PdfDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.BigIntegerField()),
+                ("pages", models.IntegerField(blank=True, null=True)),
+                ("text", models.TextField(blank=True, default="")),
+                ("preview", models.CharField(blank=True, max_length=255, null=True)),
+                ("preview_width", models.IntegerField(blank=True, null=True)),
+                ("preview_height", models.IntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(rebuild_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-17 05:10
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def recount_progress(apps, schema_editor):
+    # 0004 backfilled completed_lessons but not progress, and lesson deletions
+    # left both counting completions that no longer exist
+    Enrollment = apps.get_model("lms", "Enrollment")
+    Lesson = apps.get_model("lms", "Lesson")
+    LessonCompletion = apps.get_model("lms", "LessonCompletion")
+    totals = dict(
+        Lesson.objects.values_list("course_id").annotate(n=Count("id")).order_by()
+    )
+    for enrollment in Enrollment.objects.all().iterator():
+        enrollment.completed_lessons = LessonCompletion.objects.filter(
+            student_id=enrollment.student_id, lesson__course_id=enrollment.course_id
+        ).count()
+        total = totals.get(enrollment.course_id)
+        if enrollment.status == "Active":
+            enrollment.progress = (
+                min(enrollment.completed_lessons * 100.0 / total, 100.0) if total else 0.0
+            )
+        enrollment.save(update_fields=["completed_lessons", "progress"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0016_pdf_document"),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_progress, migrations.RunPython.noop),
+    ]
@@ -33,11 +33,17 @@ class Instructor(models.Model):
     def __str__(self):
         return f"Instructor {self.username}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='instructor_created_idx'),
+        ]
+
 class Student(models.Model):
     username = models.CharField(max_length=120, unique=True)
     full_name = models.CharField(max_length=150, null=True, blank=True)
     email = models.CharField(max_length=120, unique=True)
     password_hash = models.CharField(max_length=255)
+    unread_notifications = models.IntegerField(default=0) # Kept in step by lms.notifications
     created_at = models.DateTimeField(default=timezone.now)
 
     def set_password(self, password):
@@ -49,6 +55,11 @@ class Student(models.Model):
     def __str__(self):
         return f"Student {self.username}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='student_created_idx'),
+        ]
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(default=timezone.now)
@@ -70,6 +81,17 @@ class Course(models.Model):
     def __str__(self):
         return f"Course {self.title}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='course_created_idx'),
+            # Public catalogue: only approved courses, newest first, optionally by category
+            models.Index(fields=['created_at', 'id'], condition=models.Q(status='Approved'), name='course_approved_idx'),
+            models.Index(
+                fields=['category', 'created_at', 'id'], condition=models.Q(status='Approved'),
+                name='course_approved_cat_idx',
+            ),
+        ]
+
 class Lesson(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=150)
@@ -90,21 +112,55 @@ class Enrollment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
     status = models.CharField(max_length=50, default='Active') # Active, Completed
     progress = models.FloatField(default=0.0)
+    completed_lessons = models.IntegerField(default=0) # Kept in step with LessonCompletion rows
     certificate_id = models.CharField(max_length=50, null=True, blank=True, unique=True)
+    certificate_file = models.CharField(max_length=120, null=True, blank=True) # Rendered PDF, see certificates.py
     created_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='enrollment_created_idx'),
+        ]
+
 class Notification(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='notifications')
+    # Indexed through notification_inbox_idx, which leads with student
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     message = models.CharField(max_length=500)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'created_at'], name='notification_inbox_idx'),
+            models.Index(fields=['student', 'created_at'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+
+class Broadcast(models.Model):
+    message = models.CharField(max_length=500)
+    audience = models.CharField(max_length=20) # all, course, internship
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True)
+    internship = models.ForeignKey('Internship', on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=50, default='Pending') # Pending, Running, Completed, Failed
+    total = models.IntegerField(default=0)
+    sent = models.IntegerField(default=0)
+    last_student_id = models.IntegerField(default=0) # Resume point; recipients go out in student id order
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
 class LessonCompletion(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
     completed_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'lesson'], name='unique_lesson_completion'),
+        ]
+
 class QuizResult(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
@@ -136,6 +192,37 @@ class InternshipQuiz(models.Model):
     questions_data = models.TextField(null=True, blank=True) # JSON
     created_at = models.DateTimeField(default=timezone.now)
 
+class InternshipQuizResult(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='internship_quiz_results')
+    quiz = models.ForeignKey(InternshipQuiz, on_delete=models.CASCADE, related_name='results')
+    score = models.FloatField()
+    passed = models.BooleanField(default=False)
+    answers = models.TextField(null=True, blank=True) # JSON list of submitted answers
+    attempted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'quiz', 'attempted_at'], name='iquizresult_student_quiz_at'),
+        ]
+
+class InternshipQuizBest(models.Model):
+    # One row per (student, quiz), updated on every attempt
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='internship_quiz_bests')
+    quiz = models.ForeignKey(InternshipQuiz, on_delete=models.CASCADE, related_name='best_results')
+    internship = models.ForeignKey(Internship, on_delete=models.CASCADE, related_name='quiz_bests')
+    best_score = models.FloatField(default=0.0)
+    passed = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'quiz'], name='unique_internship_quiz_best'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'internship', 'passed'], name='iquizbest_student_int_passed'),
+        ]
+
 class InternshipProject(models.Model):
     internship = models.ForeignKey(Internship, on_delete=models.CASCADE, related_name='projects')
     title = models.CharField(max_length=150)
@@ -151,5 +238,138 @@ class InternshipEnrollment(models.Model):
     project_status = models.CharField(max_length=50, default='Pending') # Pending, Submitted, Approved, Rejected
     
     certificate_id = models.CharField(max_length=50, null=True, blank=True, unique=True)
+    certificate_file = models.CharField(max_length=120, null=True, blank=True) # Rendered PDF, see certificates.py
+    created_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'internship'], name='unique_internship_enrollment'),
+        ]
+        indexes = [
+            # Admin submission queue: only rows with a file, paged by (created_at, id)
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(project_submission__isnull=False),
+                name='internship_submission_idx',
+            ),
+        ]
+
+# ===========================
+# UPLOADS
+# ===========================
+
+class UploadSession(models.Model):
+    upload_id = models.CharField(max_length=32, unique=True)
+    owner_role = models.CharField(max_length=20) # admin, instructor, student
+    owner_id = models.IntegerField()
+    kind = models.CharField(max_length=20) # video, notes, material, project
+    filename = models.CharField(max_length=150)
+    total_size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=50, default='Uploading') # Uploading, Writing, Finalizing, Complete, Consumed
+    stored_name = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+class MediaBlob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+class StoredFile(models.Model):
+    name = models.CharField(max_length=255, unique=True) # Logical name kept in the model columns
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='files')
     created_at = models.DateTimeField(default=timezone.now)
+
+class ImageVariant(models.Model):
+    source = models.CharField(max_length=255) # Logical name of the original upload
+    format = models.CharField(max_length=10) # webp, jpeg
+    width = models.IntegerField()
+    height = models.IntegerField()
+    name = models.CharField(max_length=255) # Logical name of the resized copy
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'format', 'width'], name='unique_image_variant'),
+        ]
+
+class PdfDocument(models.Model):
+    name = models.CharField(max_length=255, unique=True) # Logical name of the PDF (notes or material)
+    size = models.BigIntegerField() # Bytes
+    pages = models.IntegerField(null=True, blank=True) # None if the PDF could not be parsed
+    text = models.TextField(blank=True, default='') # Extracted text, fed to the search index
+    preview = models.CharField(max_length=255, null=True, blank=True) # Logical name of the first-page PNG
+    preview_width = models.IntegerField(null=True, blank=True)
+    preview_height = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+# ===========================
+# REPORTING
+# ===========================
+
+class DailyStat(models.Model):
+    # course=None holds the site-wide totals for the day
+    date = models.DateField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats')
+    enrollments = models.IntegerField(default=0)
+    completions = models.IntegerField(default=0)
+    lesson_completions = models.IntegerField(default=0)
+    quiz_attempts = models.IntegerField(default=0)
+    internship_enrollments = models.IntegerField(default=0)
+    active_students = models.IntegerField(default=0)
+    submissions_pending = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'course'], condition=models.Q(course__isnull=False), name='unique_daily_stat_course'),
+            models.UniqueConstraint(fields=['date'], condition=models.Q(course__isnull=True), name='unique_daily_stat_site'),
+        ]
+
+class StatWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    processed_until = models.DateTimeField()
+
+# ===========================
+# BULK IMPORT
+# ===========================
+
+class ImportJob(models.Model):
+    role = models.CharField(max_length=20) # student, instructor
+    source_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=50, default='Pending') # Pending, Running, Completed, Failed
+    rows_processed = models.IntegerField(default=0) # CSV data rows already committed; resume point
+    created = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    invalid = models.IntegerField(default=0)
+    errors = models.TextField(default='[]') # JSON sample of [line, reason]
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+# ===========================
+# BACKGROUND JOBS
+# ===========================
+
+class Job(models.Model):
+    task = models.CharField(max_length=200) # Dotted path of a @jobs.task function
+    args = models.TextField(default='[]') # JSON list of positional arguments
+    priority = models.IntegerField(default=0) # Higher runs first
+    status = models.CharField(max_length=20, default='Queued') # Queued, Running, Completed, Failed
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now) # Not before; pushed back between retries
+    locked_by = models.CharField(max_length=100, null=True, blank=True) # Claim token of the worker running it
+    locked_until = models.DateTimeField(null=True, blank=True) # Lease; requeued if not renewed
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'run_at', 'id'], condition=models.Q(status='Queued'), name='job_ready_idx'),
+            models.Index(fields=['locked_by'], condition=models.Q(status='Running'), name='job_claim_idx'),
+            models.Index(fields=['locked_until'], condition=models.Q(status='Running'), name='job_lease_idx'),
+            models.Index(fields=['completed_at'], condition=models.Q(status='Completed'), name='job_completed_idx'),
+        ]
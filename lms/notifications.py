@@ -0,0 +1,79 @@
+"""
+Student notifications and the denormalized unread counter.
+
+Student.unread_notifications moves with every insert and read: single
+creates bump it from a post_save handler, the bulk paths here adjust it with
+one F() update in the same transaction as the rows they touch. Counter
+updates bypass save(), so the cached request principal is dropped alongside.
+New rows are pushed to open event streams once they commit.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import events, principal
+from .models import Notification, Student
+
+HISTORY_PER_PAGE = 20
+RETENTION_DAYS = 90
+PURGE_BATCH_SIZE = 500
+
+
+def _forget_principals(student_ids):
+    cache.delete_many([principal.cache_key('student', pk) for pk in student_ids])
+
+
+def bump_unread(student_ids, by=1):
+    Student.objects.filter(id__in=student_ids).update(unread_notifications=F('unread_notifications') + by)
+    _forget_principals(student_ids)
+
+
+def notify_many(student_ids, message, created_at=None):
+    """Insert one unread notification per student and count them in, atomically."""
+    created_at = created_at or timezone.now()
+    with transaction.atomic():
+        rows = Notification.objects.bulk_create(
+            [Notification(student_id=pk, message=message, created_at=created_at) for pk in student_ids]
+        )
+        bump_unread(student_ids)
+        events.publish_notifications_on_commit(rows)
+
+
+def mark_read(student_id, ids=None):
+    """Mark all (or just ``ids``) of a student's unread notifications read. Returns how many changed."""
+    unread = Notification.objects.filter(student_id=student_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    with transaction.atomic():
+        changed = unread.update(is_read=True)
+        if changed:
+            Student.objects.filter(id=student_id).update(
+                unread_notifications=Greatest(F('unread_notifications') - changed, 0)
+            )
+    if changed:
+        _forget_principals([student_id])
+    return changed
+
+
+def purge_read(days=RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE, pause=0):
+    """
+    Delete read notifications older than ``days`` in short transactions of
+    ``batch_size`` rows, sleeping ``pause`` seconds between them so writers
+    get the SQLite lock in between. Returns the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    old = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(old.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += Notification.objects.filter(id__in=ids).delete()[0]
+        if pause:
+            time.sleep(pause)
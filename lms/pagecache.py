@@ -0,0 +1,87 @@
+"""
+Versioned page and fragment caching for the public, read-mostly pages.
+
+Every cached page or fragment key includes one or more version tokens, e.g.
+``course:12`` or ``catalogue``. The signal handlers in signals.py replace a
+token when the objects behind it change, so stale entries are never read
+again and simply expire; nothing has to be found and deleted.
+
+Whole responses are only cached for visitors without a login or pending
+messages. Logged-in pages are still rendered per user, but the expensive
+fragments (e.g. the lesson outline) come from the shared ``{% cache %}``
+entries keyed on the same versions.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+
+from .principal import session_owner
+
+PAGE_CACHE_TIMEOUT = 10 * 60
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+VERSION_TIMEOUT = None  # Version tokens never expire on their own
+
+
+def _version_key(name):
+    return f"ver:{name}"
+
+
+def version(name):
+    token = cache.get(_version_key(name))
+    if token is None:
+        token = str(time.time_ns())
+        # add() so concurrent first readers agree on one token
+        if not cache.add(_version_key(name), token, VERSION_TIMEOUT):
+            token = cache.get(_version_key(name), token)
+    return token
+
+
+def bump(*names):
+    token = str(time.time_ns())
+    cache.set_many({_version_key(name): token for name in names}, VERSION_TIMEOUT)
+
+
+def cached_value(key, version_names, func, timeout=FRAGMENT_CACHE_TIMEOUT):
+    """``func()``, cached under ``key`` for the current versions of ``version_names``."""
+    versions = '|'.join(version(name) for name in version_names)
+    full_key = f"val:{key}:{hashlib.md5(versions.encode()).hexdigest()}"
+    value = cache.get(full_key)
+    if value is None:
+        value = func()
+        cache.set(full_key, value, timeout)
+    return value
+
+
+def _cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if session_owner(request)[0]:
+        return False
+    return not len(messages.get_messages(request))
+
+
+def cache_public_page(*version_names, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Cache the view's response for anonymous visitors. ``version_names`` may use
+    the view's kwargs, e.g. ``'course:{course_id}'``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view_func(request, *args, **kwargs)
+
+            versions = '|'.join(version(name.format(**kwargs)) for name in version_names)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f"page:{path}:{hashlib.md5(versions.encode()).hexdigest()}"
+            response = cache.get(key)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, response, timeout)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+Instead of OFFSET, each page continues from the last row the client saw, so
+page 5000 costs the same as page 1 and rows inserted meanwhile don't shift
+the page boundaries.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 50
+
+# ?sort= values: newest first or oldest first
+KEYSET_SORTS = ('newest', 'oldest')
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, sort, has_next, has_previous):
+        self.object_list = items
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(items[-1]) if items and has_next else None
+        self.previous_cursor = encode_cursor(items[0]) if items and has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _after(created_at, pk, descending):
+    if descending:
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def keyset_paginate(queryset, params, per_page=DEFAULT_PER_PAGE):
+    """
+    Page ``queryset`` using ``after``/``before`` cursors and ``sort`` from
+    ``params`` (usually request.GET). Costs one query per page.
+    """
+    sort = params.get('sort')
+    if sort not in KEYSET_SORTS:
+        sort = KEYSET_SORTS[0]
+    descending = sort == 'newest'
+
+    after = decode_cursor(params.get('after') or '')
+    before = decode_cursor(params.get('before') or '') if not after else None
+
+    if before:
+        # Walk backwards from the cursor, then restore display order
+        qs = queryset.filter(_after(*before, not descending))
+        order = ('created_at', 'pk') if descending else ('-created_at', '-pk')
+        rows = list(qs.order_by(*order)[:per_page + 1])
+        has_previous = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPage(items, sort, has_next=True, has_previous=has_previous)
+
+    qs = queryset
+    if after:
+        qs = qs.filter(_after(*after, descending))
+    order = ('-created_at', '-pk') if descending else ('created_at', 'pk')
+    rows = list(qs.order_by(*order)[:per_page + 1])
+    return KeysetPage(rows[:per_page], sort, has_next=len(rows) > per_page, has_previous=bool(after))
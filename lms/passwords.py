@@ -0,0 +1,36 @@
+"""
+Process-pool password hashing for bulk imports.
+
+Kept free of model imports: spawned workers unpickle these functions by
+importing this module before Django is set up.
+"""
+import os
+
+from django.contrib.auth.hashers import make_password
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def init_worker():
+    # Workers are spawned, not forked (the parent may hold threads and DB
+    # connections), so they load settings for PASSWORD_HASHERS themselves
+    import django
+    django.setup()
+
+
+def hash_many(passwords):
+    return [make_password(p) for p in passwords]
+
+
+def hash_passwords(passwords, executor=None, workers=1):
+    """Hash ``passwords`` in order, split across ``workers`` processes of ``executor``."""
+    if executor is None or len(passwords) < 2:
+        return hash_many(passwords)
+    size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed = []
+    for part in executor.map(hash_many, chunks):
+        hashed.extend(part)
+    return hashed
@@ -0,0 +1,114 @@
+"""
+Certificate PDFs, drawn with reportlab.
+
+Names and titles are set in the TrueType fonts named by
+settings.CERTIFICATE_FONTS (DejaVu Sans by default, from the
+fonts-dejavu-core package), which reportlab embeds as subsets, so names in
+Latin, Greek, Cyrillic and the other scripts the font covers print as
+written. Without reportlab or the fonts no PDF is made and students keep
+the HTML certificate. Output is byte-for-byte deterministic for the same
+fields, so identical certificates hash to the same stored blob.
+
+Deliberately free of model and settings imports so process-pool workers
+can render without setting Django up (see certificates.render_cohort);
+callers pass the font paths in.
+"""
+import functools
+import hashlib
+import io
+import os
+
+try:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen.canvas import Canvas
+except ImportError:  # pragma: no cover - optional dependency
+    Canvas = None
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape, in points
+
+BRAND = (0.102, 0.290, 0.486)  # #1a4a7c
+MUTED = (0.424, 0.459, 0.490)
+BLACK = (0, 0, 0)
+
+FONT_STYLES = ('regular', 'bold')
+MONO_FONT = 'Courier-Bold'  # Certificate ids are ASCII; one of the PDF standard fonts, not embedded
+
+
+def available(fonts):
+    """True if reportlab is installed and ``fonts`` names a readable file for every style."""
+    return Canvas is not None and all(os.path.isfile(fonts.get(style) or '') for style in FONT_STYLES)
+
+
+@functools.lru_cache(maxsize=None)
+def _register(path):
+    # reportlab keeps fonts in a process-wide registry by name; one name per file
+    name = 'Certificate-' + hashlib.md5(path.encode()).hexdigest()[:12]
+    pdfmetrics.registerFont(TTFont(name, path))
+    return name
+
+
+def fit_size(text, font, size, max_width, min_size=10):
+    """Shrink ``size`` until ``text`` fits in ``max_width`` (long names and titles)."""
+    while size > min_size and pdfmetrics.stringWidth(text, font, size) > max_width:
+        size -= 1
+    return size
+
+
+def _centred(c, y, text, font, size, rgb=BLACK, centre=PAGE_WIDTH / 2, max_width=None):
+    if max_width:
+        size = fit_size(text, font, size, max_width)
+    c.setFillColorRGB(*rgb)
+    c.setFont(font, size)
+    c.drawCentredString(centre, y, text)
+    return size
+
+
+def certificate_pdf(fields, fonts):
+    """
+    Render a certificate. ``fields`` is a plain dict (it crosses process
+    boundaries) with name, kind ('course' or 'internship'), title,
+    completed_on, certificate_id and instructor; ``fonts`` maps 'regular'
+    and 'bold' to TrueType files.
+    """
+    regular, bold = (_register(fonts[style]) for style in FONT_STYLES)
+    out = io.BytesIO()
+    # invariant: no creation date or random document id, so the bytes depend on the fields only
+    c = Canvas(out, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), invariant=1)
+    c.setTitle(f"Certificate {fields['certificate_id']}")
+    c.setCreator('E-Learning')
+    c.setProducer('E-Learning')
+
+    c.setStrokeColorRGB(*BRAND)
+    c.setLineWidth(4)
+    c.rect(24, 24, PAGE_WIDTH - 48, PAGE_HEIGHT - 48)
+    c.setLineWidth(1.5)
+    c.rect(34, 34, PAGE_WIDTH - 68, PAGE_HEIGHT - 68)
+
+    usable = PAGE_WIDTH - 160
+    _centred(c, 455, 'Certificate of Completion', bold, 40, BRAND)
+    _centred(c, 410, 'THIS IS TO CERTIFY THAT', regular, 13, MUTED)
+    name = fields['name'].upper()
+    size = _centred(c, 358, name, bold, 30, max_width=usable)
+    half = pdfmetrics.stringWidth(name, bold, size) / 2 + 30
+    c.setStrokeColorRGB(*MUTED)
+    c.setLineWidth(0.75)
+    c.line(PAGE_WIDTH / 2 - half, 348, PAGE_WIDTH / 2 + half, 348)
+    _centred(c, 315, f"has successfully completed the {fields['kind']}", regular, 14)
+    _centred(c, 278, fields['title'], bold, 22, BRAND, max_width=usable)
+    _centred(c, 240, f"Completed on {fields['completed_on']}", regular, 12)
+    _centred(c, 196, 'CERTIFICATE ID', regular, 9, MUTED)
+    _centred(c, 180, fields['certificate_id'], MONO_FONT, 12)
+
+    for centre, role, person in (
+        (PAGE_WIDTH / 2 - 170, 'Instructor', fields['instructor']),
+        (PAGE_WIDTH / 2 + 170, 'ZAIX SNOW', 'CEO, E-Learning'),
+    ):
+        c.setStrokeColorRGB(*BLACK)
+        c.line(centre - 110, 120, centre + 110, 120)
+        _centred(c, 102, role, bold, 12, centre=centre)
+        _centred(c, 86, person, regular, 10, MUTED, centre=centre, max_width=220)
+
+    c.showPage()
+    c.save()
+    return out.getvalue()
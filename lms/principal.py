@@ -0,0 +1,100 @@
+"""
+The logged-in account for the current request.
+
+PrincipalMiddleware sets ``request.principal`` to the Admin, Instructor or
+Student named by the session, loaded lazily on first access and at most once
+per request. Loaded accounts are kept in the cache for a short time; the
+signal handlers in signals.py drop the entry when the account is saved or
+deleted.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Admin, Instructor, Student
+
+PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Session key prefix -> model, in the order sessions are checked
+ROLE_MODELS = {'admin': Admin, 'instructor': Instructor, 'student': Student}
+MODEL_ROLES = {model: role for role, model in ROLE_MODELS.items()}
+
+
+def session_owner(request):
+    for role in ROLE_MODELS:
+        owner_id = request.session.get(f'{role}_id')
+        if owner_id:
+            return role, owner_id
+    return None, None
+
+
+async def asession_owner(request):
+    for role in ROLE_MODELS:
+        owner_id = await request.session.aget(f'{role}_id')
+        if owner_id:
+            return role, owner_id
+    return None, None
+
+
+def cache_key(role, pk):
+    return f"principal:{role}:{pk}"
+
+
+def load_principal(role, pk):
+    """The account for ``role``/``pk``, or None if it no longer exists."""
+    key = cache_key(role, pk)
+    principal = cache.get(key)
+    if principal is None:
+        principal = ROLE_MODELS[role].objects.filter(pk=pk).first()
+        if principal is not None:
+            cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+    return principal
+
+
+def for_role(request, role):
+    """
+    The principal for ``role``, rebinding ``request.principal`` when the
+    session carries several roles and the view needs a different one.
+    """
+    if request.principal_role != role:
+        pk = request.session.get(f'{role}_id')
+        request.principal_role = role
+        request.principal = SimpleLazyObject(lambda: load_principal(role, pk) if pk else None)
+    return request.principal
+
+
+def invalidate(instance):
+    role = MODEL_ROLES.get(type(instance))
+    if role and instance.pk is not None:
+        cache.delete(cache_key(role, instance.pk))
+
+
+class PrincipalMiddleware:
+    """
+    Adds ``request.principal_role`` ('admin', 'instructor', 'student' or None)
+    and ``request.principal``. The principal is a lazy object, so test it for
+    truthiness rather than comparing with None. Runs natively under ASGI so
+    async views don't get pinned to a thread by this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _attach(self, request, role, pk):
+        request.principal_role = role
+        request.principal = SimpleLazyObject(lambda: load_principal(role, pk) if role else None)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self._attach(request, *session_owner(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._attach(request, *await asession_owner(request))
+        return await self.get_response(request)
@@ -0,0 +1,81 @@
+"""
+Course progress bookkeeping.
+
+Progress is maintained incrementally: each new LessonCompletion bumps
+Enrollment.completed_lessons with a single F() update instead of recounting
+every completion row. Completing the last lesson issues the certificate and
+queues its PDF (see certificates.py).
+
+Adding or deleting a lesson changes what 100% means, and deleting one also
+deletes its completions, so signals.py then recounts the whole course with
+recount_course().
+"""
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least
+from django.utils import timezone
+
+from . import certificates
+from .models import Enrollment, Lesson, LessonCompletion
+
+
+def record_lesson_completion(enrollment, lesson):
+    """
+    Mark ``lesson`` complete for the enrollment's student and return the
+    refreshed enrollment. Calling it twice for the same lesson is a no-op.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                LessonCompletion.objects.create(student_id=enrollment.student_id, lesson=lesson)
+        except IntegrityError:
+            # Already completed (e.g. from another tab)
+            enrollment.refresh_from_db()
+            return enrollment
+
+        total = Lesson.objects.filter(course_id=enrollment.course_id).count()
+        completed = F('completed_lessons') + 1
+        Enrollment.objects.filter(pk=enrollment.pk).update(
+            completed_lessons=completed, progress=_progress(completed, total),
+        )
+        _complete(enrollment)
+    return enrollment
+
+
+def _progress(completed, total):
+    if not total:
+        return Value(0.0)
+    return Least(Cast(completed, FloatField()) * 100.0 / total, Value(100.0))
+
+
+def _complete(enrollment):
+    """Complete ``enrollment`` if it has reached 100%, and refresh it."""
+    # Only the update that takes the enrollment past the last lesson issues the certificate
+    completed = Enrollment.objects.filter(pk=enrollment.pk, status='Active', progress__gte=100).update(
+        status='Completed',
+        completed_at=timezone.now(),
+        certificate_id=str(uuid.uuid4()).upper(),
+    )
+    enrollment.refresh_from_db()
+    if completed:
+        certificates.schedule(enrollment)
+
+
+def recount_course(course_id):
+    """
+    Recount completed lessons of every enrollment in the course, and the
+    progress of those not yet completed (issued certificates stand).
+    Enrollments whose remaining lessons are all done are completed.
+    """
+    completions = LessonCompletion.objects.filter(
+        student_id=OuterRef('student_id'), lesson__course_id=course_id
+    ).order_by().values('student_id').annotate(n=Count('id')).values('n')
+    total = Lesson.objects.filter(course_id=course_id).count()
+    with transaction.atomic():
+        enrollments = Enrollment.objects.filter(course_id=course_id)
+        enrollments.update(completed_lessons=Coalesce(Subquery(completions), 0))
+        enrollments.filter(status='Active').update(progress=_progress(F('completed_lessons'), total))
+        for enrollment in enrollments.filter(status='Active', progress__gte=100):
+            _complete(enrollment)
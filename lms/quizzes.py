@@ -0,0 +1,130 @@
+"""
+Compiled quizzes.
+
+``questions_data`` is parsed once per content version into a CompiledQuiz (the
+question list plus a tuple of correct answers). Compiled quizzes live in a small
+per-process LRU and in the shared Django cache. Keys include a hash of the
+JSON, so editing a quiz produces a new key and the old entry simply ages out.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import InternshipQuiz, InternshipQuizBest, InternshipQuizResult
+
+CompiledQuiz = namedtuple('CompiledQuiz', ['questions', 'answer_key'])
+
+# Minimum percentage for an internship quiz attempt to count as passed
+PASS_MARK = 60.0
+
+LOCAL_CACHE_SIZE = 256
+SHARED_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class _LRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LRU(LOCAL_CACHE_SIZE)
+
+
+def cache_key(quiz):
+    digest = hashlib.sha1((quiz.questions_data or '').encode('utf-8')).hexdigest()[:16]
+    return f"quiz:{quiz._meta.model_name}:{quiz.pk}:{digest}"
+
+
+def parse(questions_data):
+    try:
+        questions = json.loads(questions_data) if questions_data else []
+    except ValueError:
+        questions = []
+    if not isinstance(questions, list):
+        questions = []
+    questions = tuple(q for q in questions if isinstance(q, dict))
+    return CompiledQuiz(questions, tuple(q.get('correct') for q in questions))
+
+
+def compile_quiz(quiz):
+    key = cache_key(quiz)
+    compiled = _local.get(key)
+    if compiled is not None:
+        return compiled
+
+    cached = cache.get(key)
+    if cached is not None:
+        compiled = CompiledQuiz(*cached)
+    else:
+        compiled = parse(quiz.questions_data)
+        cache.set(key, tuple(compiled), SHARED_CACHE_TIMEOUT)
+    _local.set(key, compiled)
+    return compiled
+
+
+def grade(compiled, data):
+    """Score submitted ``q_<n>`` answers. Returns (score, total, answers)."""
+    answers = tuple(data.get(f"q_{i}") for i in range(len(compiled.answer_key)))
+    score = sum(1 for given, correct in zip(answers, compiled.answer_key) if given == correct)
+    return score, len(compiled.answer_key), answers
+
+
+def record_attempt(student_id, quiz, percentage, answers):
+    """Store an internship quiz attempt and fold it into the student's best result."""
+    passed = percentage >= PASS_MARK
+    now = timezone.now()
+    with transaction.atomic():
+        result = InternshipQuizResult.objects.create(
+            student_id=student_id, quiz=quiz, score=percentage, passed=passed,
+            answers=json.dumps(list(answers)), attempted_at=now,
+        )
+
+        changes = {'best_score': Greatest(F('best_score'), percentage), 'attempts': F('attempts') + 1, 'updated_at': now}
+        if passed:
+            changes['passed'] = True
+        best = InternshipQuizBest.objects.filter(student_id=student_id, quiz=quiz)
+        if not best.update(**changes):
+            try:
+                with transaction.atomic():
+                    InternshipQuizBest.objects.create(
+                        student_id=student_id, quiz=quiz, internship_id=quiz.internship_id,
+                        best_score=percentage, passed=passed, attempts=1, updated_at=now,
+                    )
+            except IntegrityError:
+                # A parallel first attempt created the row; fall back to the update
+                best.update(**changes)
+    return result
+
+
+def has_passed_all_quizzes(student_id, internship_id):
+    """True when every quiz in the internship has a passing best result (one query)."""
+    passed = InternshipQuizBest.objects.filter(
+        student_id=student_id, internship_id=internship_id, passed=True
+    ).values('quiz_id')
+    return not InternshipQuiz.objects.filter(internship_id=internship_id).exclude(id__in=passed).exists()
@@ -0,0 +1,98 @@
+"""
+Admin reporting queries.
+
+Per-course numbers come from one grouped query: enrollment counts and average
+progress are aggregated over the enrollment join, lesson counts and quiz pass
+rates are correlated subqueries so they don't multiply the joined rows.
+"""
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import (
+    Avg, Case, Count, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from .models import Course, Enrollment, InternshipEnrollment, Lesson, QuizResult, Student
+from .stats import site_trend
+
+REPORT_CACHE_TIMEOUT = 60
+COURSES_PER_PAGE = 50
+
+# Allowed ?sort= values mapped to ORDER BY expressions
+COURSE_SORTS = {
+    'title': ('title', 'id'),
+    'newest': ('-created_at', '-id'),
+    'enrollments': ('-enrollment_count', 'id'),
+    'completions': ('-completion_count', 'id'),
+    'progress': ('-avg_progress', 'id'),
+    'lessons': ('-lesson_count', 'id'),
+    'pass_rate': ('-quiz_pass_rate', 'id'),
+}
+DEFAULT_COURSE_SORT = 'enrollments'
+
+
+def course_stats_queryset(sort=DEFAULT_COURSE_SORT):
+    lesson_count = (
+        Lesson.objects.filter(course=OuterRef('pk'))
+        .order_by().values('course')
+        .annotate(n=Count('id')).values('n')
+    )
+    pass_rate = (
+        QuizResult.objects.filter(quiz__course=OuterRef('pk'))
+        .order_by().values('quiz__course')
+        .annotate(rate=Avg(Case(When(passed=True, then=Value(100.0)), default=Value(0.0), output_field=FloatField())))
+        .values('rate')
+    )
+    return (
+        Course.objects
+        .annotate(
+            enrollment_count=Count('enrollments'),
+            completion_count=Count('enrollments', filter=Q(enrollments__status='Completed')),
+            avg_progress=Coalesce(Avg('enrollments__progress'), Value(0.0)),
+            lesson_count=Coalesce(Subquery(lesson_count, output_field=IntegerField()), Value(0)),
+            quiz_pass_rate=Subquery(pass_rate, output_field=FloatField()),
+        )
+        .order_by(*COURSE_SORTS.get(sort, COURSE_SORTS[DEFAULT_COURSE_SORT]))
+        .values(
+            'id', 'title', 'status', 'created_at', 'enrollment_count', 'completion_count',
+            'avg_progress', 'lesson_count', 'quiz_pass_rate',
+        )
+    )
+
+
+def internship_submission_stats():
+    return InternshipEnrollment.objects.aggregate(
+        enrollments=Count('id'),
+        submitted=Count('id', filter=Q(project_status='Submitted')),
+        approved=Count('id', filter=Q(project_status='Approved')),
+        rejected=Count('id', filter=Q(project_status='Rejected')),
+        completed=Count('id', filter=Q(status='Completed')),
+    )
+
+
+def build_admin_report(sort=DEFAULT_COURSE_SORT, page=1, use_cache=True):
+    if sort not in COURSE_SORTS:
+        sort = DEFAULT_COURSE_SORT
+    key = f"admin_report:{sort}:{page}"
+    if use_cache:
+        report = cache.get(key)
+        if report is not None:
+            return report
+
+    paginator = Paginator(course_stats_queryset(sort), COURSES_PER_PAGE)
+    course_page = paginator.get_page(page)
+    report = {
+        'total_students': Student.objects.count(),
+        'total_courses': paginator.count,
+        'total_enrollments': Enrollment.objects.count(),
+        'course_stats': list(course_page.object_list),
+        'page_number': course_page.number,
+        'num_pages': paginator.num_pages,
+        'has_previous': course_page.has_previous(),
+        'has_next': course_page.has_next(),
+        'internship_stats': internship_submission_stats(),
+        'daily_trend': site_trend(),
+        'sort': sort,
+    }
+    cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
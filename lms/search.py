@@ -0,0 +1,417 @@
+"""
+Full-text search over courses, lessons, internships, internship projects
+and internship materials. Lessons and materials include the text
+documents.py extracted from their PDFs.
+
+Every searchable object is one document (title, body) in a full-text index
+living in the same database, so index writes commit or roll back with the
+rows they describe. The document's rowid packs the object id and its kind
+(``pk * 4 + kind``), which makes updates and deletes primary-key lookups
+instead of scans of a 1M-row index.
+
+The index is kept in step by the signal handlers in signals.py; courses are
+only indexed, together with their lessons, while they are approved. The
+``rebuild_search_index`` command recreates it from scratch.
+
+The backend is chosen by database vendor: SQLite uses an FTS5 table ranked
+with bm25(), PostgreSQL a table with a stored, GIN-indexed tsvector.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Course, Internship, InternshipMaterial, InternshipProject, Lesson, PdfDocument
+
+TABLE = 'lms_search'
+RESULTS_PER_PAGE = 20
+MAX_PAGES = 50
+SUGGESTION_LIMIT = 8
+MIN_PREFIX_LENGTH = 2
+REBUILD_BATCH_SIZE = 2000
+SNIPPET_TOKENS = 24
+TITLE_WEIGHT = 10.0
+
+KINDS = ('course', 'lesson', 'internship', 'project', 'material')
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Match markers, swapped for <mark> after the text around them is escaped
+_OPEN, _CLOSE = '\x02', '\x03'
+_TERM_RE = re.compile(r'\w+')
+
+
+def doc_id(kind, pk):
+    return pk * len(KINDS) + KIND_CODES[kind]
+
+
+def split_doc_id(rowid):
+    pk, code = divmod(rowid, len(KINDS))
+    return KINDS[code], pk
+
+
+def terms(query):
+    """The words of a user query, lower-cased; any search syntax is dropped."""
+    return _TERM_RE.findall(query.lower())[:16]
+
+
+def highlight(text):
+    """Escape backend output and turn its match markers into <mark> tags."""
+    text = escape(text or '')
+    return mark_safe(text.replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+class SQLiteBackend:
+    """FTS5 table with porter stemming and 2- and 3-character prefix indexes for autocomplete."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "title, body, kind UNINDEXED, parent_id UNINDEXED, "
+            "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def upsert(self, cursor, docs):
+        docs = list(docs)
+        self.delete(cursor, [doc[0] for doc in docs])
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, kind, parent_id, title, body) VALUES (%s, %s, %s, %s, %s)", docs
+        )
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk,) for pk in ids])
+
+    def optimize(self, cursor):
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+    def _match(self, words, prefix=False, column=None):
+        phrases = ['"%s"' % word for word in words]
+        if prefix:
+            phrases[-1] += '*'
+        match = ' '.join(phrases)
+        return f'{column} : ({match})' if column else match
+
+    def search(self, cursor, words, limit, offset):
+        cursor.execute(
+            f"SELECT rowid, kind, parent_id, "
+            f"highlight({TABLE}, 0, %s, %s), snippet({TABLE}, 1, %s, %s, '…', %s) "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY bm25({TABLE}, %s, 1.0) LIMIT %s OFFSET %s",
+            [_OPEN, _CLOSE, _OPEN, _CLOSE, SNIPPET_TOKENS, self._match(words), TITLE_WEIGHT, limit, offset],
+        )
+        return cursor.fetchall()
+
+    def suggest(self, cursor, words, limit):
+        # Newest first by rowid: FTS5 walks the prefix index in rowid order and
+        # stops at the limit, where ranking would score every match of "ab*"
+        cursor.execute(
+            f"SELECT rowid, kind, parent_id, title FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY rowid DESC LIMIT %s",
+            [self._match(words, prefix=True, column='title'), limit],
+        )
+        return cursor.fetchall()
+
+
+class PostgresBackend:
+    """Plain table with a stored, weighted tsvector and a GIN index over it."""
+
+    config = 'english'
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            "id bigint PRIMARY KEY, kind varchar(20) NOT NULL, parent_id integer, "
+            "title text NOT NULL, body text NOT NULL, "
+            f"document tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{self.config}', title), 'A') || "
+            f"setweight(to_tsvector('{self.config}', body), 'B')) STORED)"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING gin (document)")
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def upsert(self, cursor, docs):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (id, kind, parent_id, title, body) VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (id) DO UPDATE SET kind = EXCLUDED.kind, parent_id = EXCLUDED.parent_id, "
+            "title = EXCLUDED.title, body = EXCLUDED.body",
+            list(docs),
+        )
+
+    def delete(self, cursor, ids):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE id = ANY(%s)", [list(ids)])
+
+    def optimize(self, cursor):
+        cursor.execute(f"ANALYZE {TABLE}")
+
+    def _tsquery(self, words, prefix=False):
+        # Suggestions only match titles, the 'A'-weighted lexemes
+        label = ':A' if prefix else ''
+        lexemes = [f"'{word}'{label}" for word in words]
+        if prefix:
+            lexemes[-1] = f"'{words[-1]}':*A"
+        return ' & '.join(lexemes)
+
+    def search(self, cursor, words, limit, offset):
+        # ts_headline re-parses the text, so only run it on the page of hits
+        options = f'StartSel={_OPEN}, StopSel={_CLOSE}, HighlightAll=TRUE'
+        snippet_options = f'StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords={SNIPPET_TOKENS}, MinWords=8'
+        cursor.execute(
+            f"SELECT hit.id, hit.kind, hit.parent_id, "
+            f"ts_headline(%s, hit.title, hit.q, %s), ts_headline(%s, hit.body, hit.q, %s) FROM ("
+            f"SELECT id, kind, parent_id, title, body, q, ts_rank_cd(document, q) AS rank "
+            f"FROM {TABLE}, to_tsquery(%s, %s) q WHERE document @@ q "
+            f"ORDER BY rank DESC LIMIT %s OFFSET %s) hit ORDER BY hit.rank DESC",
+            [self.config, options, self.config, snippet_options,
+             self.config, self._tsquery(words), limit, offset],
+        )
+        return cursor.fetchall()
+
+    def suggest(self, cursor, words, limit):
+        cursor.execute(
+            f"SELECT id, kind, parent_id, title FROM {TABLE} "
+            f"WHERE document @@ to_tsquery(%s, %s) ORDER BY id DESC LIMIT %s",
+            [self.config, self._tsquery(words, prefix=True), limit],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(conn=None):
+    """The backend for ``conn``'s database, or None where search is unsupported."""
+    backend = BACKENDS.get((conn or connection).vendor)
+    return backend() if backend else None
+
+
+# ---------------------------------------------------------------------------
+# Documents
+# ---------------------------------------------------------------------------
+
+def _doc(kind, pk, parent_id, title, body):
+    return (doc_id(kind, pk), kind, parent_id, title or '', body or '')
+
+
+def _with_pdf_text(queryset, field, document_model=PdfDocument):
+    """Annotate each row with ``pdf_text``, the extracted text of the PDF named in ``field``."""
+    if document_model is None:
+        return queryset  # Migrations older than PdfDocument index without the extracted text
+    text = document_model.objects.filter(name=OuterRef(field)).values('text')[:1]
+    return queryset.annotate(pdf_text=Subquery(text))
+
+
+def _pdf_text(name):
+    if not name:
+        return None
+    return PdfDocument.objects.filter(name=name).values_list('text', flat=True).first()
+
+
+def _body(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def course_docs(courses):
+    for course in courses:
+        yield _doc('course', course.id, None, course.title, course.description)
+
+
+def lesson_docs(lessons):
+    for lesson in lessons:
+        body = _body(lesson.content, getattr(lesson, 'pdf_text', None))
+        yield _doc('lesson', lesson.id, lesson.course_id, lesson.title, body)
+
+
+def internship_docs(internships):
+    for internship in internships:
+        yield _doc('internship', internship.id, None, internship.title, internship.description)
+
+
+def project_docs(projects):
+    for project in projects:
+        yield _doc('project', project.id, project.internship_id, project.title, project.description)
+
+
+def material_docs(materials):
+    for material in materials:
+        yield _doc(
+            'material', material.id, material.internship_id, material.title, getattr(material, 'pdf_text', None)
+        )
+
+
+def _write(method, items):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        getattr(backend, method)(cursor, items)
+
+
+def index_course(course):
+    """Index an approved course with its lessons, or drop both from the index."""
+    lesson_ids = Lesson.objects.filter(course_id=course.id)
+    if course.status == 'Approved':
+        _write('upsert', course_docs([course]))
+        lessons = _with_pdf_text(lesson_ids.only('id', 'course_id', 'title', 'content'), 'notes_file')
+        _write('upsert', lesson_docs(lessons.iterator()))
+    else:
+        _write('delete', [doc_id('course', course.id)])
+        _write('delete', [doc_id('lesson', pk) for pk in lesson_ids.values_list('id', flat=True)])
+
+
+def index_lesson(lesson):
+    if Course.objects.filter(id=lesson.course_id, status='Approved').exists():
+        lesson.pdf_text = _pdf_text(lesson.notes_file)
+        _write('upsert', lesson_docs([lesson]))
+    else:
+        _write('delete', [doc_id('lesson', lesson.id)])
+
+
+def index_internship(internship):
+    _write('upsert', internship_docs([internship]))
+
+
+def index_project(project):
+    _write('upsert', project_docs([project]))
+
+
+def index_material(material):
+    material.pdf_text = _pdf_text(material.file_path)
+    _write('upsert', material_docs([material]))
+
+
+def unindex(kind, pk):
+    _write('delete', [doc_id(kind, pk)])
+
+
+def _batched(docs, size):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _historical_model(apps, name):
+    try:
+        return apps.get_model('lms', name)
+    except LookupError:
+        return None
+
+
+def rebuild(batch_size=REBUILD_BATCH_SIZE, apps=None, conn=None):
+    """
+    Recreate the index from the tables. Returns the number of documents
+    written. Migrations pass their historical ``apps`` and connection.
+    """
+    conn = conn or connection
+    backend = get_backend(conn)
+    if backend is None:
+        return 0
+    models = {
+        model.__name__: model
+        for model in (Course, Lesson, Internship, InternshipProject, InternshipMaterial, PdfDocument)
+    }
+    if apps is not None:
+        models = {name: _historical_model(apps, name) for name in models}
+    sources = [
+        course_docs(
+            models['Course'].objects.filter(status='Approved').only('id', 'title', 'description').iterator()
+        ),
+        lesson_docs(
+            _with_pdf_text(
+                models['Lesson'].objects.filter(course__status='Approved').only('id', 'course_id', 'title', 'content'),
+                'notes_file', models['PdfDocument'],
+            ).iterator(chunk_size=batch_size)
+        ),
+        internship_docs(models['Internship'].objects.only('id', 'title', 'description').iterator()),
+        project_docs(
+            models['InternshipProject'].objects.only('id', 'internship_id', 'title', 'description').iterator()
+        ),
+        material_docs(
+            _with_pdf_text(
+                models['InternshipMaterial'].objects.only('id', 'internship_id', 'title'), 'file_path',
+                models['PdfDocument'],
+            ).iterator(chunk_size=batch_size)
+        ),
+    ]
+    written = 0
+    # One transaction, so searches keep reading the old index until the new one is complete
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        backend.drop(cursor)
+        backend.create(cursor)
+        for docs in sources:
+            for batch in _batched(docs, batch_size):
+                backend.upsert(cursor, batch)
+                written += len(batch)
+        backend.optimize(cursor)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _link(kind, pk, parent_id):
+    if kind == 'course':
+        return reverse('detail', kwargs={'course_id': pk})
+    if kind == 'lesson':
+        return reverse('detail', kwargs={'course_id': parent_id})
+    return reverse('student_internship_list')
+
+
+def search(query, page=1, per_page=RESULTS_PER_PAGE):
+    """
+    One page of ranked hits for ``query``: {'results', 'page', 'has_next',
+    'has_previous'}. Each hit has kind, id, url and the highlighted title and
+    snippet (safe HTML).
+    """
+    words = terms(query)
+    page = max(1, min(page, MAX_PAGES))
+    backend = get_backend()
+    if not words or backend is None:
+        return {'results': [], 'page': page, 'has_next': False, 'has_previous': page > 1}
+    with connection.cursor() as cursor:
+        rows = backend.search(cursor, words, per_page + 1, (page - 1) * per_page)
+    results = [
+        {
+            'kind': kind,
+            'id': split_doc_id(rowid)[1],
+            'url': _link(kind, split_doc_id(rowid)[1], parent_id),
+            'title': highlight(title),
+            'snippet': highlight(snippet),
+        }
+        for rowid, kind, parent_id, title, snippet in rows[:per_page]
+    ]
+    return {
+        'results': results,
+        'page': page,
+        'has_next': len(rows) > per_page and page < MAX_PAGES,
+        'has_previous': page > 1,
+    }
+
+
+def suggest(query, limit=SUGGESTION_LIMIT):
+    """Title completions for a partly typed query, as [{'kind', 'title', 'url'}]."""
+    words = terms(query)
+    backend = get_backend()
+    if not words or len(words[-1]) < MIN_PREFIX_LENGTH or backend is None:
+        return []
+    with connection.cursor() as cursor:
+        rows = backend.suggest(cursor, words, limit)
+    return [
+        {'kind': kind, 'title': title, 'url': _link(kind, split_doc_id(rowid)[1], parent_id)}
+        for rowid, kind, parent_id, title in rows
+    ]
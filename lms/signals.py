@@ -0,0 +1,165 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import (
+    catalogue, documents, events, images, notifications, pagecache, principal, progress, search, storage, verification,
+)
+from .models import (
+    Admin, Category, Course, Enrollment, Instructor, Internship, InternshipEnrollment, InternshipMaterial,
+    InternshipProject, Lesson, Notification, Student,
+)
+
+
+SEARCH_KINDS = {
+    Course: 'course', Lesson: 'lesson', Internship: 'internship', InternshipProject: 'project',
+    InternshipMaterial: 'material',
+}
+
+
+def _release(*names):
+    for name in names:
+        if name and name != 'default.jpg':
+            transaction.on_commit(lambda name=name: storage.delete(name))
+
+
+@receiver(post_delete, sender=Course)
+def release_course_files(sender, instance, **kwargs):
+    _release(instance.image_file)
+    if instance.image_file and instance.image_file != 'default.jpg':
+        transaction.on_commit(lambda: images.release(instance.image_file))
+
+
+@receiver(post_save, sender=Course)
+def resize_course_image(sender, instance, **kwargs):
+    images.schedule(instance.image_file)
+
+
+@receiver(post_delete, sender=Lesson)
+def release_lesson_files(sender, instance, **kwargs):
+    _release(instance.video_file, instance.notes_file)
+    if instance.notes_file:
+        transaction.on_commit(lambda: documents.release(instance.notes_file))
+
+
+@receiver(post_delete, sender=InternshipMaterial)
+def release_material_files(sender, instance, **kwargs):
+    _release(instance.file_path)
+    if instance.file_path:
+        transaction.on_commit(lambda: documents.release(instance.file_path))
+
+
+@receiver(post_save, sender=Lesson)
+def recount_progress_on_new_lesson(sender, instance, created, **kwargs):
+    if created:
+        progress.recount_course(instance.course_id)
+
+
+@receiver(post_delete, sender=Lesson)
+def recount_progress_on_deleted_lesson(sender, instance, **kwargs):
+    # Its LessonCompletion rows were deleted with it; the counters still include them
+    progress.recount_course(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+def extract_lesson_notes(sender, instance, **kwargs):
+    documents.schedule(instance.notes_file)
+
+
+@receiver(post_save, sender=InternshipMaterial)
+def extract_material(sender, instance, **kwargs):
+    documents.schedule(instance.file_path)
+
+
+@receiver(post_delete, sender=InternshipEnrollment)
+def release_submission_files(sender, instance, **kwargs):
+    _release(instance.project_submission)
+
+
+@receiver([post_save, post_delete], sender=Admin)
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_principal(sender, instance, **kwargs):
+    principal.invalidate(instance)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        notifications.bump_unread([instance.student_id])
+        events.publish_notifications_on_commit([instance])
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Category)
+def refresh_catalogue_facets(sender, instance, **kwargs):
+    catalogue.invalidate_facets()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def bump_course_pages(sender, instance, **kwargs):
+    pagecache.bump('catalogue', f'course:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_catalogue_pages(sender, instance, **kwargs):
+    pagecache.bump('catalogue')
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def bump_lesson_outline(sender, instance, **kwargs):
+    pagecache.bump(f'course:{instance.course_id}')
+
+
+@receiver([post_save, post_delete], sender=Internship)
+@receiver([post_save, post_delete], sender=InternshipMaterial)
+def bump_internship_pages(sender, instance, **kwargs):
+    pagecache.bump('internships')
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    search.index_course(instance)
+
+
+@receiver(post_save, sender=Lesson)
+def index_lesson(sender, instance, **kwargs):
+    search.index_lesson(instance)
+
+
+@receiver(post_save, sender=Internship)
+def index_internship(sender, instance, **kwargs):
+    search.index_internship(instance)
+
+
+@receiver(post_save, sender=InternshipProject)
+def index_project(sender, instance, **kwargs):
+    search.index_project(instance)
+
+
+@receiver(post_save, sender=InternshipMaterial)
+def index_material(sender, instance, **kwargs):
+    search.index_material(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Internship)
+@receiver(post_delete, sender=InternshipProject)
+@receiver(post_delete, sender=InternshipMaterial)
+def unindex(sender, instance, **kwargs):
+    search.unindex(SEARCH_KINDS[sender], instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=InternshipEnrollment)
+def forget_verification(sender, instance, **kwargs):
+    verification.invalidate(instance.certificate_id)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Internship)
+def bump_certificate_names(sender, instance, **kwargs):
+    # Cached verification results show these names (courses are bumped by bump_course_pages)
+    pagecache.bump(f'{sender.__name__.lower()}:{instance.pk}')
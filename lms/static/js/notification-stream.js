@@ -0,0 +1,59 @@
+/*
+ * Live notifications for logged-in students.
+ *
+ * Opens the server-sent event stream named by data-stream-url on
+ * <body> and keeps the navbar unread badge in step. EventSource reconnects
+ * on its own and sends Last-Event-ID, so notifications published while the
+ * connection was down are replayed by the server.
+ *
+ * The stream is only offered when the site runs under ASGI. Otherwise
+ * <body> carries data-unread-url and the badge is refreshed by polling it.
+ */
+(function () {
+    const POLL_MILLISECONDS = 60000;
+    const badge = document.getElementById('unread-badge');
+
+    function showUnread(count) {
+        if (!badge) {
+            return;
+        }
+        badge.textContent = count;
+        badge.classList.toggle('d-none', !count);
+    }
+
+    const unreadUrl = document.body.dataset.unreadUrl;
+    if (unreadUrl) {
+        setInterval(function () {
+            if (document.hidden) {
+                return;
+            }
+            fetch(unreadUrl, { credentials: 'same-origin' })
+                .then(function (resp) { return resp.ok ? resp.json() : null; })
+                .then(function (data) { if (data) { showUnread(data.unread); } })
+                .catch(function () {});
+        }, POLL_MILLISECONDS);
+        return;
+    }
+
+    const url = document.body.dataset.streamUrl;
+    if (!url || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource(url);
+
+    source.addEventListener('notification', function () {
+        if (!badge) {
+            return;
+        }
+        showUnread((parseInt(badge.textContent, 10) || 0) + 1);
+    });
+
+    source.addEventListener('progress', function (e) {
+        const data = JSON.parse(e.data);
+        document.querySelectorAll(`[data-course-progress="${data.course_id}"]`).forEach(function (el) {
+            el.style.width = `${data.progress}%`;
+            el.setAttribute('aria-valuenow', data.progress);
+        });
+    });
+})();
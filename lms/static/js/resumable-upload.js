@@ -0,0 +1,142 @@
+/*
+ * Resumable uploads for large files.
+ *
+ * File inputs marked with data-resumable="<kind>" are sent in chunks to
+ * /uploads/ before the form is submitted. The form then only carries
+ * <input name>_upload_id. If the connection drops, the upload resumes from
+ * the last offset the server has, and re-selecting the same file after a
+ * reload picks up the unfinished session.
+ */
+(function () {
+    const MAX_RETRIES = 5;
+
+    function csrfToken(form) {
+        const input = form.querySelector('input[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function storageKey(kind, file) {
+        return `upload:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function request(url, options) {
+        const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+        const data = await response.json().catch(() => ({}));
+        return { response, data };
+    }
+
+    async function createSession(form, kind, file) {
+        const body = new FormData();
+        body.append('kind', kind);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        const { response, data } = await request('/uploads/', {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken(form) },
+            body: body
+        });
+        if (!response.ok) throw new Error(data.error || 'Could not start upload');
+        return data;
+    }
+
+    async function resumeSession(uploadId) {
+        const { response, data } = await request(`/uploads/${uploadId}/`, { method: 'GET' });
+        if (!response.ok || data.status !== 'Uploading') return null;
+        return data;
+    }
+
+    async function uploadFile(form, input, progress) {
+        const kind = input.dataset.resumable;
+        const file = input.files[0];
+        const key = storageKey(kind, file);
+
+        let session = null;
+        const previous = localStorage.getItem(key);
+        if (previous) session = await resumeSession(previous);
+        if (!session) session = await createSession(form, kind, file);
+        localStorage.setItem(key, session.upload_id);
+
+        const chunkSize = parseInt(session.chunk_size || 5 * 1024 * 1024, 10);
+        let offset = session.offset;
+        let retries = 0;
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + chunkSize);
+            try {
+                const { response, data } = await request(`/uploads/${session.upload_id}/`, {
+                    method: 'PATCH',
+                    headers: {
+                        'X-CSRFToken': csrfToken(form),
+                        'Upload-Offset': String(offset),
+                        'Content-Type': 'application/offset+octet-stream'
+                    },
+                    body: chunk
+                });
+                if (response.status === 409 && data.offset !== undefined) {
+                    offset = data.offset;
+                    continue;
+                }
+                if (!response.ok) throw new Error(data.error || 'Upload failed');
+                offset = data.offset;
+                retries = 0;
+                progress(offset / file.size);
+            } catch (err) {
+                if (++retries > MAX_RETRIES) throw err;
+                await sleep(1000 * 2 ** retries);
+                const current = await resumeSession(session.upload_id).catch(() => null);
+                if (current) offset = current.offset;
+            }
+        }
+
+        const { response, data } = await request(`/uploads/${session.upload_id}/finalize/`, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken(form) }
+        });
+        if (!response.ok) throw new Error(data.error || 'Could not finish upload');
+        localStorage.removeItem(key);
+        return session.upload_id;
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('form').forEach(form => {
+            const inputs = form.querySelectorAll('input[type=file][data-resumable]');
+            if (!inputs.length) return;
+
+            form.addEventListener('submit', async function (e) {
+                const pending = Array.from(inputs).filter(input => input.files.length);
+                if (!pending.length) return;
+                e.preventDefault();
+
+                const button = form.querySelector('[type=submit]');
+                if (button) button.disabled = true;
+
+                try {
+                    for (const input of pending) {
+                        const label = document.createElement('div');
+                        label.className = 'small text-muted mt-1';
+                        input.after(label);
+                        const uploadId = await uploadFile(form, input, fraction => {
+                            label.textContent = `Uploading ${input.files[0].name}: ${Math.floor(fraction * 100)}%`;
+                        });
+
+                        const hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = `${input.name}_upload_id`;
+                        hidden.value = uploadId;
+                        form.appendChild(hidden);
+                        // Keep the browser from sending the bytes a second time
+                        input.disabled = true;
+                    }
+                    form.submit();
+                } catch (err) {
+                    alert('Upload failed: ' + err.message);
+                    if (button) button.disabled = false;
+                }
+            });
+        });
+    });
+})();
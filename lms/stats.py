@@ -0,0 +1,129 @@
+"""
+Daily statistics rollup.
+
+``rollup_daily_stats`` recounts whole days, from the day holding the last
+watermark up to now, grouped by day (and course where it applies), and
+stores the counts in the matching DailyStat buckets. Rows are stamped when
+created but only seen once their transaction commits, so a bulk enrollment
+or import still running at rollup time would be missed if the watermark
+simply moved to "now". It moves to now - GRACE instead. The next run counts
+the overlap again, and because days are recounted rather than added to,
+doing so is harmless.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    DailyStat, Enrollment, InternshipEnrollment, InternshipQuizResult, LessonCompletion,
+    QuizResult, StatWatermark,
+)
+
+WATERMARK_NAME = 'daily_stats'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+GRACE = timedelta(hours=1)  # Longer than any transaction that stamps rows before committing them
+COUNTERS = ('enrollments', 'completions', 'lesson_completions', 'quiz_attempts', 'internship_enrollments')
+
+
+def _sources():
+    """(queryset, timestamp field, course lookup or None, DailyStat counter) per metric."""
+    return [
+        (Enrollment.objects.all(), 'created_at', 'course_id', 'enrollments'),
+        (Enrollment.objects.filter(status='Completed'), 'completed_at', 'course_id', 'completions'),
+        (LessonCompletion.objects.all(), 'completed_at', 'lesson__course_id', 'lesson_completions'),
+        (QuizResult.objects.all(), 'attempted_at', 'quiz__course_id', 'quiz_attempts'),
+        (InternshipQuizResult.objects.all(), 'attempted_at', None, 'quiz_attempts'),
+        (InternshipEnrollment.objects.all(), 'created_at', None, 'internship_enrollments'),
+    ]
+
+
+def _active_students(days):
+    """{day: distinct students who completed a lesson or attempted a quiz} for ``days``, from one query."""
+    start = timezone.make_aware(datetime.combine(min(days), time.min))
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min))
+    activity = [
+        queryset.filter(**{f'{ts_field}__gte': start, f'{ts_field}__lt': end})
+        .annotate(day=TruncDate(ts_field))
+        .filter(day__in=days)
+        .order_by()
+        .values('day', 'student_id')
+        for queryset, ts_field in (
+            (LessonCompletion.objects.all(), 'completed_at'),
+            (QuizResult.objects.all(), 'attempted_at'),
+            (InternshipQuizResult.objects.all(), 'attempted_at'),
+        )
+    ]
+    # UNION (not ALL) leaves one row per student and day
+    counts = defaultdict(int)
+    for row in activity[0].union(*activity[1:]):
+        counts[row['day']] += 1
+    return counts
+
+
+def _apply(day, course_id, values):
+    bucket = DailyStat.objects.filter(date=day, course_id=course_id)
+    if bucket.update(**values):
+        return
+    try:
+        with transaction.atomic():
+            DailyStat.objects.create(date=day, course_id=course_id, **values)
+    except IntegrityError:
+        bucket.update(**values)
+
+
+def rollup_daily_stats(now=None):
+    """Recount the days since the last run into DailyStat. Returns the days touched."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        watermark, _ = StatWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK_NAME, defaults={'processed_until': EPOCH}
+        )
+        first_day = timezone.localdate(watermark.processed_until)
+        start = timezone.make_aware(datetime.combine(first_day, time.min))
+
+        # {(day, course_id): {counter: n}}; course_id None is the site-wide bucket
+        buckets = defaultdict(lambda: defaultdict(int))
+        for queryset, ts_field, course_path, counter in _sources():
+            window = queryset.filter(**{f'{ts_field}__gte': start, f'{ts_field}__lt': now})
+            group = ['day'] + ([course_path] if course_path else [])
+            rows = window.annotate(day=TruncDate(ts_field)).order_by().values(*group).annotate(n=Count('id'))
+            for row in rows:
+                buckets[(row['day'], None)][counter] += row['n']
+                if course_path:
+                    buckets[(row['day'], row[course_path])][counter] += row['n']
+
+        today = timezone.localdate(now)
+        recounted = DailyStat.objects.filter(date__gte=first_day)
+        days = {day for day, _ in buckets} | {today}
+        days.update(recounted.filter(course__isnull=True).values_list('date', flat=True))
+        pending = InternshipEnrollment.objects.filter(project_status='Submitted').count()
+
+        # Counts are set, not added, so buckets whose rows are gone must drop to zero
+        recounted.update(**{field: 0 for field in COUNTERS})
+        for (day, course_id), counters in buckets.items():
+            if course_id is None:
+                continue
+            _apply(day, course_id, dict(counters))
+        active = _active_students(days)
+        for day in days:
+            values = dict(buckets.get((day, None), {}), active_students=active[day])
+            if day == today:
+                values['submissions_pending'] = pending
+            _apply(day, None, values)
+
+        watermark.processed_until = max(watermark.processed_until, now - GRACE)
+        watermark.save(update_fields=['processed_until'])
+    return sorted(days)
+
+
+def site_trend(days=365, today=None):
+    today = today or timezone.localdate()
+    return list(
+        DailyStat.objects.filter(course__isnull=True, date__gt=today - timedelta(days=days))
+        .order_by('date')
+        .values('date', 'enrollments', 'completions', 'active_students', 'submissions_pending')
+    )
@@ -0,0 +1,143 @@
+"""
+Content-addressed media storage.
+
+Every upload is hashed (SHA-256) while it is written and stored once under
+MEDIA_ROOT/blobs/<aa>/<bb>/<hash>. Model columns keep a logical filename such as
+``vid_1a2b3c4d_intro.mp4``; StoredFile maps that name to its blob and MediaBlob
+counts how many names point at each blob.
+"""
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import MediaBlob, StoredFile
+
+# Files uploaded before the Django port still live in the app's static uploads folder
+LEGACY_UPLOAD_DIR = os.path.join(settings.BASE_DIR, 'lms', 'static', 'uploads')
+
+READ_SIZE = 64 * 1024
+
+
+def blob_root():
+    return os.path.join(settings.MEDIA_ROOT, 'blobs')
+
+
+def blob_path(digest):
+    return os.path.join(blob_root(), digest[:2], digest[2:4], digest)
+
+
+def _tmp_path():
+    tmp_dir = os.path.join(blob_root(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    return os.path.join(tmp_dir, uuid.uuid4().hex)
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            h.update(data)
+            size += len(data)
+    return h.hexdigest(), size
+
+
+def _ingest(tmp, digest, size, name):
+    """Link ``name`` to the blob for ``digest``, moving ``tmp`` into its shard unless the blob file exists."""
+    target = blob_path(digest)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+                    if blob is None:
+                        blob = MediaBlob.objects.create(sha256=digest, size=size)
+                    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                    StoredFile.objects.create(name=name, blob=blob)
+                    # Checked while holding the blob row (the database write lock on SQLite), which delete()
+                    # also holds when it unlinks the last copy, so the file cannot vanish after this check
+                    if os.path.exists(target):
+                        os.remove(tmp)
+                    else:
+                        os.replace(tmp, target)
+                return name
+            except IntegrityError:
+                # Another request created the same blob between our lookup and create
+                if attempt:
+                    raise
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return name
+
+
+def save(chunks, name):
+    """Write an iterable of byte chunks under the logical ``name``, hashing as it goes."""
+    name = os.path.basename(name)
+    tmp = _tmp_path()
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, 'wb') as dest:
+            for chunk in chunks:
+                h.update(chunk)
+                size += len(chunk)
+                dest.write(chunk)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return _ingest(tmp, h.hexdigest(), size, name)
+
+
+def save_file(path, name, digest=None, size=None):
+    """Take ownership of the file at ``path`` (it is moved, not copied) under ``name``."""
+    name = os.path.basename(name)
+    if digest is None:
+        digest, size = hash_file(path)
+    tmp = _tmp_path()
+    os.replace(path, tmp)
+    return _ingest(tmp, digest, size, name)
+
+
+def exists(name):
+    return StoredFile.objects.filter(name=os.path.basename(name or '')).exists()
+
+
+def path(name):
+    """Absolute path for a logical name, falling back to the old flat upload folders."""
+    name = os.path.basename(name or '')
+    if not name:
+        return None
+    digest = StoredFile.objects.filter(name=name).values_list('blob__sha256', flat=True).first()
+    if digest:
+        return blob_path(digest)
+    for root in (settings.MEDIA_ROOT, LEGACY_UPLOAD_DIR):
+        candidate = os.path.join(root, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def delete(name):
+    """Drop a logical name; the blob goes away with its last reference."""
+    name = os.path.basename(name or '')
+    with transaction.atomic():
+        stored = StoredFile.objects.filter(name=name).first()
+        if not stored:
+            return
+        blob = MediaBlob.objects.select_for_update().get(pk=stored.blob_id)
+        stored.delete()
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+        if MediaBlob.objects.filter(pk=blob.pk, ref_count__lte=0).delete()[0]:
+            # Unlinked before the row lock is released: an _ingest() of the same content waits for it,
+            # finds no blob row and puts its own copy in place
+            try:
+                os.remove(blob_path(blob.sha256))
+            except FileNotFoundError:
+                pass
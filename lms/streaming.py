@@ -0,0 +1,121 @@
+import mimetypes
+import os
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+# Read size for each chunk pushed to the client. Keeps memory per request constant
+# no matter how large the file is.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match lists ``etag`` (or is ``*``)."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return etag in tags or '*' in tags
+
+
+def iter_file_range(path, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield ``length`` bytes of ``path`` starting at ``start``, one chunk at a time."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range against a file of ``size`` bytes.
+    Returns (start, end) inclusive, None if the header should be ignored
+    (missing, malformed or multi-range) and raises ValueError if unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def ranged_file_response(request, path, content_type=None, cache_control='private, max-age=3600'):
+    """
+    Serve ``path`` with support for Range / If-Range / If-None-Match.
+    The body is streamed from disk in STREAM_CHUNK_SIZE pieces.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+
+    if content_type is None:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if _if_range_matches(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(iter_file_range(path, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        length = size
+        response = StreamingHttpResponse(iter_file_range(path, 0, size), content_type=content_type)
+
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = cache_control
+    return response
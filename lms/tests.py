@@ -1,9 +1,50 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.utils import timezone
+from datetime import timedelta
 from django.urls import reverse
 from .models import (
     Student, Notification, Instructor, Admin, Internship, 
-    InternshipQuiz, InternshipEnrollment
+    InternshipQuiz, InternshipEnrollment, Category, Course, Lesson, Enrollment,
+    InternshipMaterial, MediaBlob, StoredFile, LessonCompletion, InternshipQuizResult,
+    InternshipQuizBest, Quiz, QuizResult, DailyStat, ImportJob, Broadcast, InternshipProject, Job, ImageVariant,
+    PdfDocument, UploadSession,
 )
+from . import (
+    broadcasts, catalogue, certificates, documents, events, images, imports, jobs, notifications, passwords, pdf, search,
+    storage, quizzes, reports, stats, uploads, verification,
+)
+from .pagination import keyset_paginate
+from .progress import record_lesson_completion
+import asyncio
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+from unittest import skipUnless
+
+@jobs.task
+def create_category_job(name):
+    Category.objects.get_or_create(name=name)
+
+
+@jobs.task
+def failing_job():
+    raise RuntimeError("boom")
+
+
+@jobs.task
+def locked_job():
+    raise OperationalError("database is locked")
+
 
 class StudentNotificationTest(TestCase):
     def setUp(self):
@@ -108,3 +149,1399 @@ class InternshipTest(TestCase):
         resp = self.client.get(reverse('student_internship_certificate', args=[self.internship.id]))
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, 'Certificate of Completion')
+
+
+class LessonMediaStreamTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        with open(os.path.join(self.media_root, 'vid_test.mp4'), 'wb') as f:
+            f.write(b'0123456789')
+
+        self.client = Client()
+        self.student = Student.objects.create(username='viewer', email='v@test.com')
+        category = Category.objects.create(name='Video')
+        self.course = Course.objects.create(title='Streams', category=category, status='Approved')
+        self.lesson = Lesson.objects.create(course=self.course, title='Intro', video_file='vid_test.mp4')
+        self.url = reverse('student_lesson_media', args=[self.lesson.id, 'video'])
+
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+
+    def test_requires_enrollment(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 403)
+
+    def test_range_request(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(resp.streaming_content), b'0123456789')
+
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(resp.streaming_content), b'2345')
+
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(resp.streaming_content), b'789')
+
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(resp.status_code, 416)
+
+        # A stale If-Range validator falls back to the full body
+        resp = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200)
+
+        etag = resp['ETag']
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_learn_page_links_stream(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        resp = self.client.get(reverse('student_learn', args=[self.course.id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, self.url)
+
+
+class ResumableUploadTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = Client()
+        self.admin = Admin.objects.create(username='admin')
+        self.internship = Internship.objects.create(title='Uploads')
+        session = self.client.session
+        session['admin_id'] = self.admin.id
+        session.save()
+
+    def test_resume_and_finalize(self):
+        resp = self.client.post(reverse('upload_create'), {'kind': 'material', 'filename': 'notes.pdf', 'size': 10})
+        self.assertEqual(resp.status_code, 201)
+        upload_id = resp.json()['upload_id']
+        url = reverse('upload_detail', args=[upload_id])
+
+        resp = self.client.generic('PATCH', url, b'01234', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(resp.json()['offset'], 5)
+
+        # Replaying the same chunk reports where to resume from
+        resp = self.client.generic('PATCH', url, b'01234', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['offset'], 5)
+
+        resp = self.client.post(reverse('upload_finalize', args=[upload_id]))
+        self.assertEqual(resp.status_code, 409)
+
+        self.client.generic('PATCH', url, b'56789', HTTP_UPLOAD_OFFSET='5')
+        self.assertEqual(self.client.get(url).json()['offset'], 10)
+
+        resp = self.client.post(reverse('upload_finalize', args=[upload_id]))
+        self.assertEqual(resp.status_code, 200)
+        stored = resp.json()['filename']
+        self.assertTrue(stored.startswith('int_mat_'))
+        with open(storage.path(stored), 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+        # The form only carries the upload id
+        self.client.post(reverse('admin_edit_internship', args=[self.internship.id]), {
+            'add_material': '1', 'mat_title': 'Notes', 'mat_file_upload_id': upload_id
+        })
+        self.assertEqual(InternshipMaterial.objects.get(internship=self.internship).file_path, stored)
+
+    def test_course_image_upload(self):
+        resp = self.client.post(reverse('upload_create'), {'kind': 'image', 'filename': 'cover.jpg', 'size': 4})
+        upload_id = resp.json()['upload_id']
+        self.client.generic('PATCH', reverse('upload_detail', args=[upload_id]), b'jpeg', HTTP_UPLOAD_OFFSET='0')
+        stored = self.client.post(reverse('upload_finalize', args=[upload_id])).json()['filename']
+
+        category = Category.objects.create(name='Art')
+        self.client.post(reverse('admin_create_course'), {
+            'title': 'Drawing', 'category_id': category.id, 'image_file_upload_id': upload_id
+        })
+        self.assertEqual(Course.objects.get(title='Drawing').image_file, stored)
+        # An upload is claimed once; without one the course keeps the default image
+        self.client.post(reverse('admin_create_course'), {
+            'title': 'Painting', 'category_id': category.id, 'image_file_upload_id': upload_id
+        })
+        self.assertEqual(Course.objects.get(title='Painting').image_file, 'default.jpg')
+
+    def test_racing_chunks_and_finalizes(self):
+        resp = self.client.post(reverse('upload_create'), {'kind': 'material', 'filename': 'race.pdf', 'size': 4})
+        upload_id = resp.json()['upload_id']
+        first, second = (UploadSession.objects.get(upload_id=upload_id) for _ in range(2))
+
+        class Racing(io.BytesIO):
+            # The rival PATCH arrives while this chunk is being written
+            def read(inner, size=-1):
+                with self.assertRaises(uploads.UploadError) as ctx:
+                    uploads.write_chunk(second, 0, io.BytesIO(b'wxyz'), 4)
+                self.assertEqual(ctx.exception.status, 409)
+                return super().read(size)
+
+        self.assertEqual(uploads.write_chunk(first, 0, Racing(b'abcd'), 4), 4)
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(second, 0, io.BytesIO(b'wxyz'), 4)
+
+        first, second = (UploadSession.objects.get(upload_id=upload_id) for _ in range(2))
+        name = uploads.finalize(first)
+        self.assertEqual(uploads.finalize(second), name)
+        self.assertEqual(UploadSession.objects.get(upload_id=upload_id).status, 'Complete')
+        with open(storage.path(name), 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+    def test_busy_server_asks_client_to_retry(self):
+        resp = self.client.post(reverse('upload_create'), {'kind': 'material', 'filename': 'a.pdf', 'size': 3})
+        url = reverse('upload_detail', args=[resp.json()['upload_id']])
+        with mock.patch.object(uploads, 'MAX_CONCURRENT_UPLOADS', 0), \
+                mock.patch.object(uploads, 'UPLOAD_SLOT_TIMEOUT', 0.01):
+            resp = self.client.generic('PATCH', url, b'abc', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp['Retry-After'], '5')
+        self.assertEqual(resp.json()['offset'], 0)
+
+    def test_other_users_cannot_touch_upload(self):
+        resp = self.client.post(reverse('upload_create'), {'kind': 'material', 'filename': 'a.pdf', 'size': 3})
+        upload_id = resp.json()['upload_id']
+
+        session = self.client.session
+        session.pop('admin_id')
+        session['student_id'] = Student.objects.create(username='s', email='s@x.com').id
+        session.save()
+        resp = self.client.get(reverse('upload_detail', args=[upload_id]))
+        self.assertEqual(resp.status_code, 404)
+
+
+class MediaStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_identical_uploads_share_one_blob(self):
+        storage.save([b'same ', b'bytes'], 'int_mat_1_a.pdf')
+        storage.save([b'same bytes'], 'proj_sub_2_a.pdf')
+
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(storage.path('int_mat_1_a.pdf'), storage.path('proj_sub_2_a.pdf'))
+        self.assertIn(os.path.join('blobs', blob.sha256[:2], blob.sha256[2:4]), storage.path('int_mat_1_a.pdf'))
+
+        storage.delete('int_mat_1_a.pdf')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        storage.delete('proj_sub_2_a.pdf')
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(storage.blob_path(blob.sha256)))
+
+    def test_missing_blob_file_is_put_back(self):
+        storage.save([b'shared'], 'int_mat_1_a.pdf')
+        os.remove(storage.path('int_mat_1_a.pdf'))  # As if a racing delete() had unlinked it
+        storage.save([b'shared'], 'int_mat_2_a.pdf')
+        with open(storage.path('int_mat_1_a.pdf'), 'rb') as f:
+            self.assertEqual(f.read(), b'shared')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        self.assertEqual(os.listdir(os.path.join(storage.blob_root(), 'tmp')), [])
+
+        storage.delete('int_mat_1_a.pdf')
+        storage.delete('int_mat_2_a.pdf')
+        storage.save([b'shared'], 'int_mat_3_a.pdf')
+        self.assertTrue(os.path.exists(storage.path('int_mat_3_a.pdf')))
+
+    def test_migrate_media_command(self):
+        from django.core.management import call_command
+        from io import StringIO
+
+        for name in ('int_mat_1_x.pdf', 'proj_sub_2_x.pdf'):
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(b'duplicate')
+
+        out = StringIO()
+        call_command('migrate_media', stdout=out)
+        self.assertIn('2 files migrated, 1 duplicates', out.getvalue())
+        self.assertEqual(StoredFile.objects.count(), 2)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'int_mat_1_x.pdf')))
+
+    def test_project_submissions_are_private(self):
+        instructor = Instructor.objects.create(username='mentor', email='mentor@corp.com')
+        internship = Internship.objects.create(title='Private', instructor=instructor)
+        owner, other = (Student.objects.create(username=u, email=f'{u}@corp.com') for u in ('owner', 'other'))
+        name = storage.save([b'my project'], 'proj_sub_12345678_report.pdf')
+        enrollment = InternshipEnrollment.objects.create(student=owner, internship=internship, project_submission=name)
+        url = reverse('project_submission_file', kwargs={'enrollment_id': enrollment.id})
+
+        self.assertEqual(self.client.get(reverse('media_file', kwargs={'name': name})).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        for role, account, allowed in (
+            ('student', other, False), ('student', owner, True), ('instructor', instructor, True),
+            ('admin', Admin.objects.create(username='root'), True),
+        ):
+            client = Client()
+            session = client.session
+            session[f'{role}_id'] = account.id
+            session.save()
+            resp = client.get(url)
+            self.assertEqual(resp.status_code, 200 if allowed else 403, role)
+            if allowed:
+                self.assertEqual(b''.join(resp.streaming_content), b'my project')
+                self.assertTrue(resp['Cache-Control'].startswith('private'))
+
+
+class LessonCompletionTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.student = Student.objects.create(username='learner', email='l@test.com')
+        category = Category.objects.create(name='Progress')
+        self.course = Course.objects.create(title='Two Lessons', category=category, status='Approved')
+        self.lessons = [Lesson.objects.create(course=self.course, title=f'L{i}') for i in range(2)]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+
+    def complete(self, lesson):
+        return self.client.post(reverse('student_complete_lesson', args=[lesson.id])).json()
+
+    def test_progress_is_incremental_and_idempotent(self):
+        self.assertEqual(self.complete(self.lessons[0]), {'success': True, 'progress': 50.0, 'status': 'Active'})
+        # Second click from another tab must not double count
+        self.assertEqual(self.complete(self.lessons[0])['progress'], 50.0)
+        self.assertEqual(LessonCompletion.objects.count(), 1)
+
+        data = self.complete(self.lessons[1])
+        self.assertEqual(data['progress'], 100.0)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.status, 'Completed')
+        self.assertEqual(self.enrollment.completed_lessons, 2)
+        self.assertIsNotNone(self.enrollment.completed_at)
+        self.assertIsNotNone(self.enrollment.certificate_id)
+
+    def test_lesson_changes_recount_progress(self):
+        self.complete(self.lessons[0])
+        third = Lesson.objects.create(course=self.course, title='L2')
+        self.complete(third)
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, round(self.enrollment.progress)), (2, 67))
+
+        # Deleting a completed lesson must not leave its completion counted towards 100%
+        self.lessons[0].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.progress), (1, 50.0))
+        self.assertEqual(self.enrollment.status, 'Active')
+
+        # Deleting the one lesson left to do completes the course
+        self.lessons[1].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.progress, self.enrollment.status), (100.0, 'Completed'))
+        self.assertIsNotNone(self.enrollment.certificate_id)
+
+    def test_completed_course_links_certificate(self):
+        certificate_url = reverse('student_certificate', args=[self.course.id])
+        self.assertRedirects(self.client.get(certificate_url), reverse('student_dashboard'))
+
+        for lesson in self.lessons:
+            self.complete(lesson)
+        self.enrollment.refresh_from_db()
+        self.assertContains(self.client.get(reverse('student_learn', args=[self.course.id])), certificate_url)
+        resp = self.client.get(certificate_url)
+        self.assertContains(resp, 'Two Lessons')
+        self.assertContains(resp, self.enrollment.certificate_id)
+
+    def test_requires_enrollment(self):
+        self.enrollment.delete()
+        resp = self.client.post(reverse('student_complete_lesson', args=[self.lessons[0].id]))
+        self.assertEqual(resp.status_code, 403)
+
+
+class CompiledQuizTest(TestCase):
+    def setUp(self):
+        quizzes._local.clear()
+        internship = Internship.objects.create(title='Quiz Cache')
+        self.quiz = InternshipQuiz.objects.create(
+            internship=internship, title='Q',
+            questions_data='[{"text": "Q1", "options": ["A", "B"], "correct": "A"}, '
+                           '{"text": "Q2", "options": ["C", "D"], "correct": "D"}]'
+        )
+
+    def test_compiled_once_and_invalidated_by_edit(self):
+        compiled = quizzes.compile_quiz(self.quiz)
+        self.assertEqual(compiled.answer_key, ('A', 'D'))
+        self.assertIs(quizzes.compile_quiz(self.quiz), compiled)
+        self.assertEqual(quizzes.grade(compiled, {'q_0': 'A', 'q_1': 'C'})[:2], (1, 2))
+
+        self.quiz.questions_data = '[{"text": "Q1", "options": ["A", "B"], "correct": "B"}]'
+        self.quiz.save()
+        self.assertEqual(quizzes.compile_quiz(self.quiz).answer_key, ('B',))
+
+
+class InternshipQuizResultTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='quizzer', email='q@test.com')
+        self.internship = Internship.objects.create(title='Graded')
+        self.quizzes = [
+            InternshipQuiz.objects.create(
+                internship=self.internship, title=f'Q{i}',
+                questions_data='[{"text": "Q", "options": ["A", "B"], "correct": "A"}]'
+            ) for i in range(2)
+        ]
+
+    def test_best_score_and_passed_all(self):
+        first, second = self.quizzes
+        quizzes.record_attempt(self.student.id, first, 0.0, ['B'])
+        quizzes.record_attempt(self.student.id, first, 100.0, ['A'])
+        quizzes.record_attempt(self.student.id, first, 0.0, ['B'])
+
+        best = InternshipQuizBest.objects.get(student=self.student, quiz=first)
+        self.assertEqual((best.best_score, best.passed, best.attempts), (100.0, True, 3))
+        self.assertEqual(InternshipQuizResult.objects.filter(quiz=first).count(), 3)
+        self.assertFalse(quizzes.has_passed_all_quizzes(self.student.id, self.internship.id))
+
+        quizzes.record_attempt(self.student.id, second, 100.0, ['A'])
+        with self.assertNumQueries(1):
+            self.assertTrue(quizzes.has_passed_all_quizzes(self.student.id, self.internship.id))
+
+    def test_quiz_must_belong_to_the_internship(self):
+        other = Internship.objects.create(title='Other')
+        InternshipEnrollment.objects.create(student=self.student, internship=other)
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+        url = reverse('student_take_internship_quiz', args=[other.id, self.quizzes[0].id])
+        self.assertEqual(self.client.post(url, {'q_0': 'A'}).status_code, 404)
+        self.assertFalse(InternshipQuizBest.objects.exists())
+
+
+class AdminReportTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Reports')
+        students = [Student.objects.create(username=f's{i}', email=f's{i}@test.com') for i in range(3)]
+        self.course = Course.objects.create(title='Popular', category=category, status='Approved')
+        Course.objects.create(title='Quiet', category=category)
+        for i in range(2):
+            Lesson.objects.create(course=self.course, title=f'L{i}')
+        Enrollment.objects.create(student=students[0], course=self.course, progress=100, status='Completed')
+        Enrollment.objects.create(student=students[1], course=self.course, progress=50)
+        quiz = Quiz.objects.create(course=self.course, title='Q')
+        QuizResult.objects.create(student=students[0], quiz=quiz, score=90, passed=True)
+        QuizResult.objects.create(student=students[1], quiz=quiz, score=10, passed=False)
+
+    def test_course_stats_in_constant_queries(self):
+        with self.assertNumQueries(6):
+            report = reports.build_admin_report(use_cache=False)
+        top = report['course_stats'][0]
+        self.assertEqual(top['title'], 'Popular')
+        self.assertEqual(top['enrollment_count'], 2)
+        self.assertEqual(top['completion_count'], 1)
+        self.assertEqual(top['avg_progress'], 75.0)
+        self.assertEqual(top['lesson_count'], 2)
+        self.assertEqual(top['quiz_pass_rate'], 50.0)
+        self.assertEqual(report['course_stats'][1]['lesson_count'], 0)
+
+    def test_report_view(self):
+        admin = Admin.objects.create(username='reporter')
+        session = self.client.session
+        session['admin_id'] = admin.id
+        session.save()
+        resp = self.client.get(reverse('admin_reports'), {'sort': 'title'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Quiet')
+
+
+class DailyStatRollupTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Trends')
+        self.course = Course.objects.create(title='Trending', category=category)
+        self.lesson = Lesson.objects.create(course=self.course, title='L')
+        self.students = [Student.objects.create(username=f't{i}', email=f't{i}@test.com') for i in range(2)]
+
+    def test_incremental_rollup(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        LessonCompletion.objects.create(student=self.students[0], lesson=self.lesson)
+        stats.rollup_daily_stats()
+
+        site = DailyStat.objects.get(course__isnull=True)
+        self.assertEqual((site.enrollments, site.lesson_completions, site.active_students), (1, 1, 1))
+
+        # Re-running without new rows changes nothing
+        stats.rollup_daily_stats()
+        self.assertEqual(DailyStat.objects.get(course__isnull=True).enrollments, 1)
+
+        Enrollment.objects.create(student=self.students[1], course=self.course)
+        stats.rollup_daily_stats()
+        self.assertEqual(DailyStat.objects.get(course=self.course).enrollments, 2)
+        self.assertEqual(DailyStat.objects.get(course__isnull=True).enrollments, 2)
+        self.assertEqual(len(stats.site_trend()), 1)
+
+    def test_late_commits_are_counted_once(self):
+        now = timezone.now()
+        stats.rollup_daily_stats(now=now)
+        # Stamped before that run, but committed (so first visible) after it, like a long bulk import
+        stamped = now - timedelta(minutes=5)
+        Enrollment.objects.create(student=self.students[0], course=self.course, created_at=stamped)
+        for _ in range(2):
+            stats.rollup_daily_stats(now=now + timedelta(minutes=1))
+            self.assertEqual(DailyStat.objects.get(course__isnull=True, date=timezone.localdate(stamped)).enrollments, 1)
+
+    def test_active_students_per_day(self):
+        quiz = Quiz.objects.create(course=self.course, title='Q')
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+        LessonCompletion.objects.create(student=self.students[0], lesson=self.lesson, completed_at=yesterday)
+        QuizResult.objects.create(student=self.students[0], quiz=quiz, score=1, attempted_at=yesterday)
+        QuizResult.objects.create(student=self.students[0], quiz=quiz, score=1, attempted_at=now)
+        QuizResult.objects.create(student=self.students[1], quiz=quiz, score=1, attempted_at=now)
+
+        days = {timezone.localdate(yesterday), timezone.localdate(now)}
+        with self.assertNumQueries(1):
+            active = stats._active_students(days)
+        self.assertEqual(active, {timezone.localdate(yesterday): 1, timezone.localdate(now): 2})
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # Two rows share a timestamp so the id tie-breaker matters
+        stamps = [now - timedelta(minutes=m) for m in (0, 1, 1, 2, 3)]
+        self.students = [
+            Student.objects.create(username=f'k{i}', email=f'k{i}@test.com', created_at=ts)
+            for i, ts in enumerate(stamps)
+        ]
+
+    def test_walk_forward_and_back(self):
+        seen = []
+        params = {}
+        while True:
+            page = keyset_paginate(Student.objects.all(), params, per_page=2)
+            seen.extend(s.username for s in page)
+            if not page.has_next:
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(seen, ['k0', 'k2', 'k1', 'k3', 'k4'])
+
+        back = keyset_paginate(Student.objects.all(), {'before': page.previous_cursor}, per_page=2)
+        self.assertEqual([s.username for s in back], ['k1', 'k3'])
+        self.assertTrue(back.has_previous)
+
+        oldest = keyset_paginate(Student.objects.all(), {'sort': 'oldest'}, per_page=2)
+        self.assertEqual([s.username for s in oldest], ['k4', 'k3'])
+
+    def test_enrollment_list_query_count_is_constant(self):
+        admin = Admin.objects.create(username='lister')
+        session = self.client.session
+        session['admin_id'] = admin.id
+        session.save()
+        category = Category.objects.create(name='Keyset')
+        course = Course.objects.create(title='C', category=category)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('admin_view_enrollments'))
+            return len(ctx)
+
+        Enrollment.objects.create(student=self.students[0], course=course)
+        count_queries()  # Warm the cached principal
+        few = count_queries()
+        for student in self.students[1:]:
+            Enrollment.objects.create(student=student, course=course)
+        self.assertEqual(count_queries(), few)
+
+
+class QueryPlanTest(TestCase):
+    """The hot lookups must be answered from an index, not a table scan or a sort."""
+
+    def assertUsesIndex(self, queryset):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plan assertions are written for SQLite's EXPLAIN QUERY PLAN")
+        plan = queryset.explain()
+        self.assertRegex(plan, r'USING (COVERING )?INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_hot_queries_use_indexes(self):
+        self.assertUsesIndex(Enrollment.objects.filter(student_id=1, course_id=1))
+        self.assertUsesIndex(InternshipEnrollment.objects.filter(student_id=1, internship_id=1))
+        self.assertUsesIndex(Notification.objects.filter(student_id=1, is_read=False).order_by('-created_at'))
+        self.assertUsesIndex(Notification.objects.filter(student_id=1).order_by('-created_at'))
+        self.assertUsesIndex(Course.objects.order_by('-created_at'))
+        self.assertUsesIndex(
+            InternshipEnrollment.objects.filter(project_submission__isnull=False).order_by('-created_at', '-id')
+        )
+        self.assertUsesIndex(Enrollment.objects.order_by('-created_at', '-id'))
+        self.assertUsesIndex(Student.objects.order_by('-created_at', '-id'))
+        self.assertUsesIndex(catalogue.approved_courses().order_by('-created_at', '-pk'))
+        self.assertUsesIndex(catalogue.approved_courses(category_id=1).order_by('-created_at', '-pk'))
+
+
+class BulkEnrollTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Bulk')
+        self.course = Course.objects.create(title='Cohort', category=category)
+        self.internship = Internship.objects.create(title='Cohort Internship')
+        self.students = [Student.objects.create(username=f'b{i}', email=f'b{i}@corp.com') for i in range(3)]
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+
+        self.admin = Admin.objects.create(username='bulk')
+        session = self.client.session
+        session['admin_id'] = self.admin.id
+        session.save()
+
+    def test_upload_csv(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        csv_file = SimpleUploadedFile('cohort.csv', b'email\nb0@corp.com\nb1\nb2@corp.com\nb1\nnobody\n')
+        resp = self.client.post(reverse('admin_bulk_enroll'), {
+            'csv_file': csv_file,
+            'course_ids': [self.course.id],
+            'internship_ids': [self.internship.id],
+        }, follow=True)
+        self.assertContains(resp, '5 enrollments created, 1 already existed')
+        self.assertContains(resp, '1 rows matched no student')
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(InternshipEnrollment.objects.filter(internship=self.internship).count(), 3)
+
+    def test_malformed_uploads_are_form_errors(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        for content, error in (
+            (b'b1\n"' + b'x' * 200_000 + b'\n', 'could not be read'),
+            (b'b1\n\xff\xfe\n', 'must be UTF-8'),
+        ):
+            resp = self.client.post(reverse('admin_bulk_enroll'), {
+                'csv_file': SimpleUploadedFile('cohort.csv', content),
+                'course_ids': [str(self.course.id), '²'],
+            }, follow=True)
+            self.assertContains(resp, error)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 1)
+
+    def test_batches(self):
+        from . import bulk
+        result = bulk.bulk_enroll(['b0', 'b1', 'b2'], [self.course.id], batch_size=2)
+        self.assertEqual((result['created'], result['skipped']), (2, 1))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountImportTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        Student.objects.create(username='taken', email='taken@corp.com')
+        self.csv_path = os.path.join(self.media_root, 'students.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write("Username,Email,Password,Full_Name\n"
+                    "ana,ana@corp.com,pw1,Ana\n"
+                    "taken,new@corp.com,pw2,\n"
+                    "ana,ana2@corp.com,pw3,\n"
+                    "nopass,nopass@corp.com,,\n"
+                    "ben,ben@corp.com,pw5,Ben\n")
+
+    def test_import(self):
+        job = ImportJob.objects.create(role='student', source_path=self.csv_path)
+        imports.run_job(job, workers=0, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Completed')
+        self.assertEqual((job.rows_processed, job.created, job.skipped, job.invalid), (5, 2, 2, 1))
+        self.assertIn([5, 'missing password'], json.loads(job.errors))
+        self.assertTrue(Student.objects.get(username='ben').check_password('pw5'))
+
+    def test_resume_skips_committed_rows(self):
+        job = ImportJob.objects.create(role='student', source_path=self.csv_path, rows_processed=4, status='Failed')
+        imports.run_job(job, workers=0)
+        self.assertEqual(job.created, 1)
+        self.assertFalse(Student.objects.filter(username='ana').exists())
+
+    def test_process_pool_hashing(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            hashed = passwords.hash_passwords(['a', 'b', 'c'], executor, workers=2)
+        self.assertEqual(len(hashed), 3)
+        self.assertTrue(Student(password_hash=hashed[2]).check_password('c'))
+
+
+class PrincipalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = Student.objects.create(username='pat', email='pat@corp.com', full_name='Pat')
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+
+    def test_principal_cached_between_requests(self):
+        self.client.get(reverse('student_dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "lms_student"' in q['sql']])
+
+    def test_save_and_delete_invalidate(self):
+        self.client.get(reverse('student_profile'))
+        self.client.post(reverse('student_profile'), {'full_name': 'Patricia'})
+        self.assertContains(self.client.get(reverse('student_profile')), 'Patricia')
+
+        self.student.delete()
+        resp = self.client.get(reverse('student_dashboard'))
+        self.assertRedirects(resp, reverse('student_login'))
+
+    def test_profile_save_keeps_unread_counter(self):
+        self.client.get(reverse('student_profile'))
+        # A notification lands while the cached principal still says 0 unread
+        Student.objects.filter(id=self.student.id).update(unread_notifications=3)
+        self.client.post(reverse('student_profile'), {'full_name': 'Patricia'})
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.full_name, self.student.unread_notifications), ('Patricia', 3))
+
+
+class BroadcastTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Broadcast')
+        self.course = Course.objects.create(title='Announcements', category=category)
+        self.students = [Student.objects.create(username=f'n{i}', email=f'n{i}@corp.com') for i in range(5)]
+        for student in self.students[:3]:
+            Enrollment.objects.create(student=student, course=self.course)
+
+        admin = Admin.objects.create(username='caster')
+        session = self.client.session
+        session['admin_id'] = admin.id
+        session.save()
+
+    def test_course_broadcast_in_chunks(self):
+        broadcast = Broadcast.objects.create(message='Exam moved', audience='course', course=self.course)
+        broadcasts.send_broadcast(broadcast, chunk_size=2)
+        self.assertEqual((broadcast.status, broadcast.sent, broadcast.total), ('Completed', 3, 3))
+        self.assertEqual(Notification.objects.filter(message='Exam moved').count(), 3)
+        self.assertFalse(Notification.objects.filter(student=self.students[4]).exists())
+
+    def test_admin_view_queues_broadcast(self):
+        resp = self.client.post(reverse('admin_broadcast'), {'message': 'Hello all', 'audience': 'all'})
+        self.assertRedirects(resp, reverse('admin_broadcast'))
+        broadcast = Broadcast.objects.get()
+        self.assertEqual((broadcast.audience, broadcast.status), ('all', 'Pending'))
+
+        job = Job.objects.get()
+        self.assertEqual((job.task, json.loads(job.args)), ('lms.broadcasts._send_by_id', [broadcast.id]))
+        self.assertTrue(jobs.run(jobs.claim('test')[0]))
+        broadcast.refresh_from_db()
+        self.assertEqual((broadcast.status, broadcast.sent), ('Completed', 5))
+
+    def test_admin_view_rejects_bad_ids(self):
+        for data in ({'audience': 'course', 'course_id': 'abc'}, {'audience': 'course', 'course_id': '²'},
+                     {'audience': 'internship', 'internship_id': '1; drop'}):
+            resp = self.client.post(reverse('admin_broadcast'), {'message': 'Hi', **data})
+            self.assertEqual(resp.status_code, 200)
+            self.assertContains(resp, "Choose a")
+        self.assertFalse(Broadcast.objects.exists())
+
+        resp = self.client.post(reverse('admin_broadcast'), {
+            'message': 'Hi', 'audience': 'course', 'course_id': str(self.course.id),
+        })
+        self.assertRedirects(resp, reverse('admin_broadcast'))
+        self.assertEqual(Broadcast.objects.get().course, self.course)
+
+
+class NotificationCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = Student.objects.create(username='reader', email='reader@corp.com')
+        self.other = Student.objects.create(username='other', email='other@corp.com')
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+
+    def unread(self, student):
+        student.refresh_from_db()
+        return student.unread_notifications
+
+    def test_counter_follows_inserts_and_reads(self):
+        first = Notification.objects.create(student=self.student, message='one')
+        notifications.notify_many([self.student.id, self.other.id], 'two')
+        self.assertEqual((self.unread(self.student), self.unread(self.other)), (2, 1))
+
+        self.assertEqual(notifications.mark_read(self.student.id, [first.id]), 1)
+        self.assertEqual(notifications.mark_read(self.student.id, [first.id]), 0)
+        self.assertEqual(self.unread(self.student), 1)
+
+        # Nothing (valid) selected is not "everything"
+        for data in ({}, {'ids': ['x']}, {'ids': ['²']}):
+            resp = self.client.post(reverse('student_mark_notifications_read'), data)
+            self.assertRedirects(resp, reverse('student_notifications'))
+            self.assertEqual(self.unread(self.student), 1)
+
+        resp = self.client.post(reverse('student_mark_notifications_read'), {'all': '1'})
+        self.assertRedirects(resp, reverse('student_notifications'))
+        self.assertEqual(self.unread(self.student), 0)
+        self.assertEqual(self.unread(self.other), 1)
+
+    def test_history_is_paged(self):
+        notifications.notify_many([self.student.id], 'bulk')
+        for i in range(notifications.HISTORY_PER_PAGE):
+            Notification.objects.create(student=self.student, message=f'msg {i}')
+        resp = self.client.get(reverse('student_notifications'))
+        self.assertEqual(len(resp.context['notifications']), notifications.HISTORY_PER_PAGE)
+        self.assertTrue(resp.context['page'].has_next)
+        self.assertContains(resp, 'badge bg-danger">21<')
+
+    def test_purge_only_old_read(self):
+        old = timezone.now() - timedelta(days=200)
+        for is_read in (True, True, True, False):
+            Notification.objects.create(student=self.student, message='old', is_read=is_read, created_at=old)
+        Notification.objects.create(student=self.student, message='new', is_read=True)
+        self.assertEqual(notifications.purge_read(days=90, batch_size=2), 3)
+        self.assertEqual(Notification.objects.filter(student=self.student).count(), 2)
+
+
+class NotificationStreamTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(username='listener', email='listener@corp.com')
+
+    async def test_replays_after_last_event_id_then_streams_live(self):
+        first = await Notification.objects.acreate(student=self.student, message='seen')
+        await Notification.objects.acreate(student=self.student, message='missed')
+
+        frames = events.stream(self.student.id, last_event_id=first.id, heartbeat=0.05)
+        self.assertTrue((await anext(frames)).startswith('retry:'))
+        self.assertIn('"missed"', await anext(frames))
+        self.assertEqual(events.hub.connection_count(), 1)
+
+        # Published from another thread, as signal handlers and background jobs do
+        live = Notification(id=10**6, student_id=self.student.id, message='live', created_at=timezone.now())
+        await asyncio.to_thread(events.hub.publish, [self.student.id], events.notification_event(live))
+        frame = await anext(frames)
+        self.assertIn(f'id: {10**6}', frame)
+        self.assertEqual(await anext(frames), ': ping\n\n')
+
+        await frames.aclose()
+        self.assertEqual(events.hub.connection_count(), 0)
+
+    async def test_requires_student_session(self):
+        resp = await self.async_client.get(reverse('student_notification_stream'))
+        self.assertEqual(resp.status_code, 403)
+
+    async def test_ignores_malformed_last_event_id(self):
+        session = await self.async_client.asession()
+        await session.aset('student_id', self.student.id)
+        await session.asave()
+
+        async def no_frames(student_id, last_event_id):
+            seen.append(last_event_id)
+            yield ''
+
+        seen = []
+        with mock.patch.object(events, 'stream', no_frames):
+            resp = await self.async_client.get(reverse('student_notification_stream'), headers={'Last-Event-ID': '²'})
+            self.assertEqual(resp.status_code, 200)
+            [_ async for _ in resp.streaming_content]
+        self.assertEqual(seen, [0])
+
+    def test_wsgi_pages_poll_instead_of_streaming(self):
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+        resp = self.client.get(reverse('student_notifications'))
+        self.assertNotContains(resp, 'data-stream-url')
+        self.assertContains(resp, f'data-unread-url="{reverse("student_unread_count")}"')
+        # A WSGI worker must never be parked on the endless stream
+        self.assertEqual(self.client.get(reverse('student_notification_stream')).status_code, 204)
+
+        Notification.objects.create(student=self.student, message='new')
+        self.assertEqual(self.client.get(reverse('student_unread_count')).json(), {'unread': 1})
+
+    async def test_asgi_pages_stream(self):
+        session = await self.async_client.asession()
+        await session.aset('student_id', self.student.id)
+        await session.asave()
+        resp = await self.async_client.get(reverse('student_notifications'))
+        self.assertContains(resp, f'data-stream-url="{reverse("student_notification_stream")}"')
+
+
+class CatalogueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.web = Category.objects.create(name='Web')
+        self.data = Category.objects.create(name='Data')
+        for i in range(3):
+            Course.objects.create(title=f'Web {i}', category=self.web, status='Approved')
+        Course.objects.create(title='Data 0', category=self.data, status='Approved')
+        Course.objects.create(title='Pending', category=self.data, status='Proposed')
+        Course.objects.create(title='Rejected', category=self.web, status='Rejected')
+
+    def test_lists_approved_courses_by_category(self):
+        resp = self.client.get(reverse('index'), {'category': self.web.id})
+        titles = [c.title for c in resp.context['courses']]
+        self.assertEqual(titles, ['Web 2', 'Web 1', 'Web 0'])
+        self.assertEqual(resp.context['total_courses'], 4)
+        self.assertEqual(
+            [(f['name'], f['count']) for f in resp.context['facets']], [('Data', 1), ('Web', 3)]
+        )
+        self.assertNotContains(resp, 'Pending')
+
+        resp = self.client.get(reverse('index'), {'category': '²'})
+        self.assertEqual(len(resp.context['courses']), 4)
+
+    def test_facets_cached_until_course_changes(self):
+        catalogue.category_facets()
+        with self.assertNumQueries(0):
+            catalogue.category_facets()
+
+        pending = Course.objects.get(title='Pending')
+        pending.status = 'Approved'
+        pending.save()
+        self.assertEqual({f['name']: f['count'] for f in catalogue.category_facets()}, {'Data': 2, 'Web': 3})
+
+    def test_pages_keep_category(self):
+        resp = self.client.get(reverse('index'), {'category': self.web.id, 'sort': 'oldest'})
+        self.assertEqual(resp.context['keyset_query'], f'&category={self.web.id}')
+        self.assertContains(resp, f'?sort=newest&amp;category={self.web.id}')
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Cached')
+        self.course = Course.objects.create(title='Cached Course', category=category, status='Approved')
+        Lesson.objects.create(course=self.course, title='Intro')
+        self.url = reverse('detail', args=[self.course.id])
+
+    def test_anonymous_page_cached_until_lesson_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), 'Intro')
+
+        Lesson.objects.create(course=self.course, title='Deep Dive')
+        self.assertContains(self.client.get(self.url), 'Deep Dive')
+
+    def test_enrollment_stitched_into_shared_outline(self):
+        student = Student.objects.create(username='cached', email='cached@corp.com')
+        Enrollment.objects.create(student=student, course=self.course)
+        session = self.client.session
+        session['student_id'] = student.id
+        session.save()
+
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.url)
+        self.assertContains(resp, 'Continue Learning')
+        self.assertContains(resp, 'bi-unlock-fill')
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "lms_lesson"' in q['sql']])
+
+    def test_internship_list_refreshes_on_change(self):
+        self.client.get(reverse('student_internship_list'))
+        Internship.objects.create(title='Fresh Internship')
+        self.assertContains(self.client.get(reverse('student_internship_list')), 'Fresh Internship')
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Programming')
+        self.course = Course.objects.create(
+            title='Python Programming', description='Learn python from scratch', category=category, status='Approved'
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title='Decorators', content='Functions wrapping <b>functions</b> in python'
+        )
+        self.pending = Course.objects.create(title='Python Secrets', category=category, status='Proposed')
+        Lesson.objects.create(course=self.pending, title='Hidden python lesson')
+        self.internship = Internship.objects.create(title='Data Internship', description='Pandas and python')
+        InternshipProject.objects.create(internship=self.internship, title='Sales dashboard', description='Plot revenue')
+
+    def kinds(self, query):
+        return [(hit['kind'], hit['id']) for hit in search.search(query)['results']]
+
+    def test_ranks_title_matches_first_and_hides_unapproved(self):
+        hits = self.kinds('python')
+        self.assertEqual(hits[0], ('course', self.course.id))
+        self.assertIn(('lesson', self.lesson.id), hits)
+        self.assertIn(('internship', self.internship.id), hits)
+        self.assertEqual(len(hits), 3)
+
+    def test_highlights_and_escapes(self):
+        hit = search.search('wrapping')['results'][0]
+        self.assertEqual(hit['url'], reverse('detail', kwargs={'course_id': self.course.id}))
+        self.assertIn('<mark>wrapping</mark>', hit['snippet'])
+        self.assertIn('&lt;b&gt;', hit['snippet'])
+
+    def test_index_follows_changes(self):
+        self.pending.status = 'Approved'
+        self.pending.save()
+        self.assertIn(('lesson', self.pending.lessons.get().id), self.kinds('hidden'))
+
+        self.lesson.title = 'Closures'
+        self.lesson.save()
+        self.assertEqual(self.kinds('decorators'), [])
+        self.assertEqual(self.kinds('closures'), [('lesson', self.lesson.id)])
+
+        self.course.delete()
+        self.assertEqual(self.kinds('closures'), [])
+        self.assertEqual(self.kinds('sales'), [('project', InternshipProject.objects.get().id)])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.search('python" OR NEAR(')['results'], [])
+        self.assertEqual(self.kinds('"python*'), self.kinds('python'))
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.TABLE}")
+        self.assertEqual(self.kinds('python'), [])
+        self.assertEqual(search.rebuild(batch_size=3), 4)
+        self.assertEqual(len(self.kinds('python')), 3)
+
+    def test_views(self):
+        resp = self.client.get(reverse('search'), {'q': 'decorators'})
+        self.assertContains(resp, '<mark>Decorators</mark>')
+        resp = self.client.get(reverse('search'), {'q': 'decorators', 'page': '²'})
+        self.assertContains(resp, '<mark>Decorators</mark>')
+        resp = self.client.get(reverse('search_autocomplete'), {'q': 'data in'})
+        self.assertEqual([s['title'] for s in resp.json()['suggestions']], ['Data Internship'])
+        resp = self.client.get(reverse('search_autocomplete'), {'q': 'p'})
+        self.assertEqual(resp.json()['suggestions'], [])
+
+
+@skipUnless(certificates.available(), "reportlab or the certificate fonts are not installed")
+class CertificateTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.student = Student.objects.create(username='grad', email='grad@test.com', full_name='Ada Lovelace')
+        category = Category.objects.create(name='Maths')
+        self.course = Course.objects.create(title='analytical engines', category=category, status='Approved')
+        self.lesson = Lesson.objects.create(course=self.course, title='Only lesson')
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def complete(self):
+        record_lesson_completion(self.enrollment, self.lesson)
+        self.enrollment.refresh_from_db()
+
+    def test_pdf_is_deterministic(self):
+        fields = {
+            'name': 'Zoë (Test)', 'kind': 'course', 'title': 'Engines', 'completed_on': 'May 01, 2026',
+            'certificate_id': 'ABC-123', 'instructor': 'E-Learning Instructor',
+        }
+        data = pdf.certificate_pdf(fields, settings.CERTIFICATE_FONTS)
+        self.assertTrue(data.startswith(b'%PDF-'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+        self.assertEqual(data, pdf.certificate_pdf(dict(fields), settings.CERTIFICATE_FONTS))
+        self.assertNotEqual(data, pdf.certificate_pdf(dict(fields, name='Someone Else'), settings.CERTIFICATE_FONTS))
+        startxref = int(data.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertTrue(data[startxref:].startswith(b'xref'))
+
+    @skipUnless(documents.available(), "pypdf is not installed")
+    def test_pdf_prints_any_script(self):
+        data = pdf.certificate_pdf({
+            'name': 'Анна Каренина', 'kind': 'course', 'title': 'Μηχανές', 'completed_on': 'May 01, 2026',
+            'certificate_id': 'ABC-123', 'instructor': 'Jürgen Ñúñez',
+        }, settings.CERTIFICATE_FONTS)
+        text = documents.PdfReader(io.BytesIO(data)).pages[0].extract_text()
+        for expected in ('АННА КАРЕНИНА', 'Μηχανές', 'Jürgen Ñúñez'):
+            self.assertIn(expected, text)
+        self.assertNotIn('?', text)
+
+    def test_completion_renders_once_and_serves_immutable(self):
+        self.complete()
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.task, json.loads(job.args), job.priority),
+            ('lms.certificates._render_by_id', ['course', self.enrollment.pk], certificates.JOB_PRIORITY),
+        )
+        self.assertIsNone(self.enrollment.certificate_file)
+
+        self.assertTrue(jobs.run(jobs.claim('test')[0]))
+        self.enrollment.refresh_from_db()
+        name = self.enrollment.certificate_file
+        self.assertTrue(name.startswith('cert_') and name.endswith(f'_{self.enrollment.certificate_id}.pdf'))
+        with self.assertNumQueries(1):
+            self.assertEqual(certificates.render(self.enrollment), name)
+
+        resp = self.client.get(reverse('certificate_pdf', kwargs={'name': name}))
+        self.assertEqual(resp['Content-Type'], 'application/pdf')
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertTrue(b''.join(resp.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(self.client.get(reverse('media_file', kwargs={'name': name})).status_code, 404)
+
+    def test_rerender_replaces_file(self):
+        self.complete()
+        old = certificates.render(self.enrollment)
+        Student.objects.filter(pk=self.student.pk).update(full_name='Ada King')
+        with self.captureOnCommitCallbacks(execute=True):
+            new = certificates.render(certificates.enrollments('course').get(pk=self.enrollment.pk), force=True)
+        self.assertNotEqual(old, new)
+        self.assertFalse(storage.exists(old))
+        self.assertTrue(storage.exists(new))
+
+    def test_render_cohort(self):
+        internship = Internship.objects.create(title='Summer Lab')
+        for i in range(3):
+            student = Student.objects.create(username=f'intern{i}', email=f'intern{i}@test.com')
+            InternshipEnrollment.objects.create(
+                student=student, internship=internship, project_status='Approved', status='Completed',
+                certificate_id=f'CERT-{i}', completed_at=timezone.now(),
+            )
+        InternshipEnrollment.objects.create(
+            student=self.student, internship=internship, project_status='Submitted'
+        )
+        cohort = InternshipEnrollment.objects.filter(internship=internship)
+        self.assertEqual(certificates.render_cohort('internship', cohort, workers=0, batch_size=2), 3)
+        self.assertEqual(certificates.render_cohort('internship', cohort, workers=0), 0)
+        names = set(cohort.exclude(certificate_file=None).values_list('certificate_file', flat=True))
+        self.assertEqual(len(names), 3)
+        self.assertEqual(certificates.render_cohort('internship', cohort, workers=1, force=True), 3)
+        self.assertEqual(set(cohort.exclude(certificate_file=None).values_list('certificate_file', flat=True)), names)
+
+
+class VerificationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        student = Student.objects.create(username='ada', email='ada@test.com', full_name='Ada Lovelace')
+        category = Category.objects.create(name='Maths')
+        course = Course.objects.create(title='Engines', category=category, status='Approved')
+        self.enrollment = Enrollment.objects.create(
+            student=student, course=course, status='Completed', certificate_id='COURSE-1', completed_at=timezone.now()
+        )
+        internship = Internship.objects.create(title='Summer Lab')
+        InternshipEnrollment.objects.create(
+            student=student, internship=internship, project_status='Approved', certificate_id='INTERN-1',
+            completed_at=timezone.now(),
+        )
+
+    def api(self, certificate_id, **headers):
+        return self.client.get(reverse('verify_certificate_api', kwargs={'certificate_id': certificate_id}), **headers)
+
+    def test_resolves_both_tables(self):
+        data = self.api('course-1').json()
+        self.assertEqual((data['type'], data['title'], data['student_name']), ('course', 'Engines', 'Ada Lovelace'))
+        self.assertEqual(self.api('INTERN-1').json()['type'], 'internship')
+        resp = self.client.get(reverse('verify_certificate', kwargs={'certificate_id': 'INTERN-1'}))
+        self.assertContains(resp, 'Valid certificate')
+        self.assertContains(resp, 'Summer Lab')
+
+    def test_cached_with_etag(self):
+        resp = self.api('COURSE-1')
+        self.assertIn('max-age=300', resp['Cache-Control'])
+        with self.assertNumQueries(0):
+            again = self.api('COURSE-1', HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self.enrollment.student.full_name = 'Ada King'
+        self.enrollment.student.save()
+        self.enrollment.save()
+        changed = self.api('COURSE-1', HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['student_name'], 'Ada King')
+
+    def test_renames_refresh_cached_results(self):
+        self.api('COURSE-1')
+        self.api('INTERN-1')
+
+        student = self.enrollment.student
+        student.full_name = 'Ada King'
+        student.save()
+        self.assertEqual(self.api('COURSE-1').json()['student_name'], 'Ada King')
+
+        course = self.enrollment.course
+        course.title = 'Difference Engines'
+        course.instructor = Instructor.objects.create(username='babbage', email='cb@test.com', full_name='C. Babbage')
+        course.save()
+        data = self.api('COURSE-1').json()
+        self.assertEqual((data['title'], data['issued_by']), ('Difference Engines', 'C. Babbage'))
+
+        course.instructor.full_name = 'Charles Babbage'
+        course.instructor.save()
+        self.assertEqual(self.api('COURSE-1').json()['issued_by'], 'Charles Babbage')
+
+        self.api('INTERN-1')
+        internship = Internship.objects.get()
+        internship.title = 'Winter Lab'
+        internship.save()
+        self.assertEqual(self.api('INTERN-1').json()['title'], 'Winter Lab')
+
+        with self.assertNumQueries(0):
+            self.api('COURSE-1')
+
+    def test_unknown_ids_cached_briefly(self):
+        resp = self.api('NOPE-123')
+        self.assertEqual(resp.status_code, 404)
+        self.assertFalse(resp.json()['valid'])
+        self.assertIn('max-age=60', resp['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api('NOPE-123').status_code, 404)
+            self.assertEqual(self.api('not an id!').status_code, 404)
+
+        # Issuing the id drops the negative entry
+        self.enrollment.certificate_id = 'NOPE-123'
+        self.enrollment.save()
+        self.assertTrue(self.api('NOPE-123').json()['valid'])
+
+    def test_form_redirects(self):
+        resp = self.client.get(reverse('verify_certificate_form'), {'certificate_id': ' course-1 '})
+        self.assertRedirects(resp, reverse('verify_certificate', kwargs={'certificate_id': 'COURSE-1'}))
+        resp = self.client.get(reverse('verify_certificate', kwargs={'certificate_id': 'MISSING'}))
+        self.assertEqual(resp.status_code, 404)
+
+
+class JobQueueTest(TestCase):
+    def test_claims_by_priority_once(self):
+        low = jobs.enqueue(create_category_job, 'low', priority=-1)
+        high = jobs.enqueue(create_category_job, 'high', priority=5)
+        normal = jobs.enqueue(create_category_job, 'normal')
+        jobs.enqueue(create_category_job, 'later', delay=60)
+
+        first = jobs.claim('a', limit=2)
+        self.assertEqual([j.id for j in first], [high.id, normal.id])
+        self.assertEqual([j.id for j in jobs.claim('b', limit=5)], [low.id])
+        self.assertEqual(jobs.claim('c'), [])
+        self.assertTrue(all(j.attempts == 1 and j.locked_by.startswith('a:') for j in first))
+
+        self.assertTrue(jobs.run(first[0]))
+        self.assertTrue(Category.objects.filter(name='high').exists())
+        self.assertEqual(Job.objects.get(pk=high.pk).status, 'Completed')
+
+    def test_retries_with_backoff_then_fails(self):
+        queued = jobs.enqueue(failing_job, max_attempts=2)
+        self.assertFalse(jobs.run(jobs.claim('w')[0]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('Queued', 1))
+        self.assertIn('RuntimeError: boom', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=jobs.BACKOFF_BASE_SECONDS * 0.7))
+        self.assertEqual(jobs.claim('w'), [])
+
+        Job.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        self.assertFalse(jobs.run(jobs.claim('w')[0]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('Failed', 2))
+
+    def test_expired_lease_is_requeued(self):
+        queued = jobs.enqueue(create_category_job, 'slow')
+        [stale] = jobs.claim('dead', lease=-1)
+        self.assertEqual(jobs.requeue_expired(), 1)
+        [fresh] = jobs.claim('alive')
+        self.assertEqual((fresh.id, fresh.attempts), (queued.id, 2))
+
+        # The first worker's late result must not overwrite the new claim
+        jobs.run(stale)
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, 'Running')
+        jobs.run(fresh)
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, 'Completed')
+
+    def test_only_marked_tasks_run(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue(os.getcwd)
+        Job.objects.create(task='os.getcwd', max_attempts=1)
+        self.assertFalse(jobs.run(jobs.claim('w')[0]))
+        self.assertIn('not a job task', Job.objects.get().last_error)
+
+    def test_lock_errors_do_not_spend_attempts(self):
+        queued = jobs.enqueue(locked_job, max_attempts=1)
+        self.assertFalse(jobs.run(jobs.claim('w')[0]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('Queued', 0))
+        self.assertIn('database is locked', queued.last_error)
+        self.assertLessEqual(queued.run_at, timezone.now() + timedelta(seconds=jobs.LOCKED_RETRY_SECONDS))
+
+
+class JobWorkerTest(TransactionTestCase):
+    def test_burst_worker_drains_queue(self):
+        for name in ('one', 'two', 'three'):
+            jobs.enqueue(create_category_job, name)
+        failing = jobs.enqueue(failing_job, max_attempts=1)
+        # Several threads on SQLite's shared-cache test database collide on table locks; those jobs are retried
+        worker = jobs.Worker(concurrency=3, poll_interval=0.01)
+        with mock.patch.object(jobs, 'LOCKED_RETRY_SECONDS', 0):
+            for _ in range(20):
+                worker.run(burst=True)
+                if not Job.objects.filter(status='Queued').exists():
+                    break
+        self.assertGreaterEqual(worker.processed, 4)
+        self.assertEqual(set(Category.objects.values_list('name', flat=True)), {'one', 'two', 'three'})
+        self.assertEqual(Job.objects.filter(status='Completed').count(), 3)
+        self.assertEqual(Job.objects.get(pk=failing.pk).status, 'Failed')
+
+    def test_one_thread_by_default_on_sqlite(self):
+        self.assertEqual(jobs.Worker().concurrency, 1 if connection.vendor == 'sqlite' else jobs.DEFAULT_CONCURRENCY)
+
+
+@skipUnless(images.available(), "Pillow is not installed")
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = Category.objects.create(name='Design')
+
+    def upload(self, name, size, mode='RGB', fmt='JPEG', **save_args):
+        from PIL import Image
+        out = io.BytesIO()
+        Image.new(mode, size, (200, 40, 40, 128) if mode == 'RGBA' else (200, 40, 40)).save(out, fmt, **save_args)
+        return storage.save([out.getvalue()], name)
+
+    def run_jobs(self):
+        for job in jobs.claim('test', limit=10):
+            self.assertTrue(jobs.run(job))
+
+    def test_upload_queues_variants_without_metadata(self):
+        from PIL import Image
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees
+        exif[0x010F] = 'SecretCam'
+        name = self.upload('ab12cd34_photo.jpg', (1200, 800), exif=exif.tobytes())
+        course = Course.objects.create(title='Photo', category=self.category, status='Approved', image_file=name)
+        self.assertEqual(Job.objects.get().task, 'lms.images._generate')
+
+        self.run_jobs()
+        variants = ImageVariant.objects.filter(source=name).order_by('format', 'width')
+        self.assertEqual(
+            [(v.format, v.width, v.height) for v in variants],
+            [('jpeg', 320, 480), ('jpeg', 640, 960), ('webp', 320, 480), ('webp', 640, 960)],
+        )
+        with Image.open(storage.path(variants[1].name)) as image:
+            self.assertEqual(image.size, (640, 960))
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertNotIn('icc_profile', image.info)
+
+        resp = self.client.get(reverse('index'))
+        self.assertContains(resp, 'type="image/webp"')
+        self.assertContains(resp, f'/media/{variants[1].name} 640w')
+        self.assertContains(resp, 'loading="lazy"')
+        resp = self.client.get(reverse('detail', kwargs={'course_id': course.id}))
+        self.assertContains(resp, 'loading="eager"')
+
+        # Saving again doesn't queue more work
+        course.save()
+        self.assertEqual(Job.objects.filter(status='Queued').count(), 0)
+
+    def test_small_transparent_png_and_fallback(self):
+        name = self.upload('ef56ab78_logo.png', (200, 100), mode='RGBA', fmt='PNG')
+        course = Course.objects.create(title='Logo', category=self.category, status='Approved', image_file=name)
+        resp = self.client.get(reverse('index'))
+        self.assertContains(resp, f'src="/media/{name}"')
+
+        self.assertEqual(images.generate_variants(name), 2)
+        self.assertEqual(
+            sorted(ImageVariant.objects.values_list('format', 'width', 'height')), [('jpeg', 200, 100), ('webp', 200, 100)]
+        )
+        names = list(ImageVariant.objects.values_list('name', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            course.delete()
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertFalse(any(storage.exists(n) for n in names))
+
+    def test_unreadable_image_is_skipped(self):
+        name = storage.save([b'not an image'], 'deadbeef_fake.png')
+        self.assertEqual(images.generate_variants(name), 0)
+
+
+def png_bytes(width, height):
+    """A minimal greyscale PNG, standing in for pdftoppm's output."""
+    row = b'\x00' + b'\x80' * width
+    chunks = [
+        (b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)),
+        (b'IDAT', zlib.compress(row * height)),
+        (b'IEND', b''),
+    ]
+    return b'\x89PNG\r\n\x1a\n' + b''.join(
+        struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body)) for kind, body in chunks
+    )
+
+
+@skipUnless(documents.available(), "pypdf is not installed")
+@skipUnless(certificates.available(), "reportlab or the certificate fonts are not installed")
+class PdfDocumentTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        # pdftoppm may not be installed here; its output is a PNG like this one
+        preview = mock.patch.object(documents, '_render_preview', return_value=png_bytes(240, 170))
+        preview.start()
+        self.addCleanup(preview.stop)
+
+        self.pdf = pdf.certificate_pdf({
+            'name': 'Ada Lovelace', 'kind': 'course', 'title': 'Analytical Engines', 'completed_on': 'May 01, 2026',
+            'certificate_id': 'DOC-1', 'instructor': 'Charles Babbage',
+        }, settings.CERTIFICATE_FONTS)
+        category = Category.objects.create(name='History')
+        self.course = Course.objects.create(title='Computing History', category=category, status='Approved')
+        self.student = Student.objects.create(username='reader', email='reader@x.com')
+        Enrollment.objects.create(student=self.student, course=self.course)
+        session = self.client.session
+        session['student_id'] = self.student.id
+        session.save()
+
+    def test_notes_are_extracted_in_the_background(self):
+        name = storage.save([self.pdf], 'note_ab12cd34_engines.pdf')
+        lesson = Lesson.objects.create(course=self.course, title='Engines', notes_file=name)
+        self.assertEqual(Job.objects.get().task, 'lms.documents._extract')
+        for job in jobs.claim('test', limit=10):
+            self.assertTrue(jobs.run(job))
+
+        document = PdfDocument.objects.get(name=name)
+        self.assertEqual((document.pages, document.size), (1, len(self.pdf)))
+        self.assertIn('Analytical Engines', document.text)
+        self.assertEqual((document.preview, document.preview_width, document.preview_height),
+                         ('note_ab12cd34_engines-pdf_p1.png', 240, 170))
+        self.assertEqual(
+            [(hit['kind'], hit['id']) for hit in search.search('lovelace')['results']], [('lesson', lesson.id)]
+        )
+
+        resp = self.client.get(reverse('student_learn', kwargs={'course_id': self.course.id}))
+        self.assertContains(resp, 'data-notes-info="1 page · ')
+        preview_url = reverse('student_lesson_media', kwargs={'lesson_id': lesson.id, 'kind': 'preview'})
+        self.assertContains(resp, f'data-notes-preview="{preview_url}"')
+        resp = self.client.get(preview_url)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        # Previews of private notes are as private as the notes
+        self.assertEqual(self.client.get(reverse('media_file', kwargs={'name': document.preview})).status_code, 404)
+
+        lesson.save()
+        self.assertEqual(Job.objects.filter(status='Queued').count(), 0)
+
+    def test_material_preview_search_and_release(self):
+        internship = Internship.objects.create(title='Archive Internship')
+        InternshipEnrollment.objects.create(student=self.student, internship=internship)
+        name = storage.save([self.pdf], 'int_mat_ef56ab78_guide.pdf')
+        material = InternshipMaterial.objects.create(internship=internship, title='Guide', file_path=name)
+        document = documents.extract(name)
+
+        resp = self.client.get(reverse('student_view_internship', kwargs={'internship_id': internship.id}))
+        self.assertContains(resp, f'src="/media/{document.preview}"')
+        self.assertContains(resp, '1 page · ')
+        self.assertEqual(self.client.get(reverse('media_file', kwargs={'name': document.preview})).status_code, 200)
+        self.assertEqual(
+            [(hit['kind'], hit['id']) for hit in search.search('babbage')['results']], [('material', material.id)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        self.assertFalse(PdfDocument.objects.exists())
+        self.assertFalse(storage.exists(document.preview))
+        self.assertEqual(search.search('babbage')['results'], [])
+
+    def test_damaged_pdf_and_other_files(self):
+        name = storage.save([b'%PDF-1.4 not really'], 'int_mat_00000000_broken.pdf')
+        with self.assertLogs('pypdf', 'WARNING'):  # "EOF marker not found", kept out of the test output
+            document = documents.extract(name)
+        self.assertEqual((document.pages, document.text, document.size), (None, '', 19))
+
+        internship = Internship.objects.create(title='Video Internship')
+        video = storage.save([b'\x00' * 16], 'int_mat_11111111_intro.mp4')
+        InternshipMaterial.objects.create(internship=internship, title='Intro', file_path=video, resource_type='video')
+        self.assertFalse(Job.objects.exists())
+        self.assertIsNone(documents.extract(video))
@@ -0,0 +1,307 @@
+"""
+Resumable uploads.
+
+A client creates a session, PATCHes the file in pieces at the current offset and
+finalizes it. Chunks are written at their offset into a ``.part`` file under
+MEDIA_ROOT and the finished file is handed to the media storage with an atomic
+rename, so a dropped connection only costs the chunk that was in flight.
+
+The session row's offset is the durable one. Writing a chunk first claims
+the session with a conditional UPDATE (Uploading at that offset ->
+Writing), so of two PATCHes racing at the same offset one writes and the
+other gets a 409 without touching the file; the offset moves once the chunk
+is on disk. Finalizing claims it the same way (Uploading -> Finalizing).
+
+The a-prefixed variants serve the async views. Their file reads, writes,
+fsyncs and hashing run on a small dedicated thread pool, and a semaphore
+caps how many uploads touch the disk at once; the rest wait on the event
+loop (or get a 503 to retry) instead of occupying request threads.
+"""
+import asyncio
+import functools
+import os
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import storage
+from .models import UploadSession
+
+# Filename prefixes used by the upload forms, keyed by upload kind
+UPLOAD_PREFIXES = {
+    'video': 'vid',
+    'notes': 'note',
+    'material': 'int_mat',
+    'project': 'proj_sub',
+    'image': 'img',
+}
+
+# Suggested client chunk size and the largest body accepted in one PATCH
+CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNK_SIZE = 32 * 1024 * 1024
+MAX_UPLOAD_SIZE = 8 * 1024 * 1024 * 1024
+
+# Bytes written between fsync calls. The tail of every PATCH is always synced.
+FSYNC_EVERY = 16 * 1024 * 1024
+READ_SIZE = 64 * 1024
+
+# Threads doing upload disk I/O, and uploads allowed to use them at once
+UPLOAD_IO_THREADS = getattr(settings, 'UPLOAD_IO_THREADS', 8)
+MAX_CONCURRENT_UPLOADS = getattr(settings, 'MAX_CONCURRENT_UPLOADS', 16)
+# Seconds a chunk waits for a slot before the client is told to retry
+UPLOAD_SLOT_TIMEOUT = 30
+# How long a chunk write or finalize may hold the session before another request can take over
+CLAIM_LEASE = timedelta(minutes=15)
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def upload_dir():
+    path = os.path.join(settings.MEDIA_ROOT, '.uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f"{session.upload_id}.part")
+
+
+def stored_filename(kind, name):
+    name = os.path.basename(name)
+    return f"{UPLOAD_PREFIXES[kind]}_{uuid.uuid4().hex[:8]}_{name}"
+
+
+def create_session(owner_role, owner_id, kind, filename, total_size):
+    if kind not in UPLOAD_PREFIXES:
+        raise UploadError("Unknown upload kind.")
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise UploadError("Filename is required.")
+    if total_size < 0 or total_size > MAX_UPLOAD_SIZE:
+        raise UploadError("Invalid upload size.")
+
+    session = UploadSession.objects.create(
+        upload_id=uuid.uuid4().hex,
+        owner_role=owner_role,
+        owner_id=owner_id,
+        kind=kind,
+        filename=filename,
+        total_size=total_size,
+    )
+    # Create the empty part file so offset queries work straight away
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def current_offset(session):
+    """The durable offset, as last committed by a chunk write."""
+    offset = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first()
+    return offset or 0
+
+
+def _check_chunk(session, offset, length):
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError("Chunk too large.", status=413)
+    if offset + length > session.total_size:
+        raise UploadError("Chunk exceeds declared upload size.", status=413)
+
+
+def _claim(session, status, offset):
+    """
+    Move the session from Uploading (at ``offset``) to ``status``, or take over
+    a Writing/Finalizing claim whose lease ran out. The claim's updated_at is
+    its token. On failure, raise the UploadError that explains why.
+    """
+    now = timezone.now()
+    free = Q(status='Uploading') | Q(status__in=('Writing', 'Finalizing'), updated_at__lt=now - CLAIM_LEASE)
+    if UploadSession.objects.filter(free, pk=session.pk, offset=offset).update(status=status, updated_at=now):
+        session.status = status
+        session.updated_at = now
+        return
+    session.refresh_from_db(fields=['status', 'offset', 'stored_name', 'updated_at'])
+    if session.status in ('Writing', 'Finalizing'):
+        raise UploadError("Another request is writing this upload, retry shortly.", status=409)
+    if session.status != 'Uploading':
+        raise UploadError("Upload already finalized.", status=409)
+    raise UploadError(f"Offset mismatch, expected {session.offset}.", status=409)
+
+
+def _release(session, claimed_status, **changes):
+    # Guarded by the claim token, so a request whose lease was taken over can't undo the new owner's work
+    released = UploadSession.objects.filter(
+        pk=session.pk, status=claimed_status, updated_at=session.updated_at
+    ).update(updated_at=timezone.now(), **changes)
+    if not released:
+        raise UploadError("Upload was taken over by another request.", status=409)
+    for field, value in changes.items():
+        setattr(session, field, value)
+
+
+def _write_at(path, stream, offset, length):
+    # Written at the offset rather than appended: bytes past the committed offset
+    # (a chunk cut off before it was committed) are simply overwritten by the retry
+    written = 0
+    unsynced = 0
+    with open(path, 'r+b') as dest:
+        dest.seek(offset)
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            dest.write(data)
+            written += len(data)
+            unsynced += len(data)
+            if unsynced >= FSYNC_EVERY:
+                dest.flush()
+                os.fsync(dest.fileno())
+                unsynced = 0
+        dest.flush()
+        os.fsync(dest.fileno())
+    return written
+
+
+def _claim_chunk(session, offset, length):
+    _check_chunk(session, offset, length)
+    _claim(session, 'Writing', offset)
+
+
+def _commit_chunk(session, offset, written):
+    _release(session, 'Writing', status='Uploading', offset=offset + written)
+    return session.offset
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Write ``length`` bytes read from ``stream`` at ``offset``.
+    The offset must match the committed one, otherwise the client is told
+    where to resume from (409).
+    """
+    _claim_chunk(session, offset, length)
+    try:
+        written = _write_at(part_path(session), stream, offset, length)
+    except BaseException:
+        _commit_chunk(session, offset, 0)
+        raise
+    return _commit_chunk(session, offset, written)
+
+
+def _claim_finalize(session):
+    """Claim the session for finalizing. Returns False if it was already finalized."""
+    if session.status in ('Complete', 'Consumed'):
+        return False
+    try:
+        _claim(session, 'Finalizing', session.total_size)
+    except UploadError:
+        if session.status in ('Complete', 'Consumed'):
+            return False
+        if session.status == 'Uploading':
+            raise UploadError("Upload incomplete.", status=409)
+        raise
+    # Bytes of a chunk cut off mid-write may lie past the end
+    with open(part_path(session), 'r+b') as f:
+        f.truncate(session.total_size)
+    return True
+
+
+def _complete(session, name):
+    _release(session, 'Finalizing', status='Complete', stored_name=name)
+    return name
+
+
+def finalize(session):
+    if not _claim_finalize(session):
+        return session.stored_name
+    try:
+        name = storage.save_file(part_path(session), stored_filename(session.kind, session.filename))
+    except BaseException:
+        _release(session, 'Finalizing', status='Uploading')
+        raise
+    return _complete(session, name)
+
+
+def claim_upload(upload_id, owner_role, owner_id, kind):
+    """
+    Hand a finished upload over to a form. Returns the stored filename, or None if
+    the id does not belong to this user or the upload is not finished.
+    """
+    if not upload_id:
+        return None
+    claimed = UploadSession.objects.filter(
+        upload_id=upload_id, owner_role=owner_role, owner_id=owner_id, kind=kind, status='Complete'
+    ).update(status='Consumed', updated_at=timezone.now())
+    if not claimed:
+        return None
+    return UploadSession.objects.values_list('stored_name', flat=True).get(upload_id=upload_id)
+
+
+# ===========================
+# ASYNC (ASGI) VARIANTS
+# ===========================
+
+_io_executor = ThreadPoolExecutor(max_workers=UPLOAD_IO_THREADS, thread_name_prefix='upload-io')
+# One semaphore per event loop; asyncio primitives can't be shared across loops
+_slots = weakref.WeakKeyDictionary()
+
+
+async def run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, functools.partial(func, *args))
+
+
+@asynccontextmanager
+async def upload_slot(timeout=None):
+    loop = asyncio.get_running_loop()
+    semaphore = _slots.get(loop)
+    if semaphore is None:
+        semaphore = _slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout or UPLOAD_SLOT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise UploadError("Too many uploads in progress, retry shortly.", status=503)
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+async def acurrent_offset(session):
+    return await sync_to_async(current_offset)(session)
+
+
+async def awrite_chunk(session, offset, stream, length):
+    """Async write_chunk: the disk work runs on the upload I/O threads."""
+    async with upload_slot():
+        await sync_to_async(_claim_chunk)(session, offset, length)
+        try:
+            written = await run_io(_write_at, part_path(session), stream, offset, length)
+        except BaseException:
+            await sync_to_async(_commit_chunk)(session, offset, 0)
+            raise
+    return await sync_to_async(_commit_chunk)(session, offset, written)
+
+
+async def afinalize(session):
+    if not await sync_to_async(_claim_finalize)(session):
+        return session.stored_name
+    path = part_path(session)
+    try:
+        async with upload_slot():
+            digest, size = await run_io(storage.hash_file, path)
+        # With the hash known this is a rename plus the blob bookkeeping
+        name = await sync_to_async(storage.save_file)(
+            path, stored_filename(session.kind, session.filename), digest, size
+        )
+    except BaseException:
+        await sync_to_async(_release)(session, 'Finalizing', status='Uploading')
+        raise
+    return await sync_to_async(_complete)(session, name)
@@ -4,6 +4,14 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('course/<int:course_id>/', views.detail, name='detail'),
+    path('search/', views.search, name='search'),
+    path('search/autocomplete/', views.search_autocomplete, name='search_autocomplete'),
+    path('media/<path:name>', views.media_file, name='media_file'),
+    path('certificates/<str:name>', views.certificate_pdf, name='certificate_pdf'),
+    path('submissions/<int:enrollment_id>/file/', views.project_submission_file, name='project_submission_file'),
+    path('verify/', views.verify_certificate, name='verify_certificate_form'),
+    path('verify/<str:certificate_id>/', views.verify_certificate, name='verify_certificate'),
+    path('api/verify/<str:certificate_id>/', views.verify_certificate_api, name='verify_certificate_api'),
     
     # Admin
     path('admin/login/', views.admin_login, name='admin_login'),
@@ -24,9 +32,15 @@ urlpatterns = [
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('student/enroll/<int:course_id>/', views.enroll_course, name='enroll_course'),
     path('student/course/<int:course_id>/learn/', views.student_learn, name='student_learn'),
+    path('student/course/<int:course_id>/certificate/', views.student_certificate, name='student_certificate'),
+    path('student/lesson/<int:lesson_id>/complete/', views.student_complete_lesson, name='student_complete_lesson'),
+    path('student/lesson/<int:lesson_id>/media/<str:kind>/', views.student_lesson_media, name='student_lesson_media'),
     path('student/internships/', views.student_internship_list, name='student_internship_list'),
     path('student/profile/', views.student_profile, name='student_profile'),
     path('student/notifications/', views.student_notifications, name='student_notifications'),
+    path('student/notifications/stream/', views.student_notification_stream, name='student_notification_stream'),
+    path('student/notifications/unread/', views.student_unread_count, name='student_unread_count'),
+    path('student/notifications/read/', views.student_mark_notifications_read, name='student_mark_notifications_read'),
     
     path('student/enroll_internship/<int:internship_id>/', views.student_enroll_internship, name='student_enroll_internship'),
     path('student/my_internship/<int:internship_id>/', views.student_view_internship, name='student_view_internship'),
@@ -43,11 +57,19 @@ urlpatterns = [
     path('admin/instructors/', views.admin_instructors, name='admin_instructors'),
     path('admin/students/', views.admin_students, name='admin_students'),
     path('admin/reports/', views.admin_reports, name='admin_reports'),
+    path('admin/bulk_enroll/', views.admin_bulk_enroll, name='admin_bulk_enroll'),
+    path('admin/import_accounts/', views.admin_import_accounts, name='admin_import_accounts'),
+    path('admin/broadcast/', views.admin_broadcast, name='admin_broadcast'),
     path('admin/create_course/', views.admin_create_course, name='admin_create_course'),
     path('admin/create_instructor/', views.admin_create_instructor, name='admin_create_instructor'),
     path('admin/delete_instructor/<int:id>/', views.admin_delete_instructor, name='admin_delete_instructor'),
     path('admin/delete_student/<int:id>/', views.admin_delete_student, name='admin_delete_student'),
     
+    # Resumable uploads
+    path('uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<str:upload_id>/', views.upload_detail, name='upload_detail'),
+    path('uploads/<str:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+
     path('admin/register/', views.admin_login, name='admin_register'), # Deprecated but keep for link safety if any
 
 ]
@@ -0,0 +1,116 @@
+"""
+Public certificate verification.
+
+A certificate id is resolved through the unique certificate_id index of
+Enrollment, then InternshipEnrollment, with the student and course or
+internship joined in the same query. Results are cached: found
+certificates for an hour, unknown ids for a minute, so scanning random ids
+mostly hits the cache. Ids that cannot be certificate ids never reach the
+database.
+
+signals.py drops the entry when the enrollment changes. A found
+certificate also shows the student's, instructor's and course or
+internship's names, so its entry records the pagecache versions of those
+rows and is ignored once any of them has been bumped.
+"""
+import hashlib
+import json
+import re
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from . import pagecache
+from .models import Enrollment, InternshipEnrollment
+
+CACHE_TIMEOUT = 60 * 60
+NEGATIVE_CACHE_TIMEOUT = 60
+CLIENT_MAX_AGE = 5 * 60
+NEGATIVE_CLIENT_MAX_AGE = 60
+
+_ID_RE = re.compile(r'^[A-Z0-9-]{1,50}$')
+
+
+def normalize(certificate_id):
+    return (certificate_id or '').strip().upper()
+
+
+def cache_key(certificate_id):
+    return f"verify:{normalize(certificate_id)}"
+
+
+def _describe(enrollment, kind):
+    subject = enrollment.course if kind == 'course' else enrollment.internship
+    student = enrollment.student
+    instructor = subject.instructor
+    return {
+        'valid': True,
+        'certificate_id': enrollment.certificate_id,
+        'type': kind,
+        'student_name': student.full_name or student.username,
+        'title': subject.title,
+        'issued_by': (instructor.full_name or instructor.username) if instructor else 'E-Learning',
+        'completed_at': timezone.localtime(enrollment.completed_at).isoformat() if enrollment.completed_at else None,
+        'pdf_url': (
+            reverse('certificate_pdf', kwargs={'name': enrollment.certificate_file})
+            if enrollment.certificate_file else None
+        ),
+    }
+
+
+def _sources(enrollment, kind):
+    """The pagecache version names of the rows whose names appear in the result."""
+    subject = enrollment.course if kind == 'course' else enrollment.internship
+    names = [f'student:{enrollment.student_id}', f'{kind}:{subject.pk}']
+    if subject.instructor_id:
+        names.append(f'instructor:{subject.instructor_id}')
+    return names
+
+
+def _resolve(certificate_id):
+    """(result, version names) for a known certificate id, or (None, [])."""
+    enrollment = Enrollment.objects.select_related('student', 'course__instructor').filter(
+        certificate_id=certificate_id
+    ).first()
+    if enrollment:
+        return _describe(enrollment, 'course'), _sources(enrollment, 'course')
+    enrollment = InternshipEnrollment.objects.select_related('student', 'internship__instructor').filter(
+        certificate_id=certificate_id
+    ).first()
+    if enrollment:
+        return _describe(enrollment, 'internship'), _sources(enrollment, 'internship')
+    return None, []
+
+
+def _versions(names):
+    return {name: pagecache.version(name) for name in names}
+
+
+def lookup(certificate_id):
+    """The public facts of a certificate, or {'valid': False, ...} for an unknown id."""
+    certificate_id = normalize(certificate_id)
+    if not _ID_RE.match(certificate_id):
+        return {'valid': False, 'certificate_id': certificate_id}
+    key = cache_key(certificate_id)
+    entry = cache.get(key)
+    # Entries cached before versions were recorded have no 'versions' and are resolved again
+    if entry and 'versions' in entry and _versions(entry['versions']) == entry['versions']:
+        return entry['result']
+
+    result, names = _resolve(certificate_id)
+    if result is None:
+        result = {'valid': False, 'certificate_id': certificate_id}
+        cache.set(key, {'result': result, 'versions': {}}, NEGATIVE_CACHE_TIMEOUT)
+    else:
+        cache.set(key, {'result': result, 'versions': _versions(names)}, CACHE_TIMEOUT)
+    return result
+
+
+def etag(result):
+    return '"%s"' % hashlib.md5(json.dumps(result, sort_keys=True).encode()).hexdigest()
+
+
+def invalidate(certificate_id):
+    if certificate_id:
+        cache.delete(cache_key(certificate_id))
@@ -1,25 +1,49 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden, HttpResponseNotModified, Http404, StreamingHttpResponse
 from django.utils import timezone
 from .models import (
     Admin, Instructor, Student, Course, Category, Lesson, Quiz, 
     Enrollment, Notification, LessonCompletion, QuizResult, Internship,
-    InternshipMaterial, InternshipQuiz, InternshipProject, InternshipEnrollment
+    InternshipMaterial, InternshipQuiz, InternshipProject, InternshipEnrollment,
+    UploadSession, InternshipQuizBest, ImportJob, Broadcast, PdfDocument
 )
+from .streaming import etag_matches, ranged_file_response
+from . import (
+    broadcasts, bulk, catalogue, certificates, documents, events, images, imports,
+    notifications as notification_service, pagecache, principal, search as search_service, storage, uploads,
+    verification,
+)
+from .pagination import keyset_paginate
+from .progress import record_lesson_completion
+from .reports import DEFAULT_COURSE_SORT, build_admin_report
+from .quizzes import PASS_MARK, compile_quiz, grade as grade_quiz, record_attempt as record_quiz_attempt
 from functools import wraps
+import csv
 import os
 import json
 import uuid
 from django.db import IntegrityError
 
+def _save_upload(request, field, kind, role):
+    """
+    Store the file for ``field`` and return its filename. The form either carries
+    the bytes itself or ``<field>_upload_id`` pointing at a finished resumable upload.
+    """
+    if field in request.FILES:
+        f = request.FILES[field]
+        return storage.save(f.chunks(), uploads.stored_filename(kind, f.name))
+    return uploads.claim_upload(
+        request.POST.get(f'{field}_upload_id'), role, request.session.get(f'{role}_id'), kind
+    )
+
 
 # Helper Decorators
 def admin_login_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.session.get('admin_id'):
+        if not request.session.get('admin_id') or not principal.for_role(request, 'admin'):
             messages.error(request, "Please log in as admin.")
             return redirect('admin_login')
         return view_func(request, *args, **kwargs)
@@ -28,7 +52,7 @@ def admin_login_required(view_func):
 def instructor_login_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.session.get('instructor_id'):
+        if not request.session.get('instructor_id') or not principal.for_role(request, 'instructor'):
             messages.error(request, "Please log in as an instructor.")
             return redirect('instructor_login')
         return view_func(request, *args, **kwargs)
@@ -37,24 +61,42 @@ def instructor_login_required(view_func):
 def student_login_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if not request.session.get('student_id'):
+        if not request.session.get('student_id') or not principal.for_role(request, 'student'):
             messages.error(request, "Please log in as a student.")
             return redirect('student_login')
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
+@pagecache.cache_public_page('catalogue')
 def index(request):
-    courses = Course.objects.all().order_by('-created_at')[:6] # Simplified pagination for now
-    return render(request, 'lms/list.html', {'courses': courses})
+    return render(request, 'lms/list.html', catalogue.catalogue_page(request.GET))
 
+@pagecache.cache_public_page('course:{course_id}')
 def detail(request, course_id):
-    course = get_object_or_404(Course, pk=course_id)
+    course = get_object_or_404(Course.objects.select_related('category', 'instructor'), pk=course_id)
+    images.attach([course])
+    # The page is shared; only the enrollment check is per user
     is_enrolled = False
     student_id = request.session.get('student_id')
     if student_id:
         if Enrollment.objects.filter(student_id=student_id, course_id=course.id).exists():
             is_enrolled = True
-    return render(request, 'lms/detail.html', {'course': course, 'is_enrolled': is_enrolled})
+    return render(request, 'lms/detail.html', {
+        'course': course,
+        'is_enrolled': is_enrolled,
+        'course_version': pagecache.version(f'course:{course.id}'),
+        'fragment_timeout': pagecache.FRAGMENT_CACHE_TIMEOUT,
+    })
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = request.GET.get('page', '1')
+    # isdecimal, not isdigit: int('²') raises
+    hits = search_service.search(query, int(page) if page.isdecimal() else 1)
+    return render(request, 'lms/search.html', {'query': query, **hits})
+
+def search_autocomplete(request):
+    return JsonResponse({'suggestions': search_service.suggest(request.GET.get('q', ''))})
 
 # ===========================
 # ADMIN AUTH
@@ -163,7 +205,7 @@ def instructor_logout(request):
 
 @instructor_login_required
 def instructor_dashboard(request):
-    instructor = Instructor.objects.get(id=request.session['instructor_id'])
+    instructor = request.principal
     courses = instructor.courses.all()
     return render(request, 'lms/instructor_dashboard.html', {'instructor': instructor, 'courses': courses})
 
@@ -179,16 +221,7 @@ def instructor_create_course(request):
         category_id = request.POST.get('category_id')
         description = request.POST.get('description', '').strip()
         
-        image_file = 'default.jpg'
-        if 'image_file' in request.FILES:
-            # Basic file handling - in prod use default_storage or model FileField
-            f = request.FILES['image_file']
-            filename = f"{uuid.uuid4().hex[:8]}_{f.name}"
-            # Need to save to MEDIA_ROOT
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as destination:
-                for chunk in f.chunks():
-                    destination.write(chunk)
-            image_file = filename
+        image_file = _save_upload(request, 'image_file', 'image', 'instructor') or 'default.jpg'
 
         instructor_id = request.session['instructor_id']
         category = Category.objects.get(id=category_id)
@@ -218,24 +251,8 @@ def instructor_manage_lessons(request, course_id):
         title = request.POST.get('title', '').strip()
         content = request.POST.get('content', '').strip()
         
-        video_file = None
-        notes_file = None
-        
-        if 'video_file' in request.FILES:
-            f = request.FILES['video_file']
-            filename = f"vid_{uuid.uuid4().hex[:8]}_{f.name}"
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as dest:
-                for chunk in f.chunks():
-                    dest.write(chunk)
-            video_file = filename
-            
-        if 'notes_file' in request.FILES:
-            f = request.FILES['notes_file']
-            filename = f"note_{uuid.uuid4().hex[:8]}_{f.name}"
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as dest:
-                for chunk in f.chunks():
-                    dest.write(chunk)
-            notes_file = filename
+        video_file = _save_upload(request, 'video_file', 'video', 'instructor')
+        notes_file = _save_upload(request, 'notes_file', 'notes', 'instructor')
             
         Lesson.objects.create(
             course=course, title=title, content=content, video_file=video_file, notes_file=notes_file
@@ -250,9 +267,9 @@ def instructor_manage_lessons(request, course_id):
 
 @student_login_required
 def student_dashboard(request):
-    student = Student.objects.get(id=request.session['student_id'])
+    student = request.principal
     enrollments = student.enrollments.all()
-    notifications = Notification.objects.filter(student=student, is_read=False)
+    notifications = Notification.objects.filter(student=student, is_read=False).order_by('-created_at')[:5]
     return render(request, 'lms/student_dashboard.html', {'student': student, 'enrollments': enrollments, 'notifications': notifications})
 
 @student_login_required
@@ -261,8 +278,8 @@ def enroll_course(request, course_id):
         student_id = request.session['student_id']
         course = get_object_or_404(Course, id=course_id)
         
-        if not Enrollment.objects.filter(student_id=student_id, course_id=course.id).exists():
-            Enrollment.objects.create(student_id=student_id, course_id=course.id)
+        _, created = Enrollment.objects.get_or_create(student_id=student_id, course_id=course.id)
+        if created:
             messages.success(request, "Enrolled successfully.")
         else:
             messages.info(request, "Already enrolled.")
@@ -274,21 +291,157 @@ def enroll_course(request, course_id):
 def student_learn(request, course_id):
     student_id = request.session['student_id']
     enrollment = get_object_or_404(Enrollment, student_id=student_id, course_id=course_id)
-    return render(request, 'lms/learn.html', {'course': enrollment.course, 'student': enrollment.student})
+    course = enrollment.course
+    lessons = documents.attach(course.lessons.order_by('order', 'id'), 'notes_file')
+    return render(request, 'lms/learn.html', {
+        'course': course,
+        'student': request.principal,
+        'enrollment': enrollment,
+        'lessons': lessons,
+        'quizzes': course.quizzes.all(),
+    })
 
 @student_login_required
-def student_notifications(request):
+def student_certificate(request, course_id):
     student_id = request.session['student_id']
-    student = Student.objects.get(id=student_id)
-    notifications = Notification.objects.filter(student=student).order_by('-created_at')
-    
-    # Mark all as read when viewed? Or user manually marks? 
-    # For now just list them. Often viewing them marks as read.
-    # Let's keep it simple as per original flask app if possible, 
-    # or just list them. The template splits by new/old or just lists all.
-    # The flask template logic was "if notifications".
-    
-    return render(request, 'lms/student_notifications.html', {'notifications': notifications})
+    enrollment = Enrollment.objects.select_related('course__instructor').filter(
+        student_id=student_id, course_id=course_id
+    ).first()
+
+    if not enrollment or enrollment.status != "Completed" or not enrollment.certificate_id:
+        messages.error(request, "Certificate not available yet.")
+        return redirect('student_dashboard')
+
+    return render(request, 'lms/student_certificate.html', {
+        'student': request.principal,
+        'course': enrollment.course,
+        'date': enrollment.completed_at,
+        'cert_id': enrollment.certificate_id,
+        'certificate_file': enrollment.certificate_file,
+    })
+
+@student_login_required
+def student_lesson_media(request, lesson_id, kind):
+    lesson = get_object_or_404(Lesson, id=lesson_id)
+    student_id = request.session['student_id']
+    if not Enrollment.objects.filter(student_id=student_id, course_id=lesson.course_id).exists():
+        return HttpResponseForbidden("You are not enrolled in this course.")
+
+    if kind == 'video':
+        filename = lesson.video_file
+    elif kind == 'notes':
+        filename = lesson.notes_file
+    elif kind == 'preview':
+        filename = PdfDocument.objects.filter(name=lesson.notes_file or '').values_list('preview', flat=True).first()
+    else:
+        raise Http404("Unknown media type.")
+
+    path = storage.path(filename)
+    if not path:
+        raise Http404("File not found.")
+    return ranged_file_response(request, path, content_type='image/png' if kind == 'preview' else None)
+
+@student_login_required
+def student_complete_lesson(request, lesson_id):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required.'}, status=405)
+    lesson = get_object_or_404(Lesson, id=lesson_id)
+    enrollment = Enrollment.objects.filter(
+        student_id=request.session['student_id'], course_id=lesson.course_id
+    ).first()
+    if not enrollment:
+        return JsonResponse({'success': False, 'error': 'Not enrolled in this course.'}, status=403)
+
+    enrollment = record_lesson_completion(enrollment, lesson)
+    events.publish_on_commit([enrollment.student_id], {'event': 'progress', 'data': {
+        'course_id': enrollment.course_id, 'progress': round(enrollment.progress, 1), 'status': enrollment.status,
+    }})
+    return JsonResponse({
+        'success': True,
+        'progress': round(enrollment.progress, 1),
+        'status': enrollment.status,
+    })
+
+# Lesson videos and notes are only served through student_lesson_media, certificates through certificate_pdf,
+# project submissions through project_submission_file
+PRIVATE_MEDIA_PREFIXES = ('vid_', 'note_', 'cert_', 'proj_sub_')
+
+def media_file(request, name):
+    if os.path.basename(name).startswith(PRIVATE_MEDIA_PREFIXES):
+        raise Http404("File not found.")
+    path = storage.path(name)
+    if not path:
+        raise Http404("File not found.")
+    return ranged_file_response(request, path, cache_control='public, max-age=86400')
+
+def _can_view_submission(request, enrollment):
+    if request.session.get('admin_id') and principal.for_role(request, 'admin'):
+        return True
+    instructor_id = request.session.get('instructor_id')
+    if instructor_id and instructor_id == enrollment.internship.instructor_id:
+        return bool(principal.for_role(request, 'instructor'))
+    student_id = request.session.get('student_id')
+    return bool(student_id and student_id == enrollment.student_id and principal.for_role(request, 'student'))
+
+def project_submission_file(request, enrollment_id):
+    enrollment = get_object_or_404(InternshipEnrollment.objects.select_related('internship'), id=enrollment_id)
+    if not _can_view_submission(request, enrollment):
+        return HttpResponseForbidden("You cannot view this submission.")
+    path = storage.path(enrollment.project_submission)
+    if not path:
+        raise Http404("File not found.")
+    return ranged_file_response(request, path, cache_control='private, max-age=3600')
+
+@student_login_required
+def student_notifications(request):
+    student = request.principal
+    page = keyset_paginate(
+        Notification.objects.filter(student=student), request.GET, per_page=notification_service.HISTORY_PER_PAGE
+    )
+    return render(request, 'lms/student_notifications.html', {'notifications': page, 'page': page})
+
+async def student_notification_stream(request):
+    # Async so that idle streams wait on the event loop instead of holding a thread
+    student_id = await request.session.aget('student_id')
+    if not student_id:
+        return HttpResponseForbidden("Please log in as a student.")
+    if not events.streaming_supported(request):
+        # 204 tells EventSource not to reconnect; the page polls student_unread_count instead
+        return HttpResponse(status=204)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or '0'
+    last_event_id = int(last_event_id) if last_event_id.isdecimal() else 0  # isdigit passes '²'
+
+    response = StreamingHttpResponse(events.stream(student_id, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@student_login_required
+def student_unread_count(request):
+    # Read from the row, not the cached principal, so the badge is current
+    unread = Student.objects.filter(id=request.session['student_id']).values_list(
+        'unread_notifications', flat=True
+    ).first()
+    return JsonResponse({'unread': unread or 0})
+
+@student_login_required
+def student_mark_notifications_read(request):
+    if request.method == 'POST':
+        is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        # Marking everything takes an explicit all=1; an empty selection must not mean "all"
+        ids = None if request.POST.get('all') == '1' else [
+            int(i) for i in request.POST.getlist('ids') if i.isdecimal()  # isdigit passes '²', which int() rejects
+        ]
+        if ids == []:
+            if is_ajax:
+                return JsonResponse({'marked': 0, 'error': 'No notifications selected.'}, status=400)
+            messages.info(request, "No notifications selected.")
+            return redirect('student_notifications')
+        changed = notification_service.mark_read(request.session['student_id'], ids)
+        if is_ajax:
+            return JsonResponse({'marked': changed})
+        messages.success(request, f"Marked {changed} notification(s) as read.")
+    return redirect('student_notifications')
 
 
 # ===========================
@@ -302,8 +455,14 @@ def admin_internships(request):
 
 @admin_login_required
 def admin_internship_submissions(request):
-    submissions = InternshipEnrollment.objects.filter(project_submission__isnull=False).order_by('-completed_at')
-    return render(request, 'lms/admin_internship_submissions.html', {'submissions': submissions})
+    submissions = (
+        InternshipEnrollment.objects.filter(project_submission__isnull=False)
+        .select_related('student', 'internship')
+        .only('id', 'created_at', 'completed_at', 'project_submission', 'project_status',
+              'student__username', 'internship__title')
+    )
+    page = keyset_paginate(submissions, request.GET)
+    return render(request, 'lms/admin_internship_submissions.html', {'submissions': page, 'page': page})
 
 @admin_login_required
 def admin_create_internship(request):
@@ -347,15 +506,8 @@ def admin_edit_internship(request, internship_id):
         # Add Material
         elif "add_material" in request.POST:
             title = request.POST.get('mat_title', '').strip()
-            if 'mat_file' in request.FILES:
-                f = request.FILES['mat_file']
-                filename = f"int_mat_{uuid.uuid4().hex[:8]}_{f.name}"
-                if not os.path.exists(settings.MEDIA_ROOT):
-                    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
-                with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as dest:
-                    for chunk in f.chunks():
-                        dest.write(chunk)
-                
+            filename = _save_upload(request, 'mat_file', 'material', 'admin')
+            if filename:
                 InternshipMaterial.objects.create(
                     internship=internship, title=title, file_path=filename
                 )
@@ -404,43 +556,43 @@ def admin_review_submission(request, enrollment_id, action):
             messages.warning(request, "Submission rejected.")
             
         enrollment.save()
+        if action == "approve":
+            certificates.schedule(enrollment)
             
     return redirect('admin_internship_submissions')
 
 @admin_login_required
 def admin_view_enrollments(request):
-    enrollments = Enrollment.objects.all().order_by('-created_at')
-    return render(request, 'lms/admin_enrollments.html', {'enrollments': enrollments})
+    enrollments = Enrollment.objects.select_related('student', 'course').only(
+        'id', 'status', 'progress', 'created_at', 'student__username', 'student__email', 'course__title'
+    )
+    page = keyset_paginate(enrollments, request.GET)
+    return render(request, 'lms/admin_enrollments.html', {'enrollments': page, 'page': page})
 
 @admin_login_required
 def admin_instructors(request):
-    instructors = Instructor.objects.all()
-    return render(request, 'lms/admin_instructors.html', {'instructors': instructors})
+    instructors = Instructor.objects.only('id', 'username', 'created_at')
+    page = keyset_paginate(instructors, request.GET)
+    return render(request, 'lms/admin_instructors.html', {'instructors': page, 'page': page})
 
 @admin_login_required
 def admin_students(request):
-    students = Student.objects.all()
-    return render(request, 'lms/admin_students.html', {'students': students})
+    students = Student.objects.only('id', 'username', 'email', 'created_at')
+    page = keyset_paginate(students, request.GET)
+    return render(request, 'lms/admin_students.html', {'students': page, 'page': page})
 
 @admin_login_required
 def admin_reports(request):
-    total_students = Student.objects.count()
-    total_courses = Course.objects.count()
-    total_enrollments = Enrollment.objects.count()
-    course_stats = []
-    for c in Course.objects.all():
-        course_stats.append({
-            'title': c.title,
-            'created_at': c.created_at,
-            'enrollments': c.enrollments.count(),
-            'status': c.status
-        })
-    return render(request, 'lms/admin_reports.html', {
-        'total_students': total_students, 
-        'total_courses': total_courses, 
-        'total_enrollments': total_enrollments, 
-        'course_stats': course_stats
-    })
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    report = build_admin_report(
+        sort=request.GET.get('sort', DEFAULT_COURSE_SORT),
+        page=page,
+        use_cache=not request.GET.get('fresh'),
+    )
+    return render(request, 'lms/admin_reports.html', report)
 
 @admin_login_required
 def admin_create_instructor(request):
@@ -480,6 +632,93 @@ def admin_delete_student(request, id):
     return redirect('admin_students')
 
 
+@admin_login_required
+def admin_bulk_enroll(request):
+    courses = Course.objects.only('id', 'title').order_by('title')
+    internships = Internship.objects.only('id', 'title').order_by('title')
+    if request.method == 'POST':
+        # isdecimal, not isdigit: int('²') raises
+        course_ids = [int(i) for i in request.POST.getlist('course_ids') if i.isdecimal()]
+        internship_ids = [int(i) for i in request.POST.getlist('internship_ids') if i.isdecimal()]
+        course_ids = list(Course.objects.filter(id__in=course_ids).values_list('id', flat=True))
+        internship_ids = list(Internship.objects.filter(id__in=internship_ids).values_list('id', flat=True))
+
+        if 'csv_file' not in request.FILES:
+            messages.error(request, "Please upload a CSV file.")
+        elif not course_ids and not internship_ids:
+            messages.error(request, "Select at least one course or internship.")
+        else:
+            identifiers = bulk.iter_identifiers(bulk.open_csv(request.FILES['csv_file']))
+            try:
+                result = bulk.bulk_enroll(identifiers, course_ids, internship_ids)
+            except UnicodeDecodeError:
+                messages.error(request, "The CSV file must be UTF-8 encoded.")
+            except csv.Error as exc:
+                # Raised mid-read, e.g. for an oversized field; bulk_enroll's transaction rolled everything back
+                messages.error(request, f"The CSV file could not be read: {exc}.")
+            else:
+                messages.success(
+                    request,
+                    f"Processed {result['rows']} rows: {result['created']} enrollments created, "
+                    f"{result['skipped']} already existed."
+                )
+                if result['unknown']:
+                    sample = ', '.join(result['unknown_sample'])
+                    messages.warning(request, f"{result['unknown']} rows matched no student (e.g. {sample}).")
+            return redirect('admin_bulk_enroll')
+
+    return render(request, 'lms/admin_bulk_enroll.html', {'courses': courses, 'internships': internships})
+
+@admin_login_required
+def admin_import_accounts(request):
+    if request.method == 'POST':
+        role = request.POST.get('role')
+        if role not in imports.ROLE_MODELS:
+            messages.error(request, "Choose students or instructors.")
+        elif 'csv_file' not in request.FILES:
+            messages.error(request, "Please upload a CSV file.")
+        else:
+            job = ImportJob.objects.create(role=role, source_path=imports.save_upload(request.FILES['csv_file']))
+            imports.start_job(job)
+            messages.success(request, f"Import {job.id} queued. Refresh this page to follow its progress.")
+            return redirect('admin_import_accounts')
+
+    jobs = ImportJob.objects.order_by('-created_at')[:20]
+    return render(request, 'lms/admin_import_accounts.html', {'jobs': jobs})
+
+@admin_login_required
+def admin_broadcast(request):
+    if request.method == 'POST':
+        message = request.POST.get('message', '').strip()
+        audience = request.POST.get('audience')
+        course_id = request.POST.get('course_id', '') if audience == 'course' else ''
+        internship_id = request.POST.get('internship_id', '') if audience == 'internship' else ''
+        # A tampered or stale form may post anything here; treat it like no choice.
+        # isdecimal, not isdigit: int('²') raises
+        course_id = int(course_id) if course_id.isdecimal() else None
+        internship_id = int(internship_id) if internship_id.isdecimal() else None
+
+        if not message:
+            messages.error(request, "Message cannot be empty.")
+        elif audience not in broadcasts.AUDIENCES:
+            messages.error(request, "Choose who should receive the message.")
+        elif audience == 'course' and (course_id is None or not Course.objects.filter(id=course_id).exists()):
+            messages.error(request, "Choose a course.")
+        elif audience == 'internship' and (
+            internship_id is None or not Internship.objects.filter(id=internship_id).exists()
+        ):
+            messages.error(request, "Choose an internship.")
+        else:
+            broadcasts.start_broadcast(message[:500], audience, course_id, internship_id)
+            messages.success(request, "Broadcast queued. Refresh this page to follow its progress.")
+            return redirect('admin_broadcast')
+
+    return render(request, 'lms/admin_broadcast.html', {
+        'courses': Course.objects.only('id', 'title').order_by('title'),
+        'internships': Internship.objects.only('id', 'title').order_by('title'),
+        'recent': Broadcast.objects.select_related('course', 'internship').order_by('-created_at')[:20],
+    })
+
 @admin_login_required
 def admin_create_course(request):
     categories = Category.objects.all()
@@ -488,14 +727,7 @@ def admin_create_course(request):
         category_id = request.POST.get('category_id')
         description = request.POST.get('description', '').strip()
         
-        image_file = 'default.jpg'
-        if 'image_file' in request.FILES:
-            f = request.FILES['image_file']
-            filename = f"{uuid.uuid4().hex[:8]}_{f.name}"
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as dest:
-                for chunk in f.chunks():
-                    dest.write(chunk)
-            image_file = filename
+        image_file = _save_upload(request, 'image_file', 'image', 'admin') or 'default.jpg'
 
         category = Category.objects.get(id=category_id)
         Course.objects.create(
@@ -512,8 +744,12 @@ def admin_create_course(request):
 
 
 
+@pagecache.cache_public_page('internships')
 def student_internship_list(request):
-    internships = Internship.objects.all()
+    internships = pagecache.cached_value(
+        'internship_list', ['internships'],
+        lambda: list(Internship.objects.only('id', 'title', 'description', 'duration').order_by('id')),
+    )
     return render(request, 'lms/internship_list.html', {'internships': internships})
 
 @student_login_required
@@ -522,8 +758,8 @@ def student_enroll_internship(request, internship_id):
         student_id = request.session['student_id']
         internship = get_object_or_404(Internship, id=internship_id)
         
-        if not InternshipEnrollment.objects.filter(student_id=student_id, internship_id=internship.id).exists():
-            InternshipEnrollment.objects.create(student_id=student_id, internship_id=internship.id)
+        _, created = InternshipEnrollment.objects.get_or_create(student_id=student_id, internship_id=internship.id)
+        if created:
             messages.success(request, "Enrolled in internship!")
         else:
             messages.info(request, "Already enrolled.")
@@ -543,26 +779,32 @@ def student_view_internship(request, internship_id):
     internship = get_object_or_404(Internship, id=internship_id)
     
     if request.method == 'POST':
-        if 'project_file' in request.FILES:
-            f = request.FILES['project_file']
-            filename = f"proj_sub_{uuid.uuid4().hex[:8]}_{f.name}" 
-            # In prod use FileField/Storage
-            with open(os.path.join(settings.MEDIA_ROOT, filename), 'wb+') as dest:
-                for chunk in f.chunks():
-                    dest.write(chunk)
-            
+        filename = _save_upload(request, 'project_file', 'project', 'student')
+        if filename:
             enrollment.project_submission = filename
             enrollment.project_status = "Submitted"
             enrollment.save()
             messages.success(request, "Project submitted for review!")
             return redirect('student_view_internship', internship_id=internship.id)
 
-    return render(request, 'lms/student_internship_view.html', {'internship': internship, 'enrollment': enrollment})
+    quiz_results = {
+        best.quiz_id: best
+        for best in InternshipQuizBest.objects.filter(student_id=student_id, internship_id=internship.id)
+    }
+    quizzes = list(internship.quizzes.all())
+    for q in quizzes:
+        q.best_result = quiz_results.get(q.id)
+    return render(request, 'lms/student_internship_view.html', {
+        'internship': internship,
+        'materials': documents.attach(internship.materials.all(), 'file_path'),
+        'enrollment': enrollment,
+        'quizzes': quizzes,
+    })
 
 @student_login_required
 def student_take_internship_quiz(request, internship_id, quiz_id):
     internship = get_object_or_404(Internship, id=internship_id)
-    quiz = get_object_or_404(InternshipQuiz, id=quiz_id)
+    quiz = get_object_or_404(InternshipQuiz, id=quiz_id, internship=internship)
     student_id = request.session['student_id']
     
     # Verify enrollment
@@ -570,22 +812,19 @@ def student_take_internship_quiz(request, internship_id, quiz_id):
          messages.error(request, "Enroll first.")
          return redirect('student_internship_list')
 
+    compiled = compile_quiz(quiz)
+
     if request.method == "POST":
-        questions = json.loads(quiz.questions_data) if quiz.questions_data else []
-        score = 0
-        total = len(questions)
-        
-        for i, q in enumerate(questions):
-            ans = request.POST.get(f"q_{i}")
-            if ans == q.get('correct'):
-               score += 1
-        
+        score, total, answers = grade_quiz(compiled, request.POST)
         percentage = (score / total) * 100 if total > 0 else 0
-        messages.info(request, f"Quiz completed. Score: {percentage:.1f}%")
+        result = record_quiz_attempt(student_id, quiz, percentage, answers)
+        if result.passed:
+            messages.info(request, f"Quiz completed. Score: {percentage:.1f}%")
+        else:
+            messages.warning(request, f"Quiz completed. Score: {percentage:.1f}% (pass mark {PASS_MARK:.0f}%)")
         return redirect('student_view_internship', internship_id=internship.id)
 
-    questions = json.loads(quiz.questions_data) if quiz.questions_data else []
-    return render(request, 'lms/take_internship_quiz.html', {'internship': internship, 'quiz': quiz, 'questions': questions})
+    return render(request, 'lms/take_internship_quiz.html', {'internship': internship, 'quiz': quiz, 'questions': compiled.questions})
 
 @student_login_required
 def student_internship_certificate(request, internship_id):
@@ -597,15 +836,50 @@ def student_internship_certificate(request, internship_id):
         return redirect('student_view_internship', internship_id=internship_id)
         
     return render(request, 'lms/internship_certificate.html', {
-        'student': enrollment.student, 
+        'student': request.principal,
         'internship': enrollment.internship, 
         'date': enrollment.completed_at,
-        'cert_id': enrollment.certificate_id
+        'cert_id': enrollment.certificate_id,
+        'certificate_file': enrollment.certificate_file,
     })
 
+def certificate_pdf(request, name):
+    # Names carry the content hash, so a URL's bytes never change
+    if not name.startswith(certificates.FILE_PREFIX) or not name.endswith('.pdf'):
+        raise Http404("Certificate not found.")
+    path = storage.path(name)
+    if not path:
+        raise Http404("Certificate not found.")
+    response = ranged_file_response(
+        request, path, content_type='application/pdf', cache_control=certificates.CACHE_CONTROL
+    )
+    response['Content-Disposition'] = 'inline; filename="certificate-%s"' % name.rsplit('_', 1)[-1]
+    return response
+
+def verify_certificate(request, certificate_id=None):
+    if certificate_id is None:
+        certificate_id = request.GET.get('certificate_id', '').strip()
+        if certificate_id:
+            return redirect('verify_certificate', certificate_id=verification.normalize(certificate_id))
+        return render(request, 'lms/verify_certificate.html', {'result': None})
+    result = verification.lookup(certificate_id)
+    return render(request, 'lms/verify_certificate.html', {'result': result}, status=200 if result['valid'] else 404)
+
+def verify_certificate_api(request, certificate_id):
+    result = verification.lookup(certificate_id)
+    tag = verification.etag(result)
+    if etag_matches(request, tag):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(result, status=200 if result['valid'] else 404)
+    max_age = verification.CLIENT_MAX_AGE if result['valid'] else verification.NEGATIVE_CLIENT_MAX_AGE
+    response['ETag'] = tag
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    return response
+
 @student_login_required
 def student_profile(request):
-    student = Student.objects.get(id=request.session['student_id'])
+    student = request.principal
     if request.method == 'POST':
         full_name = request.POST.get('full_name', '').strip()
         email = request.POST.get('email', '').strip()
@@ -622,9 +896,89 @@ def student_profile(request):
         
         if password:
             student.set_password(password)
-            
-        student.save()
+
+        # request.principal is cached: a full save would write back a stale unread_notifications
+        student.save(update_fields=['full_name', 'email', 'password_hash'])
         messages.success(request, "Profile updated successfully.")
         return redirect('student_profile')
         
     return render(request, 'lms/student_profile.html', {'student': student})
+
+
+# ===========================
+# RESUMABLE UPLOADS
+# ===========================
+
+def _upload_json(session, status=200):
+    response = JsonResponse({
+        'upload_id': session.upload_id,
+        'offset': session.offset,
+        'size': session.total_size,
+        'status': session.status,
+        'filename': session.stored_name,
+        'chunk_size': uploads.CHUNK_SIZE,
+    }, status=status)
+    response['Upload-Offset'] = str(session.offset)
+    return response
+
+async def _aget_upload_session(request, upload_id):
+    role, owner_id = await principal.asession_owner(request)
+    try:
+        return await UploadSession.objects.aget(upload_id=upload_id, owner_role=role, owner_id=owner_id)
+    except UploadSession.DoesNotExist:
+        raise Http404("Upload not found.")
+
+def upload_create(request):
+    role, owner_id = principal.session_owner(request)
+    if not role:
+        return JsonResponse({'error': 'Login required.'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required.'}, status=405)
+
+    try:
+        total_size = int(request.POST.get('size', ''))
+        session = uploads.create_session(
+            role, owner_id, request.POST.get('kind'), request.POST.get('filename'), total_size
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid upload size.'}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    return _upload_json(session, status=201)
+
+async def upload_detail(request, upload_id):
+    # Async (like upload_finalize) so chunk writes wait on the upload I/O pool, not a request thread
+    session = await _aget_upload_session(request, upload_id)
+
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'Upload-Offset header required.'}, status=400)
+        try:
+            await uploads.awrite_chunk(session, offset, request, length)
+        except uploads.UploadError as e:
+            session.offset = await uploads.acurrent_offset(session)
+            response = JsonResponse({'error': str(e), 'offset': session.offset}, status=e.status)
+            response['Upload-Offset'] = str(session.offset)
+            if e.status == 503:
+                response['Retry-After'] = '5'
+            return response
+        return _upload_json(session)
+
+    if request.method in ('GET', 'HEAD'):
+        return _upload_json(session)
+
+    return JsonResponse({'error': 'Method not allowed.'}, status=405)
+
+async def upload_finalize(request, upload_id):
+    session = await _aget_upload_session(request, upload_id)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required.'}, status=405)
+    try:
+        await uploads.afinalize(session)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return _upload_json(session)